@@ -9,53 +9,74 @@ load_dotenv()
 
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.llms.groq import Groq
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.core import load_index_from_storage, StorageContext
 from chromadb import PersistentClient
-from sentence_transformers import CrossEncoder
 
-# Initialize LLM
-llm = Groq(model="llama3-8b-8192", api_key=os.getenv("GROQ_API_KEY"))
+from rerank import RERANK_CANDIDATES, RerankStage
+from startup import Startup
 
-# Initialize embedding model
-embed_model = HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
 
-# Persistent storage setup
-persist_dir = "./chroma_db"
-client = PersistentClient(path=persist_dir)
-collection = client.get_or_create_collection("rag-collection")
-vector_store = ChromaVectorStore(chroma_collection=collection, persist_dir=persist_dir)
+def init_llm(startup):
+    return Groq(model="llama3-8b-8192", api_key=os.getenv("GROQ_API_KEY"))
 
-# Load vector index
-storage_context = StorageContext.from_defaults(
-    persist_dir="./index",
-    vector_store=vector_store
-)
-index = load_index_from_storage(storage_context, embed_model=embed_model)
 
-# Load re-ranker
-reranker = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
+def init_embed_model(startup):
+    # torch / sentence-transformers are imported on the startup thread, not at import
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 
-def rerank(query, docs):
+    return HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
+
+
+def init_index(startup):
+    # Persistent storage setup
+    persist_dir = "./chroma_db"
+    client = PersistentClient(path=persist_dir)
+    collection = client.get_or_create_collection("rag-collection")
+    vector_store = ChromaVectorStore(chroma_collection=collection, persist_dir=persist_dir)
+
+    # Load vector index
+    storage_context = StorageContext.from_defaults(
+        persist_dir="./index",
+        vector_store=vector_store
+    )
+    return load_index_from_storage(storage_context, embed_model=startup.get("embed_model"))
+
+
+def init_reranker(startup):
+    from sentence_transformers import CrossEncoder
+
+    return RerankStage(CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2'))
+
+
+def warm_up(startup):
+    """ Dummy embed + retrieve, so the first question doesn't pay for lazy initialization """
+    startup.get("index").as_retriever(similarity_top_k=1).retrieve("admission process")
+    startup.get("reranker").warm_up()
+
+
+# Nothing loads at import; the models load in parallel when the chatbot starts
+startup = Startup({
+    "llm": init_llm,
+    "embed_model": init_embed_model,
+    "index": init_index,
+    "reranker": init_reranker,
+}, warmup=warm_up, name="Chatbot")
+
+def rerank(query, nodes):
     """
-    Re-rank docs based on relevance to the query using CrossEncoder.
+    Re-rank retrieved nodes with the CrossEncoder (one batch, cached, within the latency budget).
     """
-    pairs = [[query, doc] for doc in docs]
-    scores = reranker.predict(pairs)
-    sorted_docs = [doc for _, doc in sorted(zip(scores, docs), reverse=True)]
-    return sorted_docs
+    return startup.get("reranker").rerank(query, nodes)
 
 def generate_answer(query):
     """
     Generate answer from the index and LLM.
     """
-    retriever = index.as_retriever(similarity_top_k=10)
+    retriever = startup.get("index").as_retriever(similarity_top_k=RERANK_CANDIDATES)
     nodes = retriever.retrieve(query)
-    doc_texts = [node.get_content() for node in nodes]
-
-    #top_docs = rerank(query, doc_texts)[:3]
+    top_docs = [node.get_content() for node in rerank(query, nodes)]
 
-    context = "\n\n---\n\n".join(doc_texts)  # Use top 3 docs directly for simplicity)
+    context = "\n\n---\n\n".join(top_docs)  # Top 3 docs after reranking
 
     prompt = f"""
 You are **PU-Assistant**, the official virtual helpdesk for Panjab University, Chandigarh.
@@ -85,12 +106,14 @@ Question: {query}
 Answer:
 """
 
-    response = llm.complete(prompt)
+    response = startup.get("llm").complete(prompt)
     print("\n--- Answer ---\n")
     print(response.text.strip())
     print("\n--------------\n")
 
 if __name__ == "__main__":
+    if not startup.wait():
+        raise SystemExit(f"❌ Startup failed: {startup.error}")
     print("✅ PU-Assistant Chatbot ready. Type 'exit' to quit.\n")
     while True:
         query = input("You: ").strip()
@@ -0,0 +1,151 @@
+# answer_cache.py
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(6 * 3600)))
+
+
+def normalize_query(query):
+    """ "Fee structure for UIET??" and "fee  structure for uiet" share one exact key """
+    return " ".join(re.sub(r"[^\w\s.]", " ", query.lower()).split()).strip(" .")
+
+
+def partition_key(*parts):
+    """ Everything besides the query that changes the prompt (profile text, department, ...) """
+    return hashlib.sha1("\x1f".join(str(p or "") for p in parts).encode("utf-8")).hexdigest()[:16]
+
+
+# Terms that make a different question while barely moving its embedding:
+# "fee for CSE" / "fee for ECE", "2nd year" / "3rd year", "B.Tech" / "M.Tech"
+ENTITY_TERMS = re.compile(
+    r"\b(?:(?:19|20)\d{2}(?:-\d{2,4})?"
+    r"|\d+(?:st|nd|rd|th)?"
+    r"|first|second|third|fourth|fifth|final"
+    r"|[bm]\.?(?:tech|sc|com|arch|des|pharm|phil)\b\.?"
+    r"|ph\.?d|mba|bba|bca|mca|llb|llm|ug|pg)\b",
+    re.IGNORECASE,
+)
+ACRONYM = re.compile(r"\b[A-Z]{2,6}\b")
+KNOWN_UNITS = {"uiet", "uibs", "uils", "uicet", "ssbuicet", "uiams", "uihtm", "dcsa", "ccet",
+               "cse", "ece", "eee", "mech", "civil", "biotech"}
+
+
+def query_entities(query):
+    """ Sorted entity terms of `query`; part of the partition, so only questions about the same ones share answers """
+    terms = {m.group().lower().replace(".", "") for m in ENTITY_TERMS.finditer(query)}
+    terms.update(word.lower() for word in ACRONYM.findall(query))
+    terms.update(word for word in re.findall(r"[a-z]+", query.lower()) if word in KNOWN_UNITS)
+    return " ".join(sorted(terms))
+
+
+# Replies that depend on the moment, not on the corpus
+UNGROUNDED = re.compile(r"could you (?:please )?clarify|couldn'?t (?:find|help)|could not (?:find|help)|^\W*⚠️",
+                        re.IGNORECASE)
+
+
+def should_cache(reply, context):
+    """ Only answers grounded in retrieved context are reused; never clarifications, refusals or link-only replies """
+    return bool(context and context.strip() and reply and reply.strip() and not UNGROUNDED.search(reply))
+
+
+class AnswerCache:
+    """
+    Response cache in front of the LLM.
+
+    A lookup first tries the exact normalized query, then the nearest cached
+    query embedding in the same partition (cosine >= threshold). Entries
+    expire after `ttl` seconds, the least recently used go first once
+    `max_entries` is reached, and the whole cache is dropped when the index
+    version changes, since answers built on old chunks may be stale.
+    """
+
+    def __init__(self, embed_fn, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL, max_entries=5000):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = None
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0,
+                      "expired": 0, "evicted": 0, "invalidations": 0}
+        self._entries = OrderedDict()   # (partition, normalized query) -> (expires, embedding, answer)
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._entries:
+                self.stats["invalidations"] += 1
+                print(f"🧹 Answer cache cleared: index {self.version} -> {version}")
+            self._entries.clear()
+            self.version = version
+
+    def get(self, query, partition, version):
+        """ (answer, embedding) on a hit, (None, embedding) on a miss; pass the embedding back to put() """
+        key = (partition, normalize_query(query))
+        now = time.time()
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                return entry[2], entry[1]
+
+        embedding = np.asarray(self.embed_fn(query), dtype=np.float32)
+        embedding /= max(np.linalg.norm(embedding), 1e-12)
+        with self._lock:
+            self._check_version(version)
+            best, best_score = None, self.threshold
+            for other, (expires, cached, _) in list(self._entries.items()):
+                if expires <= now:
+                    del self._entries[other]
+                    self.stats["expired"] += 1
+                elif other[0] == partition:
+                    score = float(cached @ embedding)
+                    if score >= best_score:
+                        best, best_score = other, score
+            if best is not None:
+                self._entries.move_to_end(best)
+                self.stats["semantic_hits"] += 1
+                return self._entries[best][2], embedding
+            self.stats["misses"] += 1
+        return None, embedding
+
+    def put(self, query, partition, version, answer, embedding):
+        with self._lock:
+            self._check_version(version)
+            self._entries[(partition, normalize_query(query))] = (time.time() + self.ttl, embedding, answer)
+            self._entries.move_to_end((partition, normalize_query(query)))
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evicted"] += 1
+
+    def report(self):
+        with self._lock:
+            lookups = self.stats["exact_hits"] + self.stats["semantic_hits"] + self.stats["misses"]
+            hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+            return {**self.stats, "entries": len(self._entries), "index_version": self.version,
+                    "hit_rate": round(hits / lookups, 3) if lookups else None}
+
+
+def register_cache_route(app, **caches):
+    """
+    GET /admin/cache: hit rates and counters of each named cache (anything
+    with .report(), or a function returning it), same access rule as /admin/index
+    """
+    from flask import jsonify, request
+    from index_manager import admin_allowed
+
+    @app.route("/admin/cache", methods=["GET"])
+    def cache_stats():
+        if not admin_allowed(request):
+            return jsonify({"error": "forbidden"}), 403
+        return jsonify({name: (cache() if callable(cache) else cache).report() for name, cache in caches.items()})
@@ -1,9 +1,11 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from rag_pipeline import generate_answer   # import from step 1
+from rag_pipeline import generate_answer, startup   # import from step 1
+from startup import register_health_route
 
 app = Flask(__name__)
 CORS(app)  # allow frontend to call backend
+register_health_route(app, startup)  # /healthz: 503 until the models are loaded and warm
 
 @app.route("/", methods=["GET"])
 def home():
@@ -33,4 +35,5 @@ def chat():
         })
 
 if __name__ == '__main__':
+    startup.start()
     app.run(port=5000)
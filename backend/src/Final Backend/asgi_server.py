@@ -0,0 +1,122 @@
+# asgi_server.py
+
+import importlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+
+from llm_steps import arun_steps, astream_steps, sse
+
+# Async serving mode for the chat engines. Same /api/chat, /api/chat/stream,
+# /files/<path> and /healthz contract as their Flask apps, but a request only holds a thread
+# while it embeds / retrieves / reranks: the Groq call is awaited, so hundreds
+# of chats can wait on the LLM at once. Every other route (/admin/...) is
+# served by the engine's Flask app, mounted underneath.
+#
+#   uvicorn asgi_server:create_app --factory --port 5000      (CHAT_ENGINE=pipeline|rag_pipeline)
+#   python asgi_server.py --engine rag_pipeline
+
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", str(os.cpu_count() or 4)))
+
+
+def _pipeline_steps(engine, data):
+    query = (data.get("message") or "").strip()
+    if not query:
+        return None, {"reply": "Please type something."}
+    return engine.answer_steps(query, data.get("student_profile") or {}), None
+
+
+def _rag_pipeline_steps(engine, data):
+    query = data.get("message", "")
+    return engine.answer_steps(query, engine.initialize_pipeline(), data.get("student_profile", None)), None
+
+
+# engine module: (request body -> (answer steps, or an immediate reply), /files sent as attachment)
+ENGINES = {
+    "pipeline": (_pipeline_steps, True),
+    "rag_pipeline": (_rag_pipeline_steps, False),
+}
+
+
+def create_app(engine_name=None):
+    engine_name = engine_name or os.getenv("CHAT_ENGINE", "pipeline")
+    engine = importlib.import_module(engine_name)
+    steps_for, as_attachment = ENGINES[engine_name]
+    startup = engine.startup
+    # bounded: CPU-bound inference gains nothing from more threads than cores
+    pool = ThreadPoolExecutor(max_workers=INFERENCE_THREADS, thread_name_prefix="inference")
+    static_dir = os.path.abspath("static")
+
+    @asynccontextmanager
+    async def lifespan(app):
+        startup.start()
+        yield
+        pool.shutdown(wait=False)
+
+    app = FastAPI(lifespan=lifespan)
+    # same origins as the engine's Flask app, not a wider rule for the async mode
+    app.add_middleware(CORSMiddleware, allow_origins=engine.CORS_ORIGINS, allow_credentials=engine.CORS_CREDENTIALS,
+                       allow_methods=["*"], allow_headers=["*"])
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        data = await request.json()
+        if not startup.ready:
+            return JSONResponse({"reply": "⏳ The assistant is starting up, please try again in a few seconds.",
+                                 "follow_ups": []}, status_code=503)
+        steps, reply = steps_for(engine, data)
+        if reply is not None:
+            return reply
+        return await arun_steps(steps, engine.agroq_generate, pool)
+
+    @app.post("/api/chat/stream")
+    async def chat_stream(request: Request):
+        data = await request.json()
+        if not startup.ready:
+            return JSONResponse({"reply": "⏳ The assistant is starting up, please try again in a few seconds.",
+                                 "follow_ups": []}, status_code=503)
+        steps, reply = steps_for(engine, data)
+        if reply is not None:
+            events = iter([sse("done", reply)])
+        else:
+            events = astream_steps(steps, engine.agroq_stream, engine.answer_view(), pool)
+        return StreamingResponse(events, media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @app.get("/files/{filename:path}")
+    async def download_file(filename: str):
+        path = os.path.abspath(os.path.join(static_dir, filename))
+        if not path.startswith(static_dir + os.sep) or not os.path.isfile(path):
+            return JSONResponse({"error": "not found"}, status_code=404)
+        return FileResponse(path, filename=os.path.basename(path) if as_attachment else None)
+
+    @app.get("/healthz")
+    async def health():
+        return JSONResponse(startup.status(), status_code=200 if startup.ready else 503)
+
+    # /admin/index, /admin/cache, ... keep working through the Flask app
+    try:
+        from a2wsgi import WSGIMiddleware
+    except ImportError:
+        from starlette.middleware.wsgi import WSGIMiddleware
+
+    app.mount("/", WSGIMiddleware(engine.app))
+    return app
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve a chat engine with uvicorn (async Groq calls)")
+    parser.add_argument("--engine", choices=list(ENGINES), default=os.getenv("CHAT_ENGINE", "pipeline"))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.engine), host=args.host, port=args.port)
@@ -0,0 +1,177 @@
+# chunker.py
+
+import re
+from bisect import bisect_left
+
+# Preferred cut points, strongest first: headings / blank lines, then single
+# line breaks (table rows, list items), then sentence ends.
+BOUNDARY_PATTERNS = [
+    re.compile(r"\n\s*\n|\n(?=[A-Z0-9][A-Z0-9 &()\-:]{3,}\n)"),
+    re.compile(r"\n"),
+    re.compile(r"(?<=[.!?;])\s+"),
+]
+
+
+class Chunk:
+    """ A chunk is a [start, end) slice of the source text; text is cut only when read """
+
+    __slots__ = ("source", "start", "end", "parent")
+
+    def __init__(self, source, start, end, parent=None):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.parent = parent
+
+    @property
+    def text(self):
+        return self.source[self.start:self.end].strip()
+
+    def __repr__(self):
+        return f"Chunk({self.start}:{self.end}, parent={self.parent})"
+
+
+def _boundary_tokens(text, starts):
+    """ Token index where each preferred boundary begins, per priority level """
+    levels = []
+    for pattern in BOUNDARY_PATTERNS:
+        tokens = set()
+        for match in pattern.finditer(text):
+            tokens.add(bisect_left(starts, match.end()))
+        levels.append(sorted(tokens))
+    return levels
+
+
+def _split(offsets, levels, max_tokens, stride, min_tokens):
+    """ Token ranges [s, e) of at most max_tokens, ending on the strongest boundary available """
+    n = len(offsets)
+    spans = []
+    start = 0
+    while start < n:
+        limit = start + max_tokens
+        if limit >= n:
+            spans.append((start, n))
+            break
+
+        cut = None
+        for boundaries in levels:
+            # last boundary inside (start + min_tokens, limit]
+            i = bisect_left(boundaries, limit + 1) - 1
+            if i >= 0 and boundaries[i] > start + min_tokens:
+                cut = boundaries[i]
+                break
+
+        if cut is not None:
+            spans.append((start, cut))
+            start = cut
+        else:
+            # no structure to follow: hard cut with overlap, like the old chunker
+            spans.append((start, limit))
+            start = limit - stride
+    return spans
+
+
+def _to_chunks(text, offsets, spans, parent=None):
+    chunks = []
+    for s, e in spans:
+        chunk = Chunk(text, offsets[s][0], offsets[e - 1][1], parent)
+        if chunk.text:
+            chunks.append(chunk)
+    return chunks
+
+
+def chunk_documents(texts, tokenizer, max_tokens=512, stride=50, min_tokens=None,
+                    parent_tokens=None, batch_size=256):
+    """
+    Chunk many documents with one batched tokenizer call per `batch_size` texts.
+
+    Cuts are made on the tokenizer's offset mapping, so every chunk is a slice
+    of the original text (original casing and spacing) rather than decoded
+    tokens, and they prefer heading, paragraph, table-row and sentence
+    boundaries. With `parent_tokens`, documents are first split into parent
+    windows of that size and each `max_tokens` retrieval chunk records the
+    index of its parent window in `chunk.parent`.
+
+    Returns a list per document: chunks, or (parents, chunks) with parent_tokens.
+    Requires a fast (Rust) tokenizer for offset mappings.
+    """
+    min_tokens = max_tokens // 4 if min_tokens is None else min_tokens
+    results = []
+    for i in range(0, len(texts), batch_size):
+        batch = [t if isinstance(t, str) else "" for t in texts[i:i + batch_size]]
+        encoded = tokenizer(batch, add_special_tokens=False, truncation=False,
+                            return_offsets_mapping=True, return_attention_mask=False)
+        for text, offsets in zip(batch, encoded["offset_mapping"]):
+            if not offsets:
+                results.append(([], []) if parent_tokens else [])
+                continue
+            starts = [s for s, _ in offsets]
+            levels = _boundary_tokens(text, starts)
+
+            if not parent_tokens:
+                results.append(_to_chunks(text, offsets, _split(offsets, levels, max_tokens, stride, min_tokens)))
+                continue
+
+            parents, children = [], []
+            for s, e in _split(offsets, levels, parent_tokens, 0, parent_tokens // 4):
+                parent = Chunk(text, offsets[s][0], offsets[e - 1][1])
+                if not parent.text:
+                    continue
+                sub_levels = [[b - s for b in level if s < b < e] for level in levels]
+                sub_spans = _split(offsets[s:e], sub_levels, max_tokens, stride, min_tokens)
+                children.extend(_to_chunks(text, offsets[s:e], sub_spans, parent=len(parents)))
+                parents.append(parent)
+            results.append((parents, children))
+    return results
+
+
+def chunk_text(text, tokenizer, max_tokens=512, stride=50):
+    """ Drop-in replacement for chunk_text_token_based: list of chunk strings """
+    return [c.text for c in chunk_documents([text], tokenizer, max_tokens, stride)[0]]
+
+
+# ---------------------------
+# BENCHMARK
+# ---------------------------
+if __name__ == "__main__":
+    import argparse
+    import csv
+    import glob
+    import os
+    import sys
+    import time
+
+    from transformers import AutoTokenizer
+
+    from db_creation import chunk_text_token_based
+
+    parser = argparse.ArgumentParser(description="Benchmark chunker.py against chunk_text_token_based")
+    parser.add_argument("--data", default=os.path.join("..", "Scraping", "raw_site_data", "pu_scraped_part_*.csv"))
+    parser.add_argument("--tokenizer", default="bert-base-uncased")
+    parser.add_argument("--limit", type=int, default=0, help="only use the first N pages")
+    args = parser.parse_args()
+
+    csv.field_size_limit(sys.maxsize)
+    texts = []
+    for path in sorted(glob.glob(args.data)):
+        with open(path, newline="", encoding="utf-8") as f:
+            texts.extend(row.get("Text") or row.get("text") or "" for row in csv.DictReader(f))
+    if args.limit:
+        texts = texts[:args.limit]
+    tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+    print(f"📄 {len(texts)} pages, {sum(map(len, texts)) / 1e6:.1f}M characters, tokenizer {args.tokenizer}")
+
+    t0 = time.perf_counter()
+    old = [chunk_text_token_based(t, tokenizer) for t in texts]
+    t1 = time.perf_counter()
+    new = chunk_documents(texts, tokenizer)
+    t2 = time.perf_counter()
+    new_parents = chunk_documents(texts, tokenizer, max_tokens=128, stride=16, parent_tokens=1024)
+    t3 = time.perf_counter()
+
+    old_count = sum(map(len, old))
+    new_count = sum(map(len, new))
+    child_count = sum(len(children) for _, children in new_parents)
+    print(f"old chunk_text_token_based: {t1 - t0:7.2f}s  {old_count} chunks")
+    print(f"chunk_documents:            {t2 - t1:7.2f}s  {new_count} chunks  ({(t1 - t0) / (t2 - t1):.1f}x faster)")
+    print(f"chunk_documents + parents:  {t3 - t2:7.2f}s  {child_count} retrieval chunks")
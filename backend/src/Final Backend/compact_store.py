@@ -0,0 +1,362 @@
+# compact_store.py
+
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+import numpy as np
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.vector_stores.simple import build_metadata_filter_fn
+from llama_index.core.vector_stores.types import BasePydanticVectorStore, VectorStoreQueryResult
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+
+DEFAULT_COMPACT_DIR = "./compact_index"
+REVISION_KEY = "index_revision"  # Chroma collection metadata, changed by every write to the index
+MODES = ("int8", "binary")
+BLOCK_ROWS = 16384  # first-pass scoring works on blocks to bound temporary memory
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+# ---------------------------
+# QUANTIZER
+# ---------------------------
+class Quantizer:
+    """
+    Maps float32 embeddings to compact codes: optional reduction to `dims`
+    (PCA, or Matryoshka-style truncation to the leading dimensions), then
+    int8 with a per-dimension scale or 1 bit per dimension.
+    """
+
+    def __init__(self, mode="int8", dims=None, pca=False):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        self.mode = mode
+        self.dims = dims
+        self.pca = pca
+        self.mean = None
+        self.components = None
+        self.scale = None
+        self.threshold = None
+
+    def fit(self, vectors, sample=20000, seed=0):
+        rng = np.random.default_rng(seed)
+        if len(vectors) > sample:
+            vectors = vectors[np.sort(rng.choice(len(vectors), sample, replace=False))]
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.dims = self.dims or vectors.shape[1]
+        if self.pca:
+            self.mean = vectors.mean(axis=0)
+            _, _, vt = np.linalg.svd(vectors - self.mean, full_matrices=False)
+            self.components = vt[:self.dims].astype(np.float32)
+
+        reduced = self.reduce(vectors)
+        if self.mode == "int8":
+            # clip the rare outliers instead of spending resolution on them
+            self.scale = np.maximum(np.percentile(np.abs(reduced), 99.9, axis=0), 1e-6).astype(np.float32) / 127
+        else:
+            self.threshold = np.median(reduced, axis=0).astype(np.float32)
+        return self
+
+    def reduce(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.pca:
+            reduced = (vectors - self.mean) @ self.components.T
+        else:
+            reduced = vectors[..., :self.dims]
+        return _normalize(reduced)
+
+    def encode(self, vectors):
+        reduced = self.reduce(vectors)
+        if self.mode == "int8":
+            return np.clip(np.rint(reduced / self.scale), -127, 127).astype(np.int8)
+        return np.packbits(reduced > self.threshold, axis=-1)
+
+    def scores(self, codes, query):
+        """ First-pass similarity of one float32 query against every code row """
+        reduced = self.reduce(query[None, :])[0]
+        out = np.empty(len(codes), dtype=np.float32)
+        if self.mode == "int8":
+            weights = reduced * self.scale
+            for i in range(0, len(codes), BLOCK_ROWS):
+                out[i:i + BLOCK_ROWS] = codes[i:i + BLOCK_ROWS] @ weights
+        else:
+            bits = np.packbits(reduced > self.threshold)
+            for i in range(0, len(codes), BLOCK_ROWS):
+                out[i:i + BLOCK_ROWS] = -POPCOUNT[codes[i:i + BLOCK_ROWS] ^ bits].sum(axis=1, dtype=np.int32)
+        return out
+
+    def save(self, path):
+        arrays = {k: v for k, v in (("mean", self.mean), ("components", self.components),
+                                    ("scale", self.scale), ("threshold", self.threshold)) if v is not None}
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path, mode, dims, pca):
+        quantizer = cls(mode, dims, pca)
+        with np.load(path) as data:
+            for name in ("mean", "components", "scale", "threshold"):
+                if name in data:
+                    setattr(quantizer, name, data[name])
+        return quantizer
+
+
+# ---------------------------
+# BUILD
+# ---------------------------
+def mark_revision(collection):
+    """ Record that `collection` changed; copies built from an older revision then refuse to load """
+    revision = uuid.uuid4().hex
+    collection.modify(metadata={**(collection.metadata or {}), REVISION_KEY: revision})
+    return revision
+
+
+def collection_revision(collection):
+    return (collection.metadata or {}).get(REVISION_KEY)
+
+
+def check_revision(path, meta, revision):
+    if meta.get("revision") != revision:
+        raise ValueError(f"{path} was built from index revision {meta.get('revision')}, but Chroma is at "
+                         f"{revision}; rebuild it after every index update")
+
+
+def export_collection(collection, batch_size=5000):
+    """ ids, float32 embeddings, texts and metadatas of a Chroma collection, page by page """
+    ids, vectors, texts, metadatas = [], [], [], []
+    for offset in range(0, collection.count(), batch_size):
+        page = collection.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+        ids.extend(page["ids"])
+        vectors.append(np.asarray(page["embeddings"], dtype=np.float32))
+        texts.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+    return ids, np.concatenate(vectors) if vectors else np.zeros((0, 0), np.float32), texts, metadatas
+
+
+def build_compact_index(out_dir, ids, vectors, texts, metadatas, mode="int8", dims=None, pca=False, revision=None):
+    """
+    Write a compact index directory: codes.npy (held in RAM for the first pass),
+    full.npy (float32, memory-mapped, only candidate rows are read for rescoring),
+    the quantizer and a SQLite table of node texts/metadata. `revision` is the
+    Chroma revision the vectors were exported at.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+    quantizer = Quantizer(mode, dims, pca).fit(vectors)
+
+    np.save(os.path.join(out_dir, "full.npy"), vectors)
+    np.save(os.path.join(out_dir, "codes.npy"), quantizer.encode(vectors))
+    quantizer.save(os.path.join(out_dir, "quantizer.npz"))
+
+    db_path = os.path.join(out_dir, "nodes.sqlite")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE nodes (row INTEGER PRIMARY KEY, node_id TEXT, text TEXT, metadata TEXT)")
+    conn.executemany("INSERT INTO nodes VALUES (?, ?, ?, ?)",
+                     [(i, ids[i], texts[i], json.dumps(metadatas[i] or {})) for i in range(len(ids))])
+    conn.commit()
+    conn.close()
+
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"mode": mode, "dims": quantizer.dims, "pca": pca,
+                   "count": len(ids), "dim": int(vectors.shape[1]), "revision": revision}, f)
+    return quantizer
+
+
+def rebuild_compact_index(out_dir, collection):
+    """ Rebuild an existing compact index from `collection` with the settings it was built with """
+    with open(os.path.join(out_dir, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    ids, vectors, texts, metadatas = export_collection(collection)
+    dims = meta["dims"] if meta["dims"] != meta["dim"] else None
+    build_compact_index(out_dir, ids, vectors, texts, metadatas, meta["mode"], dims, meta["pca"],
+                        collection_revision(collection))
+
+
+def allowed_rows(query, node_ids, metadatas):
+    """ Boolean mask of the rows left in by a query's filters, doc_ids and node_ids; None if unrestricted """
+    if query.filters is None and not query.doc_ids and not query.node_ids:
+        return None
+    matches = build_metadata_filter_fn(lambda row: metadatas[row], query.filters)
+    doc_ids = set(query.doc_ids or [])
+    wanted = set(query.node_ids or [])
+    return np.array([
+        matches(row) and (not doc_ids or metadatas[row].get("ref_doc_id") in doc_ids)
+        and (not wanted or node_ids[row] in wanted)
+        for row in range(len(node_ids))
+    ], dtype=bool)
+
+
+# ---------------------------
+# VECTOR STORE
+# ---------------------------
+class CompactVectorStore(BasePydanticVectorStore):
+    """
+    Read-only llama-index vector store over a compact index directory.
+    The first pass scores quantized codes and keeps `rescore_factor * k`
+    candidates, which are then rescored exactly against the float32 vectors.
+    Metadata filters are applied to the rows before the first pass. Given the
+    Chroma `revision`, a directory built from an older one refuses to load:
+    rebuild it from Chroma after re-indexing (index_update.py does).
+    """
+
+    stores_text: bool = True
+    rescore_factor: int = 10
+
+    _codes = PrivateAttr()
+    _full = PrivateAttr()
+    _quantizer = PrivateAttr()
+    _conn = PrivateAttr()
+    _meta = PrivateAttr()
+    _rows = PrivateAttr(default=None)
+
+    def __init__(self, path=DEFAULT_COMPACT_DIR, rescore_factor=10, revision=None, **kwargs):
+        super().__init__(rescore_factor=rescore_factor, **kwargs)
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self._meta = json.load(f)
+        if revision is not None:
+            check_revision(path, self._meta, revision)
+        self._codes = np.load(os.path.join(path, "codes.npy"))
+        self._full = np.load(os.path.join(path, "full.npy"), mmap_mode="r")
+        self._quantizer = Quantizer.load(os.path.join(path, "quantizer.npz"),
+                                         self._meta["mode"], self._meta["dims"], self._meta["pca"])
+        self._conn = sqlite3.connect(os.path.join(path, "nodes.sqlite"), check_same_thread=False)
+
+    @classmethod
+    def class_name(cls):
+        return "CompactVectorStore"
+
+    @property
+    def client(self):
+        return None
+
+    def memory_report(self):
+        compact = self._codes.nbytes
+        full = self._meta["count"] * self._meta["dim"] * 4
+        return (f"{self._meta['mode']} codes, {self._meta['dims']} dims: {compact / 1e6:.1f} MB in RAM "
+                f"vs {full / 1e6:.1f} MB float32 ({full / max(compact, 1):.0f}x smaller)")
+
+    def search(self, query_embedding, k, allowed=None):
+        """ Row indices and exact cosine similarities of the top k (among `allowed` rows), best first """
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+        n = len(self._codes) if allowed is None else int(allowed.sum())
+        if n == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        k = min(k, n)
+        first = self._quantizer.scores(self._codes, query)
+        if allowed is not None:
+            first[~allowed] = -np.inf
+        candidates = min(n, max(k * self.rescore_factor, k))
+        rows = np.sort(np.argpartition(-first, candidates - 1)[:candidates])
+        exact = self._full[rows] @ query
+        best = np.argsort(-exact)[:k]
+        return rows[best], exact[best]
+
+    def _all_rows(self):
+        # node ids and metadata of every row, parsed once, for filtered queries
+        if self._rows is None:
+            rows = self._conn.execute("SELECT node_id, metadata FROM nodes ORDER BY row").fetchall()
+            self._rows = ([node_id for node_id, _ in rows], [json.loads(metadata) for _, metadata in rows])
+        return self._rows
+
+    def query(self, query, **kwargs):
+        allowed = None
+        if query.filters is not None or query.doc_ids or query.node_ids:
+            allowed = allowed_rows(query, *self._all_rows())
+        rows, scores = self.search(query.query_embedding, query.similarity_top_k, allowed)
+        found = {}
+        for row in rows.tolist():
+            found[row] = self._conn.execute("SELECT node_id, text, metadata FROM nodes WHERE row=?", (row,)).fetchone()
+
+        nodes, ids = [], []
+        for row in rows.tolist():
+            node_id, text, metadata = found[row]
+            node = metadata_dict_to_node(json.loads(metadata), text=text)
+            nodes.append(node)
+            ids.append(node_id)
+        return VectorStoreQueryResult(nodes=nodes, similarities=scores.tolist(), ids=ids)
+
+    def add(self, nodes, **kwargs):
+        raise NotImplementedError("CompactVectorStore is read-only; rebuild it with compact_store.py build")
+
+    def delete(self, ref_doc_id, **delete_kwargs):
+        raise NotImplementedError("CompactVectorStore is read-only; rebuild it with compact_store.py build")
+
+
+# ---------------------------
+# RECALL CHECK
+# ---------------------------
+def recall_at_k(store, queries, k=3):
+    """ Mean recall@k of the compact search against exact float32 search, and the exact-match rate """
+    full = store._full
+    recall = 0.0
+    same = 0
+    for query in queries:
+        query = _normalize(np.asarray(query, dtype=np.float32))
+        exact = np.argsort(-(full @ query))[:k]
+        rows, _ = store.search(query, k)
+        recall += len(set(rows.tolist()) & set(exact.tolist())) / k
+        same += rows.tolist() == exact.tolist()
+    return recall / len(queries), same / len(queries)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or evaluate a quantized vector index from Chroma")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("--persist-dir", default="./chroma_db")
+    build.add_argument("--collection", default="rag-collection")
+    build.add_argument("--out", default=DEFAULT_COMPACT_DIR)
+    build.add_argument("--mode", choices=MODES, default="int8")
+    build.add_argument("--dims", type=int, help="keep this many dimensions")
+    build.add_argument("--pca", action="store_true", help="reduce with PCA instead of truncating")
+    evaluate = sub.add_parser("eval")
+    evaluate.add_argument("--dir", default=DEFAULT_COMPACT_DIR)
+    evaluate.add_argument("--queries", help="text file with one question per line (default: sampled chunks)")
+    evaluate.add_argument("--samples", type=int, default=200)
+    evaluate.add_argument("--k", type=int, nargs="+", default=[1, 3, 10])
+    evaluate.add_argument("--rescore-factor", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        import chromadb
+
+        started = time.perf_counter()
+        collection = chromadb.PersistentClient(path=args.persist_dir).get_or_create_collection(args.collection)
+        ids, vectors, texts, metadatas = export_collection(collection)
+        build_compact_index(args.out, ids, vectors, texts, metadatas, args.mode, args.dims, args.pca,
+                            collection_revision(collection))
+        store = CompactVectorStore(args.out)
+        print(f"✅ Built {args.out} from {len(ids)} vectors in {time.perf_counter() - started:.1f}s")
+        print(f"💾 {store.memory_report()}")
+    else:
+        store = CompactVectorStore(args.dir, rescore_factor=args.rescore_factor)
+        if args.queries:
+            from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+            from embedding_stage import EMBED_MODEL_NAME
+
+            with open(args.queries, "r", encoding="utf-8") as f:
+                questions = [line.strip() for line in f if line.strip()]
+            embed_model = HuggingFaceEmbedding(model_name=EMBED_MODEL_NAME)
+            queries = [embed_model.get_query_embedding(q) for q in questions]
+        else:
+            rng = np.random.default_rng(0)
+            rows = rng.choice(len(store._full), min(args.samples, len(store._full)), replace=False)
+            # perturbed chunk vectors stand in for questions about them
+            queries = _normalize(store._full[np.sort(rows)] + rng.normal(0, 0.03, (len(rows), store._full.shape[1])))
+        print(f"💾 {store.memory_report()}")
+        for k in args.k:
+            started = time.perf_counter()
+            recall, same = recall_at_k(store, queries, k)
+            per_query = (time.perf_counter() - started) / len(queries) * 1000
+            print(f"recall@{k}: {recall:.3f}  identical top-{k}: {same * 100:.1f}%  ({per_query:.1f} ms/query incl. exact baseline)")
@@ -1,7 +1,9 @@
 # pdf_to_index.py
 
 import os
+import sys
 import json
+import sqlite3
 import pandas as pd
 import re
 import neattext.functions as nfx
@@ -12,6 +14,16 @@ from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.core.node_parser import SimpleNodeParser
 from chromadb import PersistentClient
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Scraping", "scripts"))
+from corpus_store import CorpusStore  # noqa: E402
+from dedup import NearDuplicateIndex, StoredDuplicateIndex, deduplicate  # noqa: E402
+
+from chunker import chunk_documents
+from embedding_stage import EMBED_MODEL_NAME, embed_nodes
+from table_store import TableStore
+from lexical_index import LEXICAL_FILE, build_from_collection
+from compact_store import mark_revision
+
 # 1. Load and flatten JSON data
 def load_json_to_dataframe(filepath: str) -> pd.DataFrame:
     with open(filepath, "r", encoding="utf-8") as f:
@@ -21,6 +33,7 @@ def load_json_to_dataframe(filepath: str) -> pd.DataFrame:
     for doc in raw_data:
         for page in doc["content"]:
             records.append({
+                "url": doc.get("url", doc["pdf_file"]),
                 "pdf_file": doc["pdf_file"],
                 "page_number": page["page_number"],
                 "text": page.get("text", "").strip(),
@@ -29,12 +42,42 @@ def load_json_to_dataframe(filepath: str) -> pd.DataFrame:
 
     return pd.DataFrame(records)
 
+# 1b. Stream PDF pages from the corpus store, one batch-sized DataFrame at a time
+CORPUS_COLUMNS = ["url", "filename", "page_number", "text", "tables", "source_type"]
+
+def prepare_corpus_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    frame["pdf_file"] = frame["filename"].fillna(frame["url"])
+    frame["text"] = frame["text"].fillna("").str.strip()
+    # web pages have no page number
+    frame["page_number"] = frame["page_number"].fillna(0).astype(int)
+    frame["tables"] = frame["tables"].apply(lambda t: json.loads(t) if isinstance(t, str) else [])
+    return frame[["url", "pdf_file", "page_number", "text", "tables", "source_type"]]
+
+def iter_corpus_dataframes(store_dir: str, source_type: str = "pdf"):
+    store = CorpusStore(store_dir)
+    for frame in store.iter_frames(columns=CORPUS_COLUMNS, source_type=source_type):
+        yield prepare_corpus_frame(frame)
+    store.close()
+
+# 1c. Stable document ID: the page URL, or the PDF URL plus page number
+def stable_doc_id(url: str, page_number: int) -> str:
+    return f"{url}#page={page_number}" if page_number else url
+
+# 1d. Stable node ID for SimpleNodeParser(id_func=...): the chunk's Document ID plus its split number
+def stable_node_id(i: int, document) -> str:
+    return f"{document.id_}#{i}"
+
 # 2. Clean text content
 def clean_text(text: str) -> str:
     if not isinstance(text, str):
         return ""
     text = nfx.remove_multiple_spaces(text)
-    text = re.sub(r'\s+', ' ', re.sub(r'[^A-Za-z0-9\-\(\)\s]', ' ', text))
+    # sentence punctuation stays: the chunker's sentence boundaries (chunker.py) match on it
+    text = re.sub(r'[^A-Za-z0-9\-\(\)\s.,;:!?&]', ' ', text)
+    # keep line and paragraph breaks: the chunker cuts on them
+    text = re.sub(r'[^\S\n]+', ' ', text)
+    text = re.sub(r' ?\n[\s]*\n\s*', '\n\n', text)
+    text = re.sub(r' ?\n ?', '\n', text)
     return text.strip()
 
 # 3. Flatten tables into readable format
@@ -54,9 +97,10 @@ def flatten_tables_verbose(tables) -> str:
             )
             flat.append(row_text)
     
-    return " ".join(flat)
+    # one row per line, so chunks end on row boundaries
+    return "\n".join(flat)
 
-# 4. Chunk text based on token length
+# 4. Chunk text based on token length (kept as the baseline for chunker.py's benchmark)
 def chunk_text_token_based(text, tokenizer, max_tokens=512, stride=50):
     tokens = tokenizer.encode(text, add_special_tokens=False, truncation=False)
     chunks = []
@@ -69,69 +113,172 @@ def chunk_text_token_based(text, tokenizer, max_tokens=512, stride=50):
         start += max_tokens - stride
     return chunks
 
-# 5. Main processing and indexing function
-def process_and_index(filepath: str, tokenizer):
-    # Load and clean data
-    df = load_json_to_dataframe(filepath)
+# 5. Clean, chunk and wrap one DataFrame of pages as Documents
+def build_documents(df: pd.DataFrame, tokenizer, parent_tokens=None):
+    df = df.copy()
     df['cleaned_text'] = df['text'].apply(clean_text)
     df['tables_text'] = df['tables'].apply(flatten_tables_verbose)
     
-    # Chunk the text and table data
-    df['chunks'] = df['cleaned_text'].apply(lambda x: chunk_text_token_based(x, tokenizer))
-    df['chunks_table'] = df['tables_text'].apply(lambda x: chunk_text_token_based(x, tokenizer))
+    # Chunk the text and table data: one batched tokenizer pass per column,
+    # chunks are slices of the cleaned text cut on line/paragraph/row boundaries
+    for column, source in (('chunks', 'cleaned_text'), ('chunks_table', 'tables_text')):
+        chunks = chunk_documents(df[source].tolist(), tokenizer, parent_tokens=parent_tokens)
+        df[column] = pd.Series(chunks, index=df.index, dtype=object)
+
+    documents = []
+    for idx, row in df.iterrows():
+        # IDs survive CSV reordering, so a page's chunks can be replaced in place later
+        doc_id = stable_doc_id(row["url"], int(row["page_number"]))
+        for chunk_type in ("text", "table"):
+            chunks = row['chunks' if chunk_type == "text" else 'chunks_table']
+            parents = []
+            if parent_tokens:
+                parents, chunks = chunks
+            for i, chunk in enumerate(chunks):
+                metadata = {
+                    "source": row["pdf_file"],
+                    # not "doc_id": llama-index overwrites that key with ref_doc_id in the vector store
+                    "source_id": doc_id,
+                    "source_url": row["url"],
+                    "page_number": int(row["page_number"]),
+                    "chunk_type": chunk_type,
+                    "chunk_id": f"{chunk_type}_{i}",
+                    # a rebuild of one source type replaces only that type's chunks
+                    "source_type": row.get("source_type", "pdf")
+                }
+                document = Document(id_=f"{doc_id}::{chunk_type}_{i}", text=chunk.text, metadata=metadata)
+                document.excluded_embed_metadata_keys.append("source_type")
+                document.excluded_llm_metadata_keys.append("source_type")
+                if parents:
+                    # small chunk is embedded, its surrounding window is what the LLM reads
+                    metadata["parent_id"] = f"{doc_id}::{chunk_type}_parent_{chunk.parent}"
+                    metadata["parent_text"] = parents[chunk.parent].text
+                    document.excluded_embed_metadata_keys.extend(["parent_id", "parent_text"])
+                    document.excluded_llm_metadata_keys.extend(["parent_id", "parent_text"])
+                documents.append(document)
+    return documents
+
+# 5b. Drop near-duplicate pages and chunks before they are embedded;
+# index_update passes indexes pre-seeded with what is already in the index
+def page_dedup_text(text: str, tables) -> str:
+    return text + "\n" + flatten_tables_verbose(tables)
+
+def doc_url(doc_id: str) -> str:
+    return doc_id.split("#page=")[0]
+
+def deduplicate_pages(df: pd.DataFrame, page_index) -> pd.DataFrame:
+    # keyed by URL: PDFs with the same filename at different URLs are different pages;
+    # tables count too, so a page is never dropped together with tables its twin lacks
+    kept = deduplicate(df.itertuples(), page_index, key=lambda row: stable_doc_id(row.url, int(row.page_number)),
+                       text=lambda row: page_dedup_text(row.text, row.tables))
+    return df.loc[[row.Index for row in kept]]
+
+def chunk_key(doc) -> tuple:
+    return stable_doc_id(doc.metadata["source_url"], doc.metadata["page_number"]), doc.metadata["chunk_id"]
+
+def deduplicate_documents(frames, tokenizer, threshold=0.85, page_index=None, chunk_index=None):
+    page_index = page_index if page_index is not None else NearDuplicateIndex(threshold=threshold)
+    chunk_index = chunk_index if chunk_index is not None else NearDuplicateIndex(threshold=threshold)
+    kept = {}
+    for df in frames:
+        documents = build_documents(deduplicate_pages(df, page_index), tokenizer)
+        for doc in deduplicate(documents, chunk_index, key=chunk_key, text=lambda doc: doc.text):
+            kept[chunk_key(doc)] = doc
+
+    documents = []
+    for key, doc in kept.items():
+        # URLs of the copies folded into this chunk or into its whole page
+        aliases = [doc_url(alias[0]) for alias in chunk_index.aliases.get(key, [])]
+        aliases += [doc_url(alias) for alias in page_index.aliases.get(key[0], [])]
+        aliases = [a for a in dict.fromkeys(aliases) if a != doc.metadata["source_url"]]
+        if aliases:
+            # Chroma metadata must be flat, and the alias list should not affect the embedding
+            doc.metadata["aliases"] = " | ".join(aliases)
+            doc.excluded_embed_metadata_keys.append("aliases")
+            doc.excluded_llm_metadata_keys.append("aliases")
+        documents.append(doc)
 
-    # Create embedding model
-    embed_model = HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    print(f"🧹 {page_index.report('pages')}")
+    print(f"🧹 {chunk_index.report('chunks')}")
+    return documents
+
+# 5c. Signatures of the indexed pages and chunks, kept next to the index so
+# index_update deduplicates against it without MinHashing the corpus again
+DEDUP_FILE = "dedup.sqlite"
+
+def open_dedup_store(index_dir: str):
+    conn = sqlite3.connect(os.path.join(index_dir, DEDUP_FILE))
+    pages = StoredDuplicateIndex(conn, "pages", doc_url)
+    chunks = StoredDuplicateIndex(conn, "chunks", lambda key: doc_url(key[0]))
+    return conn, pages, chunks
+
+# 6. Main processing and indexing function
+def process_and_index(filepath: str, tokenizer, source_type: str = "pdf"):
+    # Load and clean data; a directory is read as a corpus store, batch by batch
+    if os.path.isdir(filepath):
+        frames = iter_corpus_dataframes(filepath, source_type)
+    else:
+        frames = [load_json_to_dataframe(filepath).assign(source_type=source_type)]
+
+    # Fee/seat tables also go to the table store, so lookups can be answered from rows
+    tables = TableStore()
+
+    def store_tables(frames):
+        for df in frames:
+            tables.add_frame(df)
+            yield df
+
+    page_index, chunk_index = NearDuplicateIndex(), NearDuplicateIndex()
+    documents = deduplicate_documents(tqdm(store_tables(frames), desc="📄 Creating documents"), tokenizer,
+                                      page_index=page_index, chunk_index=chunk_index)
+    print(f"📊 Table store holds {len(tables)} fee/seat rows")
+    tables.close()
+
+    # Create embedding model (used by the index for queries; chunks are embedded below)
+    embed_model = HuggingFaceEmbedding(model_name=EMBED_MODEL_NAME)
 
     # Setup Chroma vector store
     persist_dir = "./chroma_db2"
     client = PersistentClient(path=persist_dir)
     collection = client.get_or_create_collection("rag-collection")
+    # the pdf and site runs share the collection: a rerun replaces its own source type's chunks
+    replaced = collection.get(where={"source_type": source_type}, include=["metadatas"])["metadatas"]
+    collection.delete(where={"source_type": source_type})
     vector_store = ChromaVectorStore(chroma_collection=collection, persist_dir=persist_dir)
 
     # Storage context
     storage_context = StorageContext.from_defaults(vector_store=vector_store)
 
-    # Create Documents
-    documents = []
-    for idx, row in tqdm(df.iterrows(), total=len(df), desc="📄 Creating documents"):
-        for i, chunk in enumerate(row['chunks']):
-            documents.append(Document(
-                text=chunk,
-                metadata={
-                    "source": row["pdf_file"],
-                    "chunk_type": "text",
-                    "chunk_id": f"text_{i}"
-                }
-            ))
-        for j, chunk in enumerate(row['chunks_table']):
-            documents.append(Document(
-                text=chunk,
-                metadata={
-                    "source": row["pdf_file"],
-                    "chunk_type": "table",
-                    "chunk_id": f"table_{j}"
-                }
-            ))
-
-    # Parse and embed documents
-    parser = SimpleNodeParser()
-    nodes = []
-    for doc in tqdm(documents, desc="📄 Parsing documents"):
-        nodes.extend(parser.get_nodes_from_documents([doc]))
+    # Parse all documents in one pass, then embed in sorted, multi-process batches
+    parser = SimpleNodeParser(id_func=stable_node_id)
+    nodes = parser.get_nodes_from_documents(documents, show_progress=True)
+    # the other source type's chunks stay in the collection, so their cached embeddings stay too
+    embed_nodes(nodes, keep=collection.get(include=["documents"])["documents"])
 
-    for node in tqdm(nodes, desc="🔍 Embedding nodes"):
-        node.embedding = embed_model.get_text_embedding(node.text)
-
-    # Build index
+    # Build index; nodes already carry embeddings, so this only bulk-upserts them
     index = VectorStoreIndex(
         nodes,
         storage_context=storage_context,
-        embed_model=embed_model
+        embed_model=embed_model,
+        insert_batch_size=4096
     )
 
-    # Persist the index
+    # Persist the index; copies exported from the old contents (compact_store.py) now refuse to load
     index.storage_context.persist(persist_dir="./index2")
+    mark_revision(collection)
+
+    # Dedup signatures of this run replace those of the chunks it replaced
+    conn, stored_pages, stored_chunks = open_dedup_store("./index2")
+    for url in {meta["source_url"] for meta in replaced}:
+        stored_pages.forget(url)
+        stored_chunks.forget(url)
+    stored_pages.save(page_index)
+    stored_chunks.save(chunk_index)
+    conn.commit()
+    conn.close()
+
+    # BM25 side of hybrid retrieval, over every chunk in the collection (both source types)
+    build_from_collection(os.path.join("./index2", LEXICAL_FILE), collection)
 
     print(f"\n✅ Index created and persisted with {len(nodes)} nodes.")
 
@@ -140,4 +287,10 @@ if __name__ == "__main__":
     from transformers import AutoTokenizer
     tokenizer = AutoTokenizer.from_pretrained("bert-base-uncased")
 
-    process_and_index("pdf_data.json", tokenizer)
+    # pass a corpus store directory (e.g. "../Scraping/scripts/corpus") to index from the store,
+    # optionally followed by "site" to index scraped web pages instead of PDFs
+    process_and_index(
+        sys.argv[1] if len(sys.argv) > 1 else "pdf_data.json",
+        tokenizer,
+        sys.argv[2] if len(sys.argv) > 2 else "pdf",
+    )
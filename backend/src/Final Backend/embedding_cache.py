@@ -0,0 +1,177 @@
+# embedding_cache.py
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_cache")
+SQL_BATCH = 900  # stay under SQLite's bound-parameter limit
+
+
+def normalize_chunk(text):
+    return " ".join(text.split())
+
+
+def chunk_key(model_name, text):
+    return hashlib.sha256(f"{model_name}\0{normalize_chunk(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed store of chunk embeddings, keyed by (model name,
+    normalized chunk text hash). Vectors live in one append-only array file
+    (float16 by default) that is memory-mapped for reads; a SQLite index maps
+    keys to rows and remembers when each entry was last used. Entries the
+    latest build did not use are evicted, or by age when that set is unknown. Every indexing entry point shares the same directory.
+    """
+
+    def __init__(self, model_name, root=DEFAULT_CACHE_DIR, dtype="float16"):
+        self.model_name = model_name
+        self.dir = os.path.join(root, re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name))
+        os.makedirs(self.dir, exist_ok=True)
+        self.vectors_path = os.path.join(self.dir, "vectors.bin")
+        self.meta_path = os.path.join(self.dir, "meta.json")
+
+        self.dtype = np.dtype(dtype)
+        self.dim = None
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dtype = np.dtype(meta["dtype"])
+            self.dim = meta["dim"]
+
+        self.conn = sqlite3.connect(os.path.join(self.dir, "index.sqlite"))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, row INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _rows(self):
+        if self.dim is None or not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (self.dim * self.dtype.itemsize)
+
+    def _matrix(self):
+        rows = self._rows()
+        if rows == 0:
+            return None
+        return np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dim))
+
+    def lookup(self, texts):
+        """
+        Returns (vectors, missing): a float32 array with cached rows filled in
+        (None if nothing is cached yet) and the indices of texts that still need embedding.
+        """
+        keys = [chunk_key(self.model_name, t) for t in texts]
+        found = {}
+        for i in range(0, len(keys), SQL_BATCH):
+            batch = keys[i:i + SQL_BATCH]
+            found.update(self.conn.execute(
+                f"SELECT key, row FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch
+            ).fetchall())
+
+        matrix = self._matrix()
+        if matrix is None or not found:
+            self.misses += len(texts)
+            return None, list(range(len(texts)))
+
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        missing = []
+        hit_positions, hit_rows = [], []
+        for i, key in enumerate(keys):
+            if key in found:
+                hit_positions.append(i)
+                hit_rows.append(found[key])
+            else:
+                missing.append(i)
+        vectors[hit_positions] = matrix[hit_rows]
+
+        now = time.time()
+        self.conn.executemany("UPDATE entries SET last_used=? WHERE key=?", [(now, keys[i]) for i in hit_positions])
+        self.conn.commit()
+        self.hits += len(hit_positions)
+        self.misses += len(missing)
+        return vectors, missing
+
+    def add(self, texts, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(texts) == 0:
+            return
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            with open(self.meta_path, "w", encoding="utf-8") as f:
+                json.dump({"model_name": self.model_name, "dim": self.dim, "dtype": self.dtype.name}, f)
+
+        # duplicates inside one batch share a single row
+        new_keys = {}
+        for text, vector in zip(texts, vectors):
+            new_keys.setdefault(chunk_key(self.model_name, text), vector)
+        existing = set()
+        keys = list(new_keys)
+        for i in range(0, len(keys), SQL_BATCH):
+            batch = keys[i:i + SQL_BATCH]
+            existing.update(k for (k,) in self.conn.execute(
+                f"SELECT key FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch
+            ))
+        keys = [k for k in keys if k not in existing]
+        if not keys:
+            return
+
+        start = self._rows()
+        with open(self.vectors_path, "ab") as f:
+            f.write(np.stack([new_keys[k] for k in keys]).astype(self.dtype).tobytes())
+        now = time.time()
+        self.conn.executemany(
+            "INSERT INTO entries(key, row, last_used) VALUES (?, ?, ?)",
+            [(k, start + i, now) for i, k in enumerate(keys)],
+        )
+        self.conn.commit()
+
+    def evict(self, keep=None, older_than_days=30):
+        """
+        Drop entries the latest build did not use and compact the vector file.
+        `keep` is every chunk text the index holds after that build; without it,
+        entries no build has used for `older_than_days` are dropped instead.
+        """
+        entries = self.conn.execute("SELECT key, row, last_used FROM entries ORDER BY row").fetchall()
+        if keep is not None:
+            used = {chunk_key(self.model_name, text) for text in keep}
+            live = [entry for entry in entries if entry[0] in used]
+        else:
+            cutoff = time.time() - older_than_days * 86400
+            live = [entry for entry in entries if entry[2] >= cutoff]
+        stale = len(entries) - len(live)
+        if stale == 0:
+            return 0
+
+        matrix = self._matrix()
+        tmp_path = self.vectors_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            if live:
+                f.write(np.asarray(matrix[[row for _, row, _ in live]]).tobytes())
+        del matrix
+        os.replace(tmp_path, self.vectors_path)
+
+        self.conn.execute("DELETE FROM entries")
+        self.conn.executemany("INSERT INTO entries(key, row, last_used) VALUES (?, ?, ?)",
+                              [(key, i, last_used) for i, (key, _, last_used) in enumerate(live)])
+        self.conn.commit()
+        return stale
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"{self.hits}/{total} chunks from cache ({rate:.1f}%), {len(self)} entries stored"
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,101 @@
+# embedding_stage.py
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+EMBED_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+_worker_model = None
+
+
+def _load_model(model_name, threads):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads)
+    return SentenceTransformer(model_name, device="cpu")
+
+
+def _init_worker(model_name, threads):
+    global _worker_model
+    _worker_model = _load_model(model_name, threads)
+
+
+def _encode_batch(texts):
+    # normalized like HuggingFaceEmbedding, so vectors match the query side
+    return _worker_model.encode(texts, batch_size=len(texts), normalize_embeddings=True,
+                                convert_to_numpy=True, show_progress_bar=False).astype(np.float32)
+
+
+def embed_texts(texts, model_name=EMBED_MODEL_NAME, batch_size=64, workers=None, cache=None):
+    """
+    Embed `texts` and return a float32 array in the original order.
+
+    Texts are sorted by length before batching so each padded batch holds
+    similar-length chunks, and batches are spread over CPU worker processes,
+    each loading the model once with its share of the cores. With a `cache`,
+    only chunks whose text has not been embedded before reach the model.
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    if cache is not None:
+        cached, missing = cache.lookup(texts)
+        if missing:
+            fresh = embed_texts([texts[i] for i in missing], model_name, batch_size, workers)
+            cache.add([texts[i] for i in missing], fresh)
+            if cached is None:
+                cached = np.zeros((len(texts), fresh.shape[1]), dtype=np.float32)
+            cached[missing] = fresh
+        print(f"💾 Embedding cache: {cache.summary()}")
+        return cached
+
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or cpus // 2 or 1, cpus))
+    threads = max(1, cpus // workers)
+
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+    started = time.perf_counter()
+    if workers == 1:
+        _init_worker(model_name, threads)
+        results = [_encode_batch([texts[i] for i in batch]) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_name, threads)) as pool:
+            results = list(pool.map(_encode_batch, [[texts[i] for i in batch] for batch in batches]))
+
+    vectors = np.empty((len(texts), results[0].shape[1]), dtype=np.float32)
+    for batch, result in zip(batches, results):
+        vectors[batch] = result
+
+    elapsed = time.perf_counter() - started
+    print(f"🔍 Embedded {len(texts)} chunks in {elapsed:.1f}s "
+          f"({len(texts) / elapsed if elapsed else 0:.1f} chunks/s, {workers} workers x {threads} threads)")
+    return vectors
+
+
+def embed_nodes(nodes, model_name=EMBED_MODEL_NAME, batch_size=64, workers=None, use_cache=True, keep=()):
+    """
+    Fill `node.embedding` for every node with the batched embedding stage.
+    `keep` is the text of the indexed chunks that stay besides `nodes`; cache
+    entries for any other text are evicted once the nodes are embedded.
+    """
+    cache = EmbeddingCache(model_name) if use_cache else None
+    vectors = embed_texts([node.text for node in nodes],
+                          model_name=model_name, batch_size=batch_size, workers=workers, cache=cache)
+    for node, vector in zip(nodes, vectors):
+        node.embedding = vector.tolist()
+
+    if cache is not None:
+        evicted = cache.evict(keep=[node.text for node in nodes] + list(keep))
+        if evicted:
+            print(f"🧹 Evicted {evicted} embeddings the index no longer uses")
+        cache.close()
+    return nodes
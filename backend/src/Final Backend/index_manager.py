@@ -0,0 +1,243 @@
+# index_manager.py
+
+import hmac
+import os
+import shutil
+import threading
+import time
+
+DEFAULT_INDEX_ROOT = os.getenv("INDEX_ROOT", "./indexes")
+WARM_QUERIES = ["admission process", "fee structure", "hostel facilities"]
+
+
+# ---------------------------
+# VERSIONED DIRECTORIES
+# ---------------------------
+# indexes/
+#   v20261018-153000/chroma_db, index, [compact_index], [numpy_index], .complete
+#   ACTIVE            <- name of the version the server loads on start
+
+def list_versions(root=DEFAULT_INDEX_ROOT):
+    if not os.path.isdir(root):
+        return []
+    return sorted(v for v in os.listdir(root) if os.path.exists(os.path.join(root, v, ".complete")))
+
+
+def read_active(root=DEFAULT_INDEX_ROOT):
+    path = os.path.join(root, "ACTIVE")
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            version = f.read().strip()
+        if version in list_versions(root):
+            return version
+    versions = list_versions(root)
+    return versions[-1] if versions else None
+
+
+def write_active(version, root=DEFAULT_INDEX_ROOT):
+    tmp = os.path.join(root, "ACTIVE.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(root, "ACTIVE"))
+
+
+def publish_version(chroma_dir, index_dir, compact_dir=None, root=DEFAULT_INDEX_ROOT, activate=False, numpy_dir=None):
+    """
+    Copy a freshly built index into a new version directory. The version only
+    becomes visible once `.complete` exists, so a server never opens a half-copied one.
+    """
+    version = time.strftime("v%Y%m%d-%H%M%S")
+    while os.path.exists(os.path.join(root, version)):
+        version += "b"
+    target = os.path.join(root, version)
+    shutil.copytree(chroma_dir, os.path.join(target, "chroma_db"))
+    shutil.copytree(index_dir, os.path.join(target, "index"))
+    if compact_dir and os.path.isdir(compact_dir):
+        shutil.copytree(compact_dir, os.path.join(target, "compact_index"))
+    if numpy_dir and os.path.isdir(numpy_dir):
+        shutil.copytree(numpy_dir, os.path.join(target, "numpy_index"))
+    open(os.path.join(target, ".complete"), "w").close()
+    if activate:
+        write_active(version, root)
+    return version
+
+
+# ---------------------------
+# HOT SWAP
+# ---------------------------
+class LoadedIndex:
+    def __init__(self, version, index, loaded_in):
+        self.version = version
+        self.index = index
+        self.loaded_in = loaded_in
+
+
+class IndexManager:
+    """
+    Holds the index the chat server answers from and swaps it without a restart.
+
+    `load_fn(version_dir)` opens an index (vector store + docstore) for one
+    version directory. A swap loads and warms the new version on a background
+    thread, then replaces `current` in a single assignment: requests that
+    already read `current` finish on the old index, new ones get the new one.
+    The previous index stays loaded so a rollback is instant.
+    """
+
+    def __init__(self, load_fn, root=DEFAULT_INDEX_ROOT, legacy_dir="."):
+        self.load_fn = load_fn
+        self.root = root
+        self.legacy_dir = legacy_dir
+        self.current = None
+        self.previous = None
+        self.loading = None
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def _dir(self, version):
+        # before the first publish, the server keeps using ./chroma_db and ./index
+        return self.legacy_dir if version == "legacy" else os.path.join(self.root, version)
+
+    def _load(self, version):
+        started = time.perf_counter()
+        index = self.load_fn(self._dir(version))
+        retriever = index.as_retriever(similarity_top_k=3)
+        for query in WARM_QUERIES:
+            retriever.retrieve(query)
+        return LoadedIndex(version, index, time.perf_counter() - started)
+
+    def start(self):
+        """ Load the active version (blocking), used once at server start """
+        version = read_active(self.root) or "legacy"
+        self.current = self._load(version)
+        print(f"📚 Index {version} loaded in {self.current.loaded_in:.1f}s")
+        return self.current
+
+    def swap(self, version=None, wait=False):
+        """ Load `version` (default: newest published) in the background and switch to it """
+        version = version or (list_versions(self.root) or [None])[-1]
+        if version is None or (version != "legacy" and version not in list_versions(self.root)):
+            raise ValueError(f"unknown index version: {version}")
+        with self._lock:
+            if self.loading:
+                raise RuntimeError(f"already loading {self.loading}")
+            self.loading = version
+
+        def run():
+            try:
+                loaded = self._load(version)
+                with self._lock:
+                    self.previous, self.current = self.current, loaded
+                if version != "legacy":
+                    write_active(version, self.root)
+                self.last_error = None
+                print(f"🔁 Swapped to index {version} (loaded and warmed in {loaded.loaded_in:.1f}s)")
+            except Exception as e:
+                self.last_error = f"{version}: {e}"
+                print(f"❌ Index swap to {version} failed, still serving {self.current.version}: {e}")
+            finally:
+                with self._lock:
+                    self.loading = None
+
+        thread = threading.Thread(target=run, name=f"index-swap-{version}", daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+        return version
+
+    def rollback(self):
+        """ Switch back to the previously active index, which is still loaded """
+        with self._lock:
+            if self.previous is None:
+                raise RuntimeError("no previous index to roll back to")
+            self.previous, self.current = self.current, self.previous
+        if self.current.version != "legacy":
+            write_active(self.current.version, self.root)
+        print(f"↩️ Rolled back to index {self.current.version}")
+        return self.current.version
+
+    def status(self):
+        return {
+            "active": self.current.version if self.current else None,
+            "previous": self.previous.version if self.previous else None,
+            "loading": self.loading,
+            "last_error": self.last_error,
+            "available": list_versions(self.root),
+        }
+
+
+def admin_allowed(request):
+    """
+    The X-Admin-Token header must match ADMIN_TOKEN. Without ADMIN_TOKEN every
+    call is refused: behind a reverse proxy on the same host, remote_addr is
+    127.0.0.1 for outside requests too, so it can't tell local calls apart.
+    """
+    token = os.getenv("ADMIN_TOKEN")
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token)
+
+
+def register_admin_routes(app, manager):
+    """
+    /admin/index (status), /admin/index/swap and /admin/index/rollback on a Flask app.
+    `manager` may also be a function returning it, for servers that load it lazily.
+    """
+    from flask import jsonify, request
+
+    get_manager = manager if callable(manager) else lambda: manager
+    if not os.getenv("ADMIN_TOKEN"):
+        print("⚠️ ADMIN_TOKEN is not set; /admin routes will refuse every request")
+
+    def allowed():
+        return admin_allowed(request)
+
+    @app.route("/admin/index", methods=["GET"])
+    def index_status():
+        if not allowed():
+            return jsonify({"error": "forbidden"}), 403
+        return jsonify(get_manager().status())
+
+    @app.route("/admin/index/swap", methods=["POST"])
+    def index_swap():
+        if not allowed():
+            return jsonify({"error": "forbidden"}), 403
+        version = (request.get_json(silent=True) or {}).get("version")
+        try:
+            loading = get_manager().swap(version)
+        except (ValueError, RuntimeError) as e:
+            return jsonify({"error": str(e)}), 409
+        return jsonify({"loading": loading, **get_manager().status()}), 202
+
+    @app.route("/admin/index/rollback", methods=["POST"])
+    def index_rollback():
+        if not allowed():
+            return jsonify({"error": "forbidden"}), 403
+        try:
+            get_manager().rollback()
+        except RuntimeError as e:
+            return jsonify({"error": str(e)}), 409
+        return jsonify(get_manager().status())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Publish a built index as a new version, or list versions")
+    parser.add_argument("--root", default=DEFAULT_INDEX_ROOT)
+    sub = parser.add_subparsers(dest="command", required=True)
+    publish = sub.add_parser("publish")
+    publish.add_argument("--chroma", default="./chroma_db2")
+    publish.add_argument("--index", default="./index2")
+    publish.add_argument("--compact", help="compact_store.py output to ship with this version")
+    publish.add_argument("--numpy", help="numpy_store.py output to ship with this version")
+    publish.add_argument("--activate", action="store_true", help="make it the version loaded on next start")
+    sub.add_parser("list")
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        version = publish_version(args.chroma, args.index, args.compact, args.root, args.activate, args.numpy)
+        print(f"✅ Published {version}; POST /admin/index/swap to serve it without a restart")
+    else:
+        active = read_active(args.root)
+        for version in list_versions(args.root):
+            print(f"{'*' if version == active else ' '} {version}")
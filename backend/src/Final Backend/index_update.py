@@ -0,0 +1,215 @@
+# index_update.py
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+import pandas as pd
+from chromadb import PersistentClient
+from llama_index.core import StorageContext, load_index_from_storage
+from llama_index.core.node_parser import SimpleNodeParser
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.vector_stores.chroma import ChromaVectorStore
+
+from compact_store import mark_revision, rebuild_compact_index
+from db_creation import (CORPUS_COLUMNS, DEDUP_FILE, deduplicate_documents, deduplicate_pages, doc_url,
+                         open_dedup_store, prepare_corpus_frame, stable_doc_id, stable_node_id)
+from embedding_stage import EMBED_MODEL_NAME, embed_nodes
+from lexical_index import LEXICAL_FILE, build_from_collection, update_lexical_index
+from numpy_store import rebuild_numpy_index
+from table_store import TableStore
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Scraping", "scripts"))
+from corpus_store import CorpusStore  # noqa: E402
+from dedup import deduplicate  # noqa: E402
+
+
+def read_delta(path):
+    """
+    Changed-documents delta: the CSV written by `text_from_sites.py --incremental`
+    (URL, Text, Change) or a plain text file with one changed URL per line.
+    Returns {url: "new" | "changed" | "deleted"}.
+    """
+    changes = {}
+    if path.endswith(".csv"):
+        csv.field_size_limit(sys.maxsize)
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                changes[row["URL"]] = row.get("Change") or "changed"
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    changes[line.strip()] = "changed"
+    return changes
+
+
+def delete_document(collection, index, url):
+    """
+    Remove every chunk of `url` (all pages of a PDF, or one page given as its
+    stable source_id URL#page=N) from Chroma and the docstore. Returns the
+    ids of the chunks removed and the URLs dedup had folded into them.
+    """
+    found = collection.get(where={"$or": [{"source_url": url}, {"source_id": url}]}, include=["metadatas"])
+    ids = found["ids"]
+    if not ids:
+        return [], []
+    collection.delete(ids=ids)
+    aliases = []
+    for meta in found["metadatas"]:
+        ref_doc_id = meta.get("ref_doc_id") or meta.get("document_id")
+        if ref_doc_id:
+            index.docstore.delete_ref_doc(ref_doc_id, raise_error=False)
+        aliases.extend(alias for alias in (meta.get("aliases") or "").split(" | ") if alias)
+    return ids, list(dict.fromkeys(aliases))
+
+
+def seed_dedup(collection, store, page_index, chunk_index):
+    """
+    Fill the dedup store of an index built before it existed with the pages
+    and chunks already indexed. Reads the whole collection and corpus, once;
+    later updates only touch the entries of the documents they change.
+    """
+    indexed = collection.get(include=["metadatas", "documents"])
+    deduplicate(zip(indexed["metadatas"], indexed["documents"]), chunk_index,
+                key=lambda chunk: (stable_doc_id(chunk[0]["source_url"], int(chunk[0]["page_number"])),
+                                   chunk[0]["chunk_id"]),
+                text=lambda chunk: chunk[1])
+    indexed_urls = {meta["source_url"] for meta in indexed["metadatas"]}
+    for frame in store.iter_frames(columns=CORPUS_COLUMNS):
+        frame = prepare_corpus_frame(frame)
+        deduplicate_pages(frame[frame["url"].isin(indexed_urls)], page_index)
+
+    # the report should cover this update only
+    for dedup_index in (page_index, chunk_index):
+        dedup_index.stats = dict.fromkeys(dedup_index.stats, 0)
+        dedup_index.aliases.clear()
+
+
+def record_aliases(collection, page_index, chunk_index):
+    """ Updated pages folded into already indexed ones are noted on those chunks, as a rebuild would """
+    folded = {}
+    for canonical, aliases in page_index.aliases.items():
+        folded.setdefault(canonical, set()).update(doc_url(alias) for alias in aliases)
+    for canonical, aliases in chunk_index.aliases.items():
+        folded.setdefault(canonical[0], set()).update(doc_url(alias[0]) for alias in aliases)
+    if not folded:
+        return
+
+    # only chunks already in the collection; this update's own ones carry their aliases
+    found = collection.get(where={"source_id": {"$in": sorted(folded)}}, include=["metadatas"])
+    ids, metadatas = [], []
+    for chunk_id, meta in zip(found["ids"], found["metadatas"]):
+        known = [alias for alias in (meta.get("aliases") or "").split(" | ") if alias]
+        merged = [url for url in dict.fromkeys(known + sorted(folded[meta["source_id"]])) if url != meta["source_url"]]
+        if merged != known:
+            ids.append(chunk_id)
+            metadatas.append({**meta, "aliases": " | ".join(merged)})
+    if ids:
+        collection.update(ids=ids, metadatas=metadatas)
+
+
+def update_index(changes, tokenizer, store_dir, persist_dir="./chroma_db2", index_dir="./index2",
+                 collection_name="rag-collection", tables_db=None):
+    started = time.perf_counter()
+
+    client = PersistentClient(path=persist_dir)
+    collection = client.get_or_create_collection(collection_name)
+    vector_store = ChromaVectorStore(chroma_collection=collection)
+    embed_model = HuggingFaceEmbedding(model_name=EMBED_MODEL_NAME)
+    storage_context = StorageContext.from_defaults(persist_dir=index_dir, vector_store=vector_store)
+    index = load_index_from_storage(storage_context, embed_model=embed_model)
+
+    store = CorpusStore(store_dir)
+    tables = TableStore(tables_db) if tables_db else TableStore()
+    # MinHash signatures of the indexed pages and chunks, stored next to the index
+    seeded = os.path.exists(os.path.join(index_dir, DEDUP_FILE))
+    dedup_db, page_index, chunk_index = open_dedup_store(index_dir)
+    if not seeded:
+        seed_dedup(collection, store, page_index, chunk_index)
+    removed = []
+    frames = []
+    pending = list(changes.items())
+    queued = set(changes)
+    while pending:
+        url, change = pending.pop(0)
+        # Stale chunks go first, so a changed page never keeps chunks it no longer has
+        ids, aliases = delete_document(collection, index, url)
+        removed.extend(ids)
+        tables.delete_url(url)
+        page_index.forget(url)
+        chunk_index.forget(url)
+        # pages dedup folded into this one were never indexed: they get their own look now
+        for alias in aliases:
+            if alias not in queued:
+                queued.add(alias)
+                pending.append((alias, "changed"))
+        if change == "deleted":
+            continue
+        records = store.get(url)
+        if not records:
+            print(f"⚠️ {url} is not in the corpus store, skipping")
+            continue
+        frame = prepare_corpus_frame(pd.DataFrame(records)[CORPUS_COLUMNS])
+        # same fee/seat rows as a full rebuild, which stores tables before dedup
+        tables.add_frame(frame)
+        frames.append(frame)
+    tables.commit()
+    tables.close()
+
+    nodes = []
+    if frames:
+        documents = deduplicate_documents(frames, tokenizer, page_index=page_index, chunk_index=chunk_index)
+        record_aliases(collection, page_index, chunk_index)
+        nodes = SimpleNodeParser(id_func=stable_node_id).get_nodes_from_documents(documents)
+        # unchanged chunk texts inside a changed document come from the embedding cache
+        embed_nodes(nodes, keep=collection.get(include=["documents"])["documents"])
+        index.insert_nodes(nodes)
+    store.close()
+
+    index.storage_context.persist(persist_dir=index_dir)
+    dedup_db.commit()
+    dedup_db.close()
+
+    # the BM25 side of hybrid retrieval keeps its own copy of the chunk text
+    lexical_path = os.path.join(index_dir, LEXICAL_FILE)
+    if os.path.exists(lexical_path):
+        update_lexical_index(lexical_path, removed, nodes)
+    else:
+        build_from_collection(lexical_path, collection)
+
+    # the compact and NumPy copies served with VECTOR_STORE follow the collection;
+    # any copy still holding the old contents refuses to load from now on
+    mark_revision(collection)
+    compact_dir = os.path.join(os.path.dirname(persist_dir), "compact_index")
+    if os.path.exists(os.path.join(compact_dir, "meta.json")):
+        rebuild_compact_index(compact_dir, collection)
+    numpy_dir = os.path.join(os.path.dirname(persist_dir), "numpy_index")
+    if os.path.exists(os.path.join(numpy_dir, "meta.json")):
+        rebuild_numpy_index(numpy_dir, collection)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Updated {len(queued)} documents: removed {len(removed)} chunks, "
+          f"inserted {len(nodes)} chunks in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply a changed-documents delta to the vector index")
+    parser.add_argument("delta", nargs="?", help="delta CSV from text_from_sites.py or a file of URLs")
+    parser.add_argument("--url", action="append", default=[], help="refresh a single document (repeatable)")
+    parser.add_argument("--delete", action="append", default=[], help="remove a document (repeatable)")
+    parser.add_argument("--store", default=os.path.join("..", "Scraping", "scripts", "corpus"))
+    parser.add_argument("--persist-dir", default="./chroma_db2")
+    parser.add_argument("--index-dir", default="./index2")
+    args = parser.parse_args()
+
+    changes = read_delta(args.delta) if args.delta else {}
+    changes.update({url: "changed" for url in args.url})
+    changes.update({url: "deleted" for url in args.delete})
+    if not changes:
+        parser.error("nothing to update: pass a delta file, --url or --delete")
+
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained("bert-base-uncased")
+    update_index(changes, tokenizer, args.store, args.persist_dir, args.index_dir)
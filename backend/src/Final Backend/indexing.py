@@ -1,35 +1,50 @@
 import os
 from dotenv import load_dotenv
 from llama_index.core import GPTVectorStoreIndex, SimpleDirectoryReader, StorageContext
+from llama_index.core.node_parser import SimpleNodeParser
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from chromadb import PersistentClient
 
+from embedding_stage import EMBED_MODEL_NAME, embed_nodes
+
 load_dotenv()
 
 PERSIST_DIR = "./chroma_db"
 COLLECTION_NAME = "rag-collection"
 DATA_DIR = "./data"
 
-print("📦 Loading documents from:", DATA_DIR)
-documents = SimpleDirectoryReader(DATA_DIR).load_data()
 
-print("🧠 Initializing embedding model...")
-embed_model = HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
+def main():
+    print("📦 Loading documents from:", DATA_DIR)
+    documents = SimpleDirectoryReader(DATA_DIR).load_data()
+
+    print("🧠 Initializing embedding model...")
+    embed_model = HuggingFaceEmbedding(model_name=EMBED_MODEL_NAME)
+
+    print("📚 Creating Chroma collection...")
+    client = PersistentClient(path=PERSIST_DIR)
+    collection = client.get_or_create_collection(COLLECTION_NAME)
+    vector_store = ChromaVectorStore(chroma_collection=collection, persist_path=PERSIST_DIR)
+    storage_context = StorageContext.from_defaults(vector_store=vector_store)
+
+    print("🔍 Parsing and embedding chunks...")
+    nodes = SimpleNodeParser().get_nodes_from_documents(documents, show_progress=True)
+    embed_nodes(nodes)
+
+    print("📌 Creating index...")
+    index = GPTVectorStoreIndex(
+        nodes,
+        storage_context=storage_context,
+        embed_model=embed_model,
+        insert_batch_size=4096
+    )
 
-print("📚 Creating Chroma collection...")
-client = PersistentClient(path=PERSIST_DIR)
-collection = client.get_or_create_collection(COLLECTION_NAME)
-vector_store = ChromaVectorStore(chroma_collection=collection, persist_path=PERSIST_DIR)
-storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    print("💾 Persisting index to:", PERSIST_DIR)
+    index.storage_context.persist()
+    print("✅ Indexing complete.")
 
-print("📌 Creating index...")
-index = GPTVectorStoreIndex.from_documents(
-    documents,
-    storage_context=storage_context,
-    embed_model=embed_model
-)
 
-print("💾 Persisting index to:", PERSIST_DIR)
-index.storage_context.persist()
-print("✅ Indexing complete.")
+# Embedding worker processes re-import this module, so nothing may run at import time
+if __name__ == "__main__":
+    main()
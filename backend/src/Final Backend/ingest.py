@@ -0,0 +1,360 @@
+# ingest.py
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+SCRAPING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Scraping", "scripts")
+sys.path.append(SCRAPING_DIR)
+
+STAGE_VERSION = 1  # bump to invalidate every cached artifact after a format change
+
+
+# ---------------------------
+# STAGES
+# ---------------------------
+# Each stage reads its inputs' artifact directories and writes its own into `out`.
+
+def stage_crawl(inputs, out, cfg):
+    import asyncio
+    import gathering_links
+
+    args = gathering_links.parse_args([
+        "--seed", cfg.seed, "--db", os.path.join(cfg.work_dir, "crawl_frontier.db"),
+        "--max-pages", str(cfg.max_pages),
+        "--pdf-out", os.path.join(out, "pdf_links.txt"),
+        "--links-out", os.path.join(out, "internal_links.txt"),
+    ])
+    asyncio.run(gathering_links.crawl(args))
+
+
+def _read_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return list(dict.fromkeys(line.strip() for line in f if line.strip()))
+
+
+def stage_extract_sites(inputs, out, cfg):
+    import text_from_sites
+    from html_extractor import BoilerplateFilter
+
+    text_from_sites.boilerplate = BoilerplateFilter(os.path.join(SCRAPING_DIR, "boilerplate.json"))
+    urls = _read_lines(os.path.join(inputs["crawl"], "internal_links.txt"))
+    text_from_sites.scrape_urls(urls, output_csv_file=os.path.join(out, "sites.csv"))
+    text_from_sites.boilerplate.save()
+
+
+def stage_extract_pdfs(inputs, out, cfg):
+    import text_from_pdf
+
+    args = argparse.Namespace(
+        cache_dir=os.path.join(cfg.work_dir, "pdf_cache"),
+        csv_out=os.path.join(out, "pu_pdf_data.csv"), json_out=os.path.join(out, "pdf_data.json"),
+        store=None, download_workers=8, extract_workers=cfg.workers, per_host=2, delay=0.5, tables=True,
+    )
+    text_from_pdf.process_pdfs(_read_lines(os.path.join(inputs["crawl"], "pdf_links.txt")), args)
+
+
+def stage_clean(inputs, out, cfg):
+    import pandas as pd
+    from db_creation import clean_text, load_json_to_dataframe
+
+    csv.field_size_limit(sys.maxsize)
+    sites = pd.read_csv(os.path.join(inputs["extract-sites"], "sites.csv"), engine="python")
+    sites = pd.DataFrame({"url": sites["URL"], "pdf_file": sites["URL"], "page_number": 0,
+                          "text": sites["Text"], "tables": [[] for _ in range(len(sites))],
+                          "source_type": "site"})
+    pdfs = load_json_to_dataframe(os.path.join(inputs["extract-pdfs"], "pdf_data.json"))
+    pdfs["source_type"] = "pdf"
+
+    pages = pd.concat([sites, pdfs], ignore_index=True)
+    pages["text"] = pages["text"].apply(clean_text)
+    # table-only pages (fee schedules) have no text but must reach the chunker
+    pages = pages[(pages["text"].str.len() > 0) | (pages["tables"].str.len() > 0)]
+    pages["tables"] = pages["tables"].apply(json.dumps)
+    pages.to_parquet(os.path.join(out, "pages.parquet"), index=False)
+
+
+def stage_dedupe(inputs, out, cfg):
+    import pandas as pd
+    from dedup import NearDuplicateIndex
+    from db_creation import deduplicate_pages
+
+    pages = pd.read_parquet(os.path.join(inputs["clean"], "pages.parquet"))
+    index = NearDuplicateIndex(threshold=cfg.dedup_threshold)
+    # the page pass of db_creation.deduplicate_documents, on tables parsed back from JSON
+    kept = deduplicate_pages(pages.assign(tables=pages["tables"].apply(json.loads)), index)
+    print(f"🧹 {index.report('pages')}")
+    pages.loc[kept.index].to_parquet(os.path.join(out, "pages.parquet"), index=False)
+
+
+def stage_chunk(inputs, out, cfg):
+    import pandas as pd
+    from llama_index.core.node_parser import SimpleNodeParser
+    from transformers import AutoTokenizer
+    from db_creation import build_documents, stable_node_id
+
+    pages = pd.read_parquet(os.path.join(inputs["dedupe"], "pages.parquet"))
+    pages["tables"] = pages["tables"].apply(json.loads)
+    tokenizer = AutoTokenizer.from_pretrained(cfg.tokenizer)
+    documents = build_documents(pages, tokenizer)
+    nodes = SimpleNodeParser(id_func=stable_node_id).get_nodes_from_documents(documents)
+    with open(os.path.join(out, "nodes.jsonl"), "w", encoding="utf-8") as f:
+        for node in nodes:
+            f.write(json.dumps(node.to_dict(), ensure_ascii=False) + "\n")
+    print(f"✂️ {len(pages)} pages -> {len(nodes)} chunks")
+
+
+def _load_nodes(path):
+    from llama_index.core.schema import TextNode
+
+    with open(os.path.join(path, "nodes.jsonl"), "r", encoding="utf-8") as f:
+        return [TextNode.from_dict(json.loads(line)) for line in f]
+
+
+def stage_embed(inputs, out, cfg):
+    import numpy as np
+    from embedding_stage import embed_texts
+    from embedding_cache import EmbeddingCache
+
+    nodes = _load_nodes(inputs["chunk"])
+    cache = EmbeddingCache(cfg.embed_model)
+    texts = [node.text for node in nodes]
+    vectors = embed_texts(texts, model_name=cfg.embed_model, workers=cfg.workers, cache=cache)
+    # the chunk stage holds every chunk of the build: nothing else needs to stay cached
+    cache.evict(keep=texts)
+    cache.close()
+    np.save(os.path.join(out, "vectors.npy"), vectors)
+
+
+def stage_index(inputs, out, cfg):
+    import numpy as np
+    from chromadb import PersistentClient
+    from llama_index.core import StorageContext, VectorStoreIndex
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    from llama_index.vector_stores.chroma import ChromaVectorStore
+    from compact_store import mark_revision
+    from lexical_index import LEXICAL_FILE, build_lexical_index
+
+    nodes = _load_nodes(inputs["chunk"])
+    vectors = np.load(os.path.join(inputs["embed"], "vectors.npy"))
+    for node, vector in zip(nodes, vectors):
+        node.embedding = vector.tolist()
+
+    # built inside the artifact, then copied to where the chat server reads it
+    client = PersistentClient(path=os.path.join(out, "chroma_db"))
+    collection = client.get_or_create_collection("rag-collection")
+    storage_context = StorageContext.from_defaults(vector_store=ChromaVectorStore(chroma_collection=collection))
+    index = VectorStoreIndex(nodes, storage_context=storage_context,
+                             embed_model=HuggingFaceEmbedding(model_name=cfg.embed_model), insert_batch_size=4096)
+    index.storage_context.persist(persist_dir=os.path.join(out, "index"))
+    build_lexical_index(os.path.join(out, "index", LEXICAL_FILE), nodes)
+    mark_revision(collection)
+    del index, client
+
+    # a new version directory; the running server switches with POST /admin/index/swap
+    from index_manager import publish_version
+
+    version = publish_version(os.path.join(out, "chroma_db"), os.path.join(out, "index"), root=cfg.index_root)
+    print(f"📦 Index with {len(nodes)} chunks published as {cfg.index_root}/{version}")
+
+
+def stage_tables(inputs, out, cfg):
+    from table_store import TableStore
+
+    tables = TableStore(os.path.join(out, "tables.db"))
+    with open(os.path.join(inputs["extract-pdfs"], "pdf_data.json"), "r", encoding="utf-8") as f:
+        for doc in json.load(f):
+            for page in doc["content"]:
+                if page.get("tables"):
+                    tables.add_page(doc["url"], page["page_number"], page["tables"], source=doc["pdf_file"])
+    tables.commit()
+    print(f"📊 {len(tables)} fee/seat rows")
+    tables.close()
+    shutil.copyfile(os.path.join(out, "tables.db"), cfg.tables_db)
+
+
+# name: (function, dependencies, config fields that change its output)
+STAGES = {
+    "crawl": (stage_crawl, [], ["seed", "max_pages"]),
+    "extract-sites": (stage_extract_sites, ["crawl"], []),
+    "extract-pdfs": (stage_extract_pdfs, ["crawl"], []),
+    "clean": (stage_clean, ["extract-sites", "extract-pdfs"], []),
+    "tables": (stage_tables, ["extract-pdfs"], ["tables_db"]),
+    "dedupe": (stage_dedupe, ["clean"], ["dedup_threshold"]),
+    "chunk": (stage_chunk, ["dedupe"], ["tokenizer"]),
+    "embed": (stage_embed, ["chunk"], ["embed_model"]),
+    "index": (stage_index, ["chunk", "embed"], ["embed_model", "index_root"]),
+}
+GROUPS = {"extract": ["extract-sites", "extract-pdfs"]}
+
+
+# ---------------------------
+# ARTIFACTS
+# ---------------------------
+def digest_dir(path):
+    """ Content hash of every file in an artifact directory """
+    sha = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if name == ".done":
+                continue
+            full = os.path.join(root, name)
+            sha.update(os.path.relpath(full, path).encode("utf-8"))
+            with open(full, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    sha.update(block)
+    return sha.hexdigest()
+
+
+class Pipeline:
+    """
+    Runs the ingestion stages as a dependency graph. A stage's artifact
+    directory is named by the hash of its inputs' content digests and its
+    config, so a stage whose inputs did not change is skipped, and stages
+    whose dependencies are done run concurrently.
+    """
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.root = os.path.join(cfg.work_dir, "artifacts")
+        self.manifest_path = os.path.join(cfg.work_dir, "manifest.json")
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        self.timings = {}
+
+    def key(self, name, digests):
+        _, deps, fields = STAGES[name]
+        spec = {"stage": name, "version": STAGE_VERSION,
+                "config": {f: getattr(self.cfg, f) for f in fields},
+                "inputs": {d: digests[d] for d in deps}}
+        return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def run_stage(self, name, digests, force):
+        func, deps, _ = STAGES[name]
+        key = self.key(name, digests)
+        out = os.path.join(self.root, name, key)
+        done = os.path.join(out, ".done")
+
+        if not force and os.path.exists(done):
+            with open(done, "r", encoding="utf-8") as f:
+                return out, f.read().strip(), "cached", 0.0
+
+        shutil.rmtree(out, ignore_errors=True)
+        os.makedirs(out)
+        started = time.perf_counter()
+        func({d: self.manifest[d]["dir"] for d in deps}, out, self.cfg)
+        digest = digest_dir(out)
+        with open(done, "w", encoding="utf-8") as f:
+            f.write(digest)
+        return out, digest, "ran", time.perf_counter() - started
+
+    def run(self, selected, forced):
+        """ Run `selected` stages (dependencies first); `forced` ones ignore their cache """
+        digests = {name: entry["digest"] for name, entry in self.manifest.items()}
+        for name in selected:
+            for dep in STAGES[name][1]:
+                if dep not in selected and dep not in self.manifest:
+                    raise SystemExit(f"❌ '{name}' needs '{dep}', which has never run; include it in the run")
+
+        pending = list(selected)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.cfg.parallel) as pool:
+            while pending or running:
+                for name in list(pending):
+                    if all(d not in pending and d not in running.values() for d in STAGES[name][1]):
+                        print(f"▶️  {name}")
+                        running[pool.submit(self.run_stage, name, dict(digests), name in forced)] = name
+                        pending.remove(name)
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    out, digest, status, seconds = future.result()
+                    digests[name] = digest
+                    self.manifest[name] = {"dir": out, "digest": digest}
+                    self.timings[name] = (status, seconds)
+                    self.save()
+                    print(f"{'⏭️ ' if status == 'cached' else '✅'} {name}: {status} ({seconds:.1f}s)")
+
+    def save(self):
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+
+    def report(self, wall):
+        print("\n⏱️ Stage timings")
+        for name in STAGES:
+            if name in self.timings:
+                status, seconds = self.timings[name]
+                print(f"  {name:<14} {status:<7} {seconds:8.1f}s")
+        print(f"  {'total':<14} {'':<7} {wall:8.1f}s wall clock")
+
+
+def expand(names):
+    stages = []
+    for name in names:
+        for stage in GROUPS.get(name, [name]):
+            if stage not in STAGES:
+                raise SystemExit(f"❌ Unknown stage '{name}'. Stages: {', '.join(list(STAGES) + list(GROUPS))}")
+            stages.append(stage)
+    return stages
+
+
+def downstream(names):
+    """ The given stages plus everything that depends on them """
+    result = set(names)
+    changed = True
+    while changed:
+        changed = False
+        for name, (_, deps, _) in STAGES.items():
+            if name not in result and result.intersection(deps):
+                result.add(name)
+                changed = True
+    return result
+
+
+if __name__ == "__main__":
+    from crawl_frontier import ROOT_URL
+    from embedding_stage import EMBED_MODEL_NAME
+    from index_manager import DEFAULT_INDEX_ROOT
+    from table_store import DEFAULT_DB
+
+    parser = argparse.ArgumentParser(description="Run the ingestion pipeline: " + " -> ".join(STAGES))
+    parser.add_argument("--work-dir", default="ingest_work", help="artifacts, manifest and crawl checkpoint")
+    parser.add_argument("--from-stage", help="rerun this stage and everything after it, ignoring the cache")
+    parser.add_argument("--only", nargs="+", help="rerun just these stages with the last artifacts as input")
+    parser.add_argument("--parallel", type=int, default=2, help="stages running at once")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes inside a stage")
+    parser.add_argument("--seed", default=ROOT_URL)
+    parser.add_argument("--max-pages", type=int, default=0)
+    parser.add_argument("--dedup-threshold", type=float, default=0.85)
+    parser.add_argument("--tokenizer", default="bert-base-uncased")
+    parser.add_argument("--embed-model", default=EMBED_MODEL_NAME)
+    parser.add_argument("--index-root", default=DEFAULT_INDEX_ROOT, help="versioned index directories")
+    parser.add_argument("--tables-db", default=DEFAULT_DB)
+    cfg = parser.parse_args()
+    if cfg.from_stage and cfg.only:
+        parser.error("use either --from-stage or --only")
+
+    os.makedirs(cfg.work_dir, exist_ok=True)
+    pipeline = Pipeline(cfg)
+    if cfg.only:
+        selected = forced = set(expand(cfg.only))
+    elif cfg.from_stage:
+        forced = downstream(expand([cfg.from_stage]))
+        selected = set(STAGES)
+    else:
+        # crawl output depends on the live site, so it only reruns when asked for
+        forced = set()
+        selected = set(STAGES)
+
+    started = time.perf_counter()
+    pipeline.run([name for name in STAGES if name in selected], forced)
+    pipeline.report(time.perf_counter() - started)
@@ -0,0 +1,207 @@
+# lexical_index.py
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from llama_index.core import VectorStoreIndex
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore
+from llama_index.core.vector_stores.simple import build_metadata_filter_fn
+from llama_index.core.vector_stores.utils import metadata_dict_to_node, node_to_metadata_dict
+
+LEXICAL_FILE = "lexical.sqlite"
+RRF_K = 60          # standard reciprocal rank fusion constant
+CANDIDATES = 20     # depth each retriever contributes before fusion
+
+# both retrievers of a query run side by side; shared so requests don't spawn threads
+_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid")
+
+
+# ---------------------------
+# TOKENIZER
+# ---------------------------
+# "B.Tech", "M.Sc.", "CSE-AI", "PU/2024" stay findable both whole ("btech")
+# and by their parts ("b", "tech"), however the student writes them
+COMPOUND = re.compile(r"[a-z0-9]+(?:[./&+-][a-z0-9]+)*")
+
+
+def tokenize(text):
+    tokens = []
+    for match in COMPOUND.finditer(text.lower()):
+        compound = match.group()
+        parts = re.split(r"[./&+-]", compound)
+        if len(parts) > 1:
+            tokens.append("".join(parts))
+        tokens.extend(parts)
+    return tokens
+
+
+# ---------------------------
+# BUILD
+# ---------------------------
+def _rows(nodes):
+    return (
+        (" ".join(tokenize(node.get_content())), node.node_id, node.get_content(),
+         json.dumps(node_to_metadata_dict(node, remove_text=True, flat_metadata=False)))
+        for node in nodes
+    )
+
+
+def build_lexical_index(path, nodes):
+    """
+    SQLite FTS5 inverted index over the chunks, ranked with its built-in BM25.
+    Each row keeps the node itself (text + metadata), so hits are returned
+    without going through the vector store.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE VIRTUAL TABLE chunks USING fts5(terms, node_id UNINDEXED, text UNINDEXED, "
+                 "metadata UNINDEXED)")
+    conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", _rows(nodes))
+    conn.execute("INSERT INTO chunks(chunks) VALUES ('optimize')")
+    conn.commit()
+    conn.close()
+
+
+def update_lexical_index(path, deleted_ids, nodes):
+    """ Apply an incremental vector index update: drop the chunks in `deleted_ids`, add `nodes` """
+    conn = sqlite3.connect(path)
+    with conn:
+        # replaced chunks keep their node id, so delete before inserting
+        conn.executemany("DELETE FROM chunks WHERE node_id = ?", ((node_id,) for node_id in deleted_ids))
+        conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", _rows(nodes))
+    conn.close()
+
+
+def build_from_collection(path, collection):
+    """ Build from an existing Chroma collection, for indexes made before this file existed """
+    from compact_store import export_collection
+
+    ids, _, texts, metadatas = export_collection(collection)
+    nodes = [metadata_dict_to_node(metadata, text=text) for text, metadata in zip(texts, metadatas)]
+    build_lexical_index(path, nodes)
+    return len(ids)
+
+
+# ---------------------------
+# SEARCH
+# ---------------------------
+class LexicalIndex:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def search(self, query, k=CANDIDATES, filters=None):
+        """
+        [(node, bm25 score)] best first; the score is positive, higher is better.
+        With llama-index MetadataFilters, the top k is taken among matching chunks only.
+        """
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        sql = "SELECT text, metadata, bm25(chunks) FROM chunks WHERE chunks MATCH ? ORDER BY bm25(chunks)"
+        if filters is None:
+            with self._lock:
+                rows = self.conn.execute(sql + " LIMIT ?", (match, k)).fetchall()
+            return [(metadata_dict_to_node(json.loads(metadata), text=text), -score) for text, metadata, score in rows]
+
+        matches = build_metadata_filter_fn(lambda metadata: metadata, filters)
+        hits = []
+        with self._lock:
+            for text, metadata, score in self.conn.execute(sql, (match,)):
+                metadata = json.loads(metadata)
+                if matches(metadata):
+                    hits.append((metadata_dict_to_node(metadata, text=text), -score))
+                    if len(hits) == k:
+                        break
+        return hits
+
+
+def reciprocal_rank_fusion(ranked_lists, k=RRF_K):
+    """ Merge lists of NodeWithScore by sum(1 / (k + rank)); the fused score replaces the original """
+    fused, nodes = {}, {}
+    for ranked in ranked_lists:
+        for rank, hit in enumerate(ranked, start=1):
+            node_id = hit.node.node_id
+            fused[node_id] = fused.get(node_id, 0.0) + 1.0 / (k + rank)
+            nodes.setdefault(node_id, hit.node)
+    order = sorted(fused, key=fused.get, reverse=True)
+    return [NodeWithScore(node=nodes[node_id], score=fused[node_id]) for node_id in order]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Vector and BM25 retrieval run in parallel, merged with reciprocal rank fusion.
+    `filters` must be the ones the vector retriever was built with, so both sides agree.
+    """
+
+    def __init__(self, vector_retriever, lexical, similarity_top_k=3, candidates=CANDIDATES, filters=None):
+        super().__init__()
+        self.vector_retriever = vector_retriever
+        self.lexical = lexical
+        self.similarity_top_k = similarity_top_k
+        self.candidates = max(candidates, similarity_top_k)
+        self.filters = filters
+
+    def _retrieve(self, query_bundle):
+        lexical = _pool.submit(self.lexical.search, query_bundle.query_str, self.candidates, self.filters)
+        vector_hits = self.vector_retriever.retrieve(query_bundle)
+        lexical_hits = [NodeWithScore(node=node, score=score) for node, score in lexical.result()]
+        return reciprocal_rank_fusion([vector_hits, lexical_hits])[:self.similarity_top_k]
+
+
+class HybridVectorStoreIndex(VectorStoreIndex):
+    """ VectorStoreIndex whose `as_retriever` fuses in the lexical index, when the version has one """
+
+    def __init__(self, *args, lexical=None, **kwargs):
+        self.lexical = lexical
+        super().__init__(*args, **kwargs)
+
+    def as_retriever(self, **kwargs):
+        if self.lexical is None:
+            return super().as_retriever(**kwargs)
+        top_k = kwargs.pop("similarity_top_k", 3)
+        candidates = max(CANDIDATES, top_k)
+        vector_retriever = super().as_retriever(similarity_top_k=candidates, **kwargs)
+        return HybridRetriever(vector_retriever, self.lexical, top_k, candidates, kwargs.get("filters"))
+
+
+def load_hybrid_index(storage_context, index_dir, embed_model=None):
+    """ load_index_from_storage, but returning a HybridVectorStoreIndex """
+    path = os.path.join(index_dir, LEXICAL_FILE)
+    lexical = LexicalIndex(path) if os.path.exists(path) else None
+    if lexical is None:
+        print(f"⚠️ No {LEXICAL_FILE} in {index_dir}, retrieving by vectors only")
+    structs = storage_context.index_store.index_structs()
+    return HybridVectorStoreIndex(index_struct=structs[0], storage_context=storage_context,
+                                  embed_model=embed_model, lexical=lexical)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import chromadb
+
+    parser = argparse.ArgumentParser(description="Build lexical.sqlite for an existing index, or search it")
+    parser.add_argument("command", choices=["build", "search"])
+    parser.add_argument("--persist-dir", default="./chroma_db")
+    parser.add_argument("--collection", default="rag-collection")
+    parser.add_argument("--index-dir", default="./index")
+    parser.add_argument("--query")
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(args.index_dir, LEXICAL_FILE)
+    if args.command == "build":
+        collection = chromadb.PersistentClient(path=args.persist_dir).get_or_create_collection(args.collection)
+        count = build_from_collection(path, collection)
+        print(f"✅ Lexical index over {count} chunks written to {path}")
+    else:
+        for node, score in LexicalIndex(path).search(args.query, args.k):
+            print(f"{score:6.2f}  {node.get_content()[:100]!r}")
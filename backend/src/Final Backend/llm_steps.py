@@ -0,0 +1,145 @@
+# llm_steps.py
+
+import asyncio
+import json
+import re
+
+# An answer generator does all the non-LLM work (cache, tables, retrieval,
+# rerank, prompt) and post-processing itself, but leaves the LLM call to its
+# caller: it yields the prompt and receives the reply text back. The same
+# generator then runs under Flask (blocking Groq call) or under the ASGI server
+# (CPU steps in a thread pool, awaited Groq call). A generator may also return
+# before yielding (cache hit, table answer, clarification question). An LLM
+# error is thrown back into the generator, which turns it into its error reply.
+
+
+def _step(steps, method, value=None):
+    # StopIteration can't cross a Future, so report "done" as a value
+    try:
+        return False, getattr(steps, method)(value)
+    except StopIteration as done:
+        return True, done.value
+
+
+def run_steps(steps, complete):
+    """ Drive an answer generator with a blocking `complete(prompt) -> text` """
+    done, value = _step(steps, "send")
+    if done:
+        return value
+    try:
+        reply = complete(value)
+    except Exception as e:
+        done, value = _step(steps, "throw", e)
+    else:
+        done, value = _step(steps, "send", reply)
+    if not done:
+        raise RuntimeError("answer generator yielded more than one prompt")
+    return value
+
+
+async def arun_steps(steps, acomplete, pool):
+    """ Same as run_steps, with the generator's CPU work on `pool` and an awaited `acomplete(prompt)` """
+    loop = asyncio.get_running_loop()
+    done, value = await loop.run_in_executor(pool, _step, steps, "send")
+    if done:
+        return value
+    try:
+        reply = await acomplete(value)
+    except Exception as e:
+        done, value = await loop.run_in_executor(pool, _step, steps, "throw", e)
+    else:
+        done, value = await loop.run_in_executor(pool, _step, steps, "send", reply)
+    if not done:
+        raise RuntimeError("answer generator yielded more than one prompt")
+    return value
+
+
+# ---------------------------
+# STREAMING (Server-Sent Events)
+# ---------------------------
+# While the LLM streams, the student sees the reply as it will look after
+# post-processing: the follow-up block is held back (its items arrive in the
+# final event), and a link or URL is only shown once complete. The final
+# "done" event carries the generator's result, i.e. exactly the JSON that
+# /api/chat returns; the frontend swaps it in for the streamed text.
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class AnswerStream:
+    """ Incremental display text of a streamed answer, as "token" / "replace" events """
+
+    def __init__(self, markers, clean=str.strip):
+        # markers: lower-case phrases that open the follow-up block at the start of a line
+        self.markers = re.compile(r"(?im)^\W*(?:" + "|".join(map(re.escape, markers)) + ")")
+        self.marker_words = markers
+        self.clean = clean
+        self.raw = ""
+        self.sent = ""
+
+    def _visible(self):
+        text = self.raw
+        found = self.markers.search(text)
+        if found:
+            return text[:found.start()]
+        # a last line that may still turn into "Know more about:"
+        last = text[text.rfind("\n") + 1:]
+        head = re.sub(r"^\W+", "", last).lower()
+        if head and any(word.startswith(head) for word in self.marker_words):
+            text = text[:len(text) - len(last)]
+        # an unfinished [label](url) or bare URL
+        bracket = text.rfind("[")
+        if bracket != -1 and not re.match(r"\[[^\]]*\]\([^\)]*\)", text[bracket:]) and len(text) - bracket < 400:
+            text = text[:bracket]
+        # a finished link also ends in its URL; only bare ones are held back
+        url = re.search(r"(?<!\]\()https?://\S*$", text)
+        if url:
+            text = text[:url.start()]
+        return text
+
+    def feed(self, piece):
+        self.raw += piece
+        display = self.clean(self._visible())
+        if display == self.sent:
+            return []
+        if display.startswith(self.sent):
+            event = sse("token", {"text": display[len(self.sent):]})
+        else:
+            event = sse("replace", {"text": display})
+        self.sent = display
+        return [event]
+
+
+def stream_steps(steps, stream, view):
+    """ SSE events for an answer generator; `stream(prompt)` yields the LLM text in pieces """
+    done, value = _step(steps, "send")
+    if not done:
+        text = ""
+        try:
+            for piece in stream(value):
+                text += piece
+                yield from view.feed(piece)
+        except Exception as e:
+            done, value = _step(steps, "throw", e)
+        else:
+            done, value = _step(steps, "send", text)
+    yield sse("done", value)
+
+
+async def astream_steps(steps, astream, view, pool):
+    """ stream_steps for the ASGI server: CPU steps on `pool`, LLM pieces from an async iterator """
+    loop = asyncio.get_running_loop()
+    done, value = await loop.run_in_executor(pool, _step, steps, "send")
+    if not done:
+        text = ""
+        try:
+            async for piece in astream(value):
+                text += piece
+                for event in view.feed(piece):
+                    yield event
+        except Exception as e:
+            done, value = await loop.run_in_executor(pool, _step, steps, "throw", e)
+        else:
+            done, value = await loop.run_in_executor(pool, _step, steps, "send", text)
+    yield sse("done", value)
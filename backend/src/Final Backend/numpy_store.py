@@ -0,0 +1,222 @@
+# numpy_store.py
+
+import json
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.vector_stores.types import BasePydanticVectorStore, VectorStoreQueryResult
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+
+from compact_store import _normalize, allowed_rows, check_revision, collection_revision, export_collection
+
+DEFAULT_NUMPY_DIR = "./numpy_index"
+BLOCK_ROWS = 32768
+
+
+# ---------------------------
+# BUILD
+# ---------------------------
+def build_numpy_index(out_dir, ids, vectors, texts, metadatas, dtype="float32", revision=None):
+    """
+    vectors.npy: normalized embeddings, one contiguous row per chunk.
+    nodes.arrow: node_id / text / metadata columns in the same row order,
+    an Arrow IPC file that is memory-mapped, so only rows that are returned get read.
+    `revision` is the Chroma revision the vectors were exported at.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    vectors = _normalize(np.asarray(vectors, dtype=np.float32)).astype(dtype)
+    np.save(os.path.join(out_dir, "vectors.npy"), np.ascontiguousarray(vectors))
+
+    table = pa.table({
+        "node_id": pa.array(ids, pa.string()),
+        "text": pa.array(texts, pa.string()),
+        "metadata": pa.array([json.dumps(m or {}) for m in metadatas], pa.string()),
+    })
+    with pa.OSFile(os.path.join(out_dir, "nodes.arrow"), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=4096)
+
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"count": len(ids), "dim": int(vectors.shape[1]) if len(ids) else 0, "dtype": dtype,
+                   "revision": revision}, f)
+
+
+def rebuild_numpy_index(out_dir, collection):
+    """ Rebuild an existing NumPy index from `collection` in the dtype it was built with """
+    with open(os.path.join(out_dir, "meta.json"), "r", encoding="utf-8") as f:
+        dtype = json.load(f)["dtype"]
+    ids, vectors, texts, metadatas = export_collection(collection)
+    build_numpy_index(out_dir, ids, vectors, texts, metadatas, dtype, collection_revision(collection))
+
+
+# ---------------------------
+# SEARCH
+# ---------------------------
+class NumpyVectorStore(BasePydanticVectorStore):
+    """
+    Read-only llama-index vector store doing exact (brute-force) cosine top-k
+    over a memory-mapped matrix. At our corpus size (a few thousand chunks)
+    one matrix product beats an HNSW + SQLite round trip, and the results are
+    exact and deterministic. Metadata filters mask rows out of the product.
+    Given the Chroma `revision`, a directory built from an older one refuses
+    to load: rebuild it from Chroma after re-indexing (index_update.py does).
+    """
+
+    stores_text: bool = True
+
+    _vectors = PrivateAttr()
+    _nodes = PrivateAttr()
+    _meta = PrivateAttr()
+    _metadatas = PrivateAttr(default=None)
+
+    def __init__(self, path=DEFAULT_NUMPY_DIR, revision=None, **kwargs):
+        super().__init__(**kwargs)
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self._meta = json.load(f)
+        if revision is not None:
+            check_revision(path, self._meta, revision)
+        self._vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self._nodes = pa.ipc.open_file(pa.memory_map(os.path.join(path, "nodes.arrow"), "r")).read_all()
+
+    @classmethod
+    def class_name(cls):
+        return "NumpyVectorStore"
+
+    @property
+    def client(self):
+        return None
+
+    def __len__(self):
+        return self._meta["count"]
+
+    def search_batch(self, queries, k, allowed=None):
+        """
+        Exact top-k for a (q, dim) batch of queries: (rows, scores), each (q, k),
+        best first. `allowed` is an optional boolean mask of the rows to search.
+        """
+        queries = _normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        n = len(self._vectors)
+        k = min(k, n if allowed is None else int(allowed.sum()))
+        if k == 0:
+            return np.zeros((len(queries), 0), np.int64), np.zeros((len(queries), 0), np.float32)
+
+        # keep the running top k per query while streaming over row blocks
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+        for start in range(0, n, BLOCK_ROWS):
+            block = np.asarray(self._vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+            scores = queries @ block.T
+            if allowed is not None:
+                scores[:, ~allowed[start:start + len(block)]] = -np.inf
+            rows = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+            scores = np.concatenate([best_scores, scores], axis=1)
+            rows = np.concatenate([best_rows, rows], axis=1)
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                rows = np.take_along_axis(rows, top, axis=1)
+            best_scores, best_rows = scores, rows
+
+        # ties broken by row number, so the same query always returns the same chunks
+        order = np.lexsort((best_rows, -best_scores), axis=1)
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def nodes_for(self, rows):
+        picked = self._nodes.take(pa.array(rows, pa.int64())).to_pydict()
+        return [
+            metadata_dict_to_node(json.loads(metadata), text=text)
+            for text, metadata in zip(picked["text"], picked["metadata"])
+        ], picked["node_id"]
+
+    def query(self, query, **kwargs):
+        allowed = None
+        if query.filters is not None or query.doc_ids or query.node_ids:
+            # metadata of every row is parsed once, on the first filtered query
+            if self._metadatas is None:
+                self._metadatas = [json.loads(m) for m in self._nodes.column("metadata").to_pylist()]
+            allowed = allowed_rows(query, self._nodes.column("node_id").to_pylist(), self._metadatas)
+        rows, scores = self.search_batch(query.query_embedding, query.similarity_top_k, allowed)
+        nodes, ids = self.nodes_for(rows[0].tolist())
+        return VectorStoreQueryResult(nodes=nodes, similarities=scores[0].tolist(), ids=ids)
+
+    def add(self, nodes, **kwargs):
+        raise NotImplementedError("NumpyVectorStore is read-only; rebuild it with numpy_store.py build")
+
+    def delete(self, ref_doc_id, **delete_kwargs):
+        raise NotImplementedError("NumpyVectorStore is read-only; rebuild it with numpy_store.py build")
+
+
+# ---------------------------
+# BENCHMARK
+# ---------------------------
+def benchmark(collection, store, queries, k=3, batch=32):
+    """ Latency of Chroma vs exact NumPy search, and how often Chroma's HNSW top k is the exact one """
+    queries = _normalize(np.asarray(queries, dtype=np.float32))
+
+    started = time.perf_counter()
+    chroma_ids = [collection.query(query_embeddings=[q.tolist()], n_results=k, include=[])["ids"][0]
+                  for q in queries]
+    chroma_ms = (time.perf_counter() - started) / len(queries) * 1000
+
+    started = time.perf_counter()
+    exact_rows = [store.search_batch(q, k)[0][0] for q in queries]
+    numpy_ms = (time.perf_counter() - started) / len(queries) * 1000
+
+    started = time.perf_counter()
+    for i in range(0, len(queries), batch):
+        store.search_batch(queries[i:i + batch], k)
+    batched_ms = (time.perf_counter() - started) / len(queries) * 1000
+
+    node_ids = store._nodes.column("node_id")
+    agree = sum(set(ids) == {node_ids[r].as_py() for r in rows} for ids, rows in zip(chroma_ids, exact_rows))
+    print(f"🔍 {len(queries)} queries, top-{k}, {len(store)} vectors ({store._meta['dtype']})")
+    print(f"  chroma (HNSW):        {chroma_ms:7.2f} ms/query")
+    print(f"  numpy exact:          {numpy_ms:7.2f} ms/query")
+    print(f"  numpy exact, batch {batch}: {batched_ms:7.2f} ms/query")
+    print(f"  chroma top-{k} identical to exact: {agree / len(queries) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import chromadb
+
+    parser = argparse.ArgumentParser(description="Build the mmap'd NumPy index from Chroma, or benchmark it")
+    parser.add_argument("command", choices=["build", "bench"])
+    parser.add_argument("--persist-dir", default="./chroma_db")
+    parser.add_argument("--collection", default="rag-collection")
+    parser.add_argument("--out", default=DEFAULT_NUMPY_DIR)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32",
+                        help="float16 halves the file but upcasts per query, so it is slower to search")
+    parser.add_argument("--queries", help="text file with one question per line (default: sampled chunks)")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    collection = chromadb.PersistentClient(path=args.persist_dir).get_or_create_collection(args.collection)
+    if args.command == "build":
+        started = time.perf_counter()
+        ids, vectors, texts, metadatas = export_collection(collection)
+        build_numpy_index(args.out, ids, vectors, texts, metadatas, args.dtype, collection_revision(collection))
+        print(f"✅ Built {args.out} from {len(ids)} vectors in {time.perf_counter() - started:.1f}s")
+    else:
+        store = NumpyVectorStore(args.out)
+        if args.queries:
+            from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+            from embedding_stage import EMBED_MODEL_NAME
+
+            with open(args.queries, "r", encoding="utf-8") as f:
+                questions = [line.strip() for line in f if line.strip()]
+            embed_model = HuggingFaceEmbedding(model_name=EMBED_MODEL_NAME)
+            queries = np.array([embed_model.get_query_embedding(q) for q in questions])
+        else:
+            rng = np.random.default_rng(0)
+            rows = np.sort(rng.choice(len(store), min(args.samples, len(store)), replace=False))
+            # perturbed chunk vectors stand in for questions about them
+            queries = np.asarray(store._vectors[rows], dtype=np.float32)
+            queries = queries + rng.normal(0, 0.03, queries.shape)
+        benchmark(collection, store, queries, args.k)
@@ -0,0 +1,298 @@
+# onnx_backend.py
+
+import json
+import os
+import time
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+DEFAULT_ONNX_DIR = os.getenv("ONNX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx_models"))
+
+# what HuggingFaceEmbedding prepends to BGE queries; the index was built against it
+BGE_QUERY_INSTRUCTION = "Represent this question for searching relevant passages: "
+
+# short name: (Hugging Face model, kind, pooling, query instruction)
+MODELS = {
+    "minilm": ("sentence-transformers/all-MiniLM-L6-v2", "embedding", "mean", ""),
+    "bge-small": ("BAAI/bge-small-en-v1.5", "embedding", "cls", BGE_QUERY_INSTRUCTION),
+    "reranker": ("cross-encoder/ms-marco-MiniLM-L-6-v2", "cross-encoder", None, ""),
+}
+
+
+def use_onnx():
+    """ INFERENCE_BACKEND=onnx serves the int8 ONNX exports instead of PyTorch """
+    return os.getenv("INFERENCE_BACKEND", "torch") == "onnx"
+
+
+def model_dir(key, root=DEFAULT_ONNX_DIR):
+    return os.path.join(root, key)
+
+
+# ---------------------------
+# EXPORT + QUANTIZE
+# ---------------------------
+def export_model(key, root=DEFAULT_ONNX_DIR, opset=17):
+    """
+    Export one model to <root>/<key>/model.onnx (fp32) and model.int8.onnx
+    (dynamic int8 quantization of the MatMul weights), next to its tokenizer.
+    Needs torch + transformers; serving only needs onnxruntime + tokenizers.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoModelForSequenceClassification, AutoTokenizer
+
+    name, kind, pooling, _ = MODELS[key]
+    out = model_dir(key, root)
+    os.makedirs(out, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    model_cls = AutoModelForSequenceClassification if kind == "cross-encoder" else AutoModel
+    model = model_cls.from_pretrained(name).eval()
+    tokenizer.save_pretrained(out)
+
+    sample = tokenizer(["warm up"], ["warm up"] if kind == "cross-encoder" else None, return_tensors="pt")
+    inputs = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in sample]
+    output = "logits" if kind == "cross-encoder" else "last_hidden_state"
+    dynamic = {k: {0: "batch", 1: "sequence"} for k in inputs}
+    dynamic[output] = {0: "batch"} if kind == "cross-encoder" else {0: "batch", 1: "sequence"}
+
+    fp32 = os.path.join(out, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[k] for k in inputs), fp32, input_names=inputs,
+                          output_names=[output], dynamic_axes=dynamic, opset_version=opset)
+    quantize_dynamic(fp32, os.path.join(out, "model.int8.onnx"), weight_type=QuantType.QInt8)
+
+    with open(os.path.join(out, "onnx_config.json"), "w", encoding="utf-8") as f:
+        json.dump({"model": name, "kind": kind, "pooling": pooling, "inputs": inputs, "output": output}, f)
+    print(f"✅ Exported {name} -> {out} (fp32 + int8)")
+    return out
+
+
+# ---------------------------
+# ONNX RUNTIME INFERENCE
+# ---------------------------
+def default_threads():
+    """
+    Threads inside one inference call. Up to INFERENCE_THREADS calls run at
+    once (the serving pool), so each gets its share of the cores rather than
+    all of them; ONNX_THREADS overrides.
+    """
+    cores = os.cpu_count() or 1
+    concurrent = max(1, int(os.getenv("INFERENCE_THREADS", str(cores))))
+    return int(os.getenv("ONNX_THREADS", "0")) or max(1, cores // concurrent)
+
+
+def make_session(path, threads=None):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    # one request = one sequential graph: its threads inside the op, none across ops
+    options.intra_op_num_threads = threads or default_threads()
+    options.inter_op_num_threads = 1
+    return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+def _pad_token(path):
+    """ Padding token saved by export_model's tokenizer.save_pretrained (BERT's [PAD] otherwise) """
+    try:
+        with open(os.path.join(path, "tokenizer_config.json"), "r", encoding="utf-8") as f:
+            pad_token = json.load(f).get("pad_token")
+    except (OSError, ValueError):
+        pad_token = None
+    if isinstance(pad_token, dict):
+        pad_token = pad_token.get("content")
+    return pad_token or "[PAD]"
+
+
+class OnnxModel:
+    """
+    Tokenizer + ONNX Runtime session for one exported model directory. The
+    tokenizer is read from the exported tokenizer.json with `tokenizers`
+    alone, so serving needs neither torch nor transformers.
+    """
+
+    def __init__(self, path, quantized=True, threads=None, max_length=512):
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(path, "onnx_config.json"), "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.tokenizer = Tokenizer.from_file(os.path.join(path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        # padded to the longest text in the batch, not to max_length
+        pad_token = _pad_token(path)
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+        self.session = make_session(os.path.join(path, "model.int8.onnx" if quantized else "model.onnx"), threads)
+        self.max_length = max_length
+
+    def run(self, texts, pairs=None):
+        encodings = self.tokenizer.encode_batch(list(zip(texts, pairs)) if pairs is not None else texts)
+        encoded = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        feeds = {k: encoded[k] for k in self.config["inputs"]}
+        return self.session.run([self.config["output"]], feeds)[0], encoded["attention_mask"]
+
+    def batches(self, count, lengths, batch_size):
+        # similar lengths together, so padding stays small
+        order = np.argsort(lengths, kind="stable")
+        for start in range(0, count, batch_size):
+            yield order[start:start + batch_size]
+
+
+class OnnxEncoder(OnnxModel):
+    def encode(self, texts, batch_size=32):
+        """ L2-normalized sentence embeddings, (len(texts), dim) float32 """
+        out = None
+        for rows in self.batches(len(texts), [len(t) for t in texts], batch_size):
+            hidden, mask = self.run([texts[i] for i in rows])
+            if self.config["pooling"] == "cls":
+                pooled = hidden[:, 0]
+            else:
+                mask = mask[..., None].astype(np.float32)
+                pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            if out is None:
+                out = np.zeros((len(texts), pooled.shape[1]), dtype=np.float32)
+            out[rows] = pooled
+        return out if out is not None else np.zeros((0, 0), dtype=np.float32)
+
+
+class OnnxCrossEncoder(OnnxModel):
+    """ Drop-in for sentence_transformers.CrossEncoder.predict on single-logit rerankers """
+
+    def predict(self, pairs, batch_size=32, **kwargs):
+        scores = np.zeros(len(pairs), dtype=np.float32)
+        for rows in self.batches(len(pairs), [len(q) + len(d) for q, d in pairs], batch_size):
+            logits, _ = self.run([pairs[i][0] for i in rows], [pairs[i][1] for i in rows])
+            scores[rows] = logits[:, 0]
+        # CrossEncoder applies a sigmoid to single-label models
+        return 1.0 / (1.0 + np.exp(-scores))
+
+
+class OnnxEmbedding(BaseEmbedding):
+    """ llama-index embedding model backed by OnnxEncoder, for `embed_model=` """
+
+    _encoder = PrivateAttr()
+    _query_instruction = PrivateAttr()
+
+    def __init__(self, path, quantized=True, threads=None, query_instruction=None, **kwargs):
+        key = os.path.basename(os.path.normpath(path))
+        super().__init__(model_name=key, **kwargs)
+        self._encoder = OnnxEncoder(path, quantized, threads)
+        # same default as HuggingFaceEmbedding: the model's own query instruction
+        if query_instruction is None:
+            query_instruction = MODELS[key][3] if key in MODELS else ""
+        self._query_instruction = query_instruction
+
+    @classmethod
+    def class_name(cls):
+        return "OnnxEmbedding"
+
+    def _get_query_embedding(self, query):
+        return self._encoder.encode([self._query_instruction + query])[0].tolist()
+
+    def _get_text_embedding(self, text):
+        return self._encoder.encode([text])[0].tolist()
+
+    def _get_text_embeddings(self, texts):
+        return self._encoder.encode(list(texts), batch_size=self.embed_batch_size).tolist()
+
+    async def _aget_query_embedding(self, query):
+        return self._get_query_embedding(query)
+
+
+# ---------------------------
+# ACCURACY + LATENCY CHECK
+# ---------------------------
+SAMPLE_QUERIES = [
+    "What is the fee for B.Tech CSE at UIET?",
+    "How do I apply for hostel accommodation?",
+    "Where can I download PYQ papers?",
+    "What is the eligibility for M.Sc. Physics?",
+    "Last date for the scholarship form",
+]
+SAMPLE_PASSAGES = [
+    "The annual fee for B.Tech Computer Science and Engineering at UIET is listed in the fee structure PDF.",
+    "Hostel allotment is done online; students must fill the hostel form after admission.",
+    "Previous year question papers are available on the university library portal.",
+    "Candidates with B.Sc. with Physics and 50% marks are eligible for M.Sc. Physics.",
+    "The post-matric scholarship form must be submitted before 31 October.",
+    "Panjab University campus has a health centre, gymnasium and a central library.",
+    "Admission to MBA is through the CET conducted by Panjab University.",
+    "Girls hostel fees include mess charges and a refundable security deposit.",
+]
+
+
+def _timed(fn, repeat=5):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def check_embedding(key, texts, root=DEFAULT_ONNX_DIR):
+    """ Cosine agreement of fp32 / int8 ONNX with the PyTorch model, and latency of each """
+    from sentence_transformers import SentenceTransformer
+
+    reference = SentenceTransformer(MODELS[key][0])
+    ref = reference.encode(texts, normalize_embeddings=True)
+    print(f"🔎 {key}: {len(texts)} texts")
+    print(f"  torch:      single {_timed(lambda: reference.encode(texts[:1])):7.1f} ms, "
+          f"batch {_timed(lambda: reference.encode(texts)):7.1f} ms")
+    for quantized in (False, True):
+        encoder = OnnxEncoder(model_dir(key, root), quantized)
+        cosine = (encoder.encode(texts) * ref).sum(axis=1)
+        print(f"  onnx {'int8' if quantized else 'fp32'}:  single {_timed(lambda: encoder.encode(texts[:1])):7.1f} ms, "
+              f"batch {_timed(lambda: encoder.encode(texts)):7.1f} ms, "
+              f"cosine vs torch mean {cosine.mean():.4f} / min {cosine.min():.4f}")
+
+
+def check_reranker(queries, passages, root=DEFAULT_ONNX_DIR, top=3):
+    """ Whether the ONNX rerank order matches PyTorch (full order and top-3 set), and latency """
+    from sentence_transformers import CrossEncoder
+
+    reference = CrossEncoder(MODELS["reranker"][0])
+    pairs = [[q, p] for q in queries for p in passages]
+    ref = np.asarray(reference.predict(pairs)).reshape(len(queries), len(passages))
+    print(f"🔎 reranker: {len(queries)} queries x {len(passages)} passages")
+    print(f"  torch:      {_timed(lambda: reference.predict(pairs)):7.1f} ms for {len(pairs)} pairs")
+    for quantized in (False, True):
+        model = OnnxCrossEncoder(model_dir("reranker", root), quantized)
+        scores = model.predict(pairs).reshape(len(queries), len(passages))
+        same_order = np.mean([(np.argsort(-s) == np.argsort(-r)).all() for s, r in zip(scores, ref)])
+        same_top = np.mean([set(np.argsort(-s)[:top]) == set(np.argsort(-r)[:top]) for s, r in zip(scores, ref)])
+        print(f"  onnx {'int8' if quantized else 'fp32'}:  {_timed(lambda: model.predict(pairs)):7.1f} ms, "
+              f"identical order {same_order * 100:.0f}%, same top-{top} {same_top * 100:.0f}%, "
+              f"max |score diff| {np.abs(scores - ref).max():.4f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export models to int8 ONNX, or check them against PyTorch")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--model", choices=[*MODELS, "all"], default="all")
+    parser.add_argument("--root", default=DEFAULT_ONNX_DIR)
+    parser.add_argument("--texts", help="text file, one passage per line (default: built-in samples)")
+    args = parser.parse_args()
+
+    keys = list(MODELS) if args.model == "all" else [args.model]
+    passages = SAMPLE_PASSAGES
+    if args.texts:
+        with open(args.texts, "r", encoding="utf-8") as f:
+            passages = [line.strip() for line in f if line.strip()]
+
+    for key in keys:
+        if args.command == "export":
+            export_model(key, args.root)
+        elif MODELS[key][1] == "cross-encoder":
+            check_reranker(SAMPLE_QUERIES, passages, args.root)
+        else:
+            check_embedding(key, SAMPLE_QUERIES + passages, args.root)
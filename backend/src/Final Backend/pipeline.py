@@ -1,16 +1,27 @@
 import os
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 
-from llama_index.core import StorageContext, load_index_from_storage
+from llama_index.core import StorageContext
 from llama_index.vector_stores.chroma import ChromaVectorStore
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 
 from chromadb import PersistentClient
-from groq import Groq
+from groq import AsyncGroq, Groq
 import re
 
+from answer_cache import AnswerCache, partition_key, query_entities, register_cache_route, should_cache
+from compact_store import CompactVectorStore, collection_revision
+from numpy_store import NumpyVectorStore
+from index_manager import IndexManager, register_admin_routes
+from llm_steps import AnswerStream, run_steps, sse, stream_steps
+from lexical_index import load_hybrid_index
+from onnx_backend import OnnxCrossEncoder, OnnxEmbedding, model_dir, use_onnx
+from rerank import RERANK_CANDIDATES, RerankStage
+from retrieval import Retrieval
+from startup import Startup, register_health_route
+from table_store import TableStore
+
 # =====================================================
 # ENV + FLASK
 # =====================================================
@@ -21,7 +32,10 @@ if not GROQ_API_KEY:
     raise RuntimeError("❌ GROQ_API_KEY missing in .env file!")
 
 app = Flask(__name__)
-CORS(app, origins="*", supports_credentials=True)
+# asgi_server.py applies the same rule when it serves this engine
+CORS_ORIGINS = ["*"]
+CORS_CREDENTIALS = True
+CORS(app, origins=CORS_ORIGINS, supports_credentials=CORS_CREDENTIALS)
 
 
 # =====================================================
@@ -32,6 +46,10 @@ def init_llm() -> Groq:
     return Groq(api_key=GROQ_API_KEY)
 
 
+def init_async_llm() -> AsyncGroq:
+    return AsyncGroq(api_key=GROQ_API_KEY)
+
+
 def groq_generate(llm_client: Groq, prompt: str) -> str:
     resp = llm_client.chat.completions.create(
         model="llama-3.1-8b-instant",
@@ -41,7 +59,49 @@ def groq_generate(llm_client: Groq, prompt: str) -> str:
     return resp.choices[0].message.content.strip()
 
 
+async def agroq_generate(prompt: str) -> str:
+    # awaited by the ASGI server (asgi_server.py), so no thread waits on Groq
+    resp = await startup.get("async_llm").chat.completions.create(
+        model="llama-3.1-8b-instant",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.05,
+    )
+    return resp.choices[0].message.content.strip()
+
+
+def groq_stream(llm_client: Groq, prompt: str):
+    # same call, text pieces as they arrive (for /api/chat/stream)
+    stream = llm_client.chat.completions.create(
+        model="llama-3.1-8b-instant",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.05,
+        stream=True,
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def agroq_stream(prompt: str):
+    stream = await startup.get("async_llm").chat.completions.create(
+        model="llama-3.1-8b-instant",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.05,
+        stream=True,
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
 def init_embed_model():
+    # INFERENCE_BACKEND=onnx serves the int8 export made by onnx_backend.py
+    if use_onnx():
+        return OnnxEmbedding(model_dir("minilm"), embed_batch_size=8)
+
+    # torch / sentence-transformers are imported here, on a startup thread, not at import
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
     return HuggingFaceEmbedding(
         model_name="sentence-transformers/all-MiniLM-L6-v2",
         cache_folder="./model_cache",
@@ -49,24 +109,60 @@ def init_embed_model():
     )
 
 
+def init_reranker():
+    if use_onnx():
+        return OnnxCrossEncoder(model_dir("reranker"))
+
+    from sentence_transformers import CrossEncoder
+
+    return CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+
 def init_vector_store(path="./chroma_db", name="rag-collection"):
     client = PersistentClient(path=path)
     collection = client.get_or_create_collection(name)
+    # VECTOR_STORE=compact searches the quantized copy built by compact_store.py;
+    # a copy older than the last index update refuses to load
+    if os.getenv("VECTOR_STORE", "chroma") == "compact":
+        compact_dir = os.path.join(os.path.dirname(path), "compact_index")
+        store = CompactVectorStore(os.getenv("COMPACT_INDEX_DIR", compact_dir),
+                                   revision=collection_revision(collection))
+        print(f"💾 {store.memory_report()}")
+        return store
+    # VECTOR_STORE=numpy does exact search over the mmap'd copy built by numpy_store.py
+    if os.getenv("VECTOR_STORE", "chroma") == "numpy":
+        numpy_dir = os.path.join(os.path.dirname(path), "numpy_index")
+        return NumpyVectorStore(os.getenv("NUMPY_INDEX_DIR", numpy_dir), revision=collection_revision(collection))
     return ChromaVectorStore(chroma_collection=collection, persist_path=path)
 
 
-def load_index(embed_model=None, vector_store=None):
+def load_index(embed_model=None, vector_store=None, persist_dir="./index"):
     storage = StorageContext.from_defaults(
-        persist_dir="./index",
+        persist_dir=persist_dir,
         vector_store=vector_store,
     )
-    return load_index_from_storage(storage, embed_model=embed_model)
+    # as_retriever() fuses vector and BM25 results when the index has lexical.sqlite
+    return load_hybrid_index(storage, persist_dir, embed_model=embed_model)
 
 
 # =====================================================
 # LINK EXTRACTOR
 # =====================================================
 
+def clean_reply(answer: str) -> str:
+    """ Reply text without URLs, markdown links and the follow-up block """
+    # markdown links first: stripping the bare URL first would leave "[label](" behind
+    cleaned = re.sub(r"\[[^\]]+\]\([^\)]+\)", "", answer)
+    cleaned = re.sub(r"https?://\S+", "", cleaned)
+    cleaned = re.sub(r"Know more about:.*", "", cleaned, flags=re.IGNORECASE)
+    return cleaned.strip()
+
+
+def answer_view():
+    """ What a streamed answer looks like before post-processing finishes """
+    return AnswerStream(["know more about"], clean_reply)
+
+
 def extract_markdown_links(text: str):
     pattern = r"\[([^\]]+)\]\((https?://[^\)]+)\)"
     matches = re.findall(pattern, text)
@@ -106,12 +202,36 @@ def build_user_profile_text(profile: dict) -> str:
 # INITIALIZE RAG PIPELINE
 # =====================================================
 
-llm_client = init_llm()
-embed_model = init_embed_model()
-vector_store = init_vector_store()
-index = load_index(embed_model, vector_store)
+# Versioned indexes under ./indexes (./chroma_db + ./index until one is published),
+# hot-swappable through /admin/index/swap
+def load_version(version_dir):
+    vector_store = init_vector_store(os.path.join(version_dir, "chroma_db"))
+    return load_index(startup.get("embed_model"), vector_store, os.path.join(version_dir, "index"))
+
+
+def init_indexes(startup):
+    indexes = IndexManager(load_version)
+    indexes.start()
+    return indexes
+
+
+def warm_up(startup):
+    # the index manager already ran warm-up retrievals; this covers the first embed and rerank
+    startup.get("embed_model").get_query_embedding("warm up")
+    startup.get("reranker").warm_up()
 
-print("✅ PU Chatbot Pipeline Ready!")
+
+# Nothing loads at import: models load in parallel once the server starts (or on first request)
+startup = Startup({
+    "llm": lambda s: init_llm(),
+    "async_llm": lambda s: init_async_llm(),
+    "embed_model": lambda s: init_embed_model(),
+    "indexes": init_indexes,
+    "reranker": lambda s: RerankStage(init_reranker()),
+    "retrieval": lambda s: Retrieval(s.get("embed_model")),
+    "answers": lambda s: AnswerCache(s.get("retrieval").embed_query),
+    "tables": lambda s: TableStore(),
+}, warmup=warm_up, name="pipeline")
 
 
 # =====================================================
@@ -126,6 +246,11 @@ session = {"original_query": None, "expecting": False}
 # =====================================================
 
 def generate_answer(query: str, profile: dict):
+    return run_steps(answer_steps(query, profile), lambda prompt: groq_generate(startup.get("llm"), prompt))
+
+
+def answer_steps(query: str, profile: dict):
+    """ generate_answer minus the LLM call: yields the prompt, receives the reply (see llm_steps.py) """
     global session
     q = query.lower().strip()
 
@@ -167,6 +292,16 @@ def generate_answer(query: str, profile: dict):
 
     VAGUE = ["fee", "hostel", "scholarship", "form", "apply"]
 
+    # --- FEE / SEAT TABLE ROWS (answered without the LLM) ---
+    if session["expecting"] and session["original_query"]:
+        table_reply = startup.get("tables").answer(f"{session['original_query']} for {query}", profile.get("department"))
+    else:
+        table_reply = startup.get("tables").answer(query, profile.get("department"))
+    if table_reply:
+        session["expecting"] = False
+        session["original_query"] = None
+        return table_reply
+
     if session["expecting"] and session["original_query"]:
         query = f"{session['original_query']} for {query}"
         session["expecting"] = False
@@ -195,11 +330,23 @@ def generate_answer(query: str, profile: dict):
     # RAG RETRIEVAL
     # ==================================================
 
-    retriever = index.as_retriever(similarity_top_k=8)
-    nodes = retriever.retrieve(query)
-    context = "\n---\n".join([n.get_content() for n in nodes])
+    # read once: this request finishes on this index even if a swap happens meanwhile
+    current = startup.get("indexes").current
     profile_text = build_user_profile_text(profile)
 
+    # Repeated questions (same or near-identical wording, same profile and
+    # same departments / years / degrees asked about) skip retrieval and Groq
+    answers = startup.get("answers")
+    partition = partition_key(profile_text, query_entities(query))
+    cached, query_embedding = answers.get(query, partition, current.version)
+    if cached:
+        return cached
+
+    # over-retrieve, then only the 3 best by cross-encoder score reach the LLM
+    hits = startup.get("retrieval").retrieve(current, query, RERANK_CANDIDATES)
+    nodes = startup.get("reranker").rerank(query, hits)
+    context = "\n---\n".join([n.get_content() for n in nodes])
+
     # ==================================================
     # BUILD LLM PROMPT
     # ==================================================
@@ -344,10 +491,10 @@ STUDENT’S QUESTION:
 YOUR ANSWER:
 """.strip()
 
-    # LLM CALL
+    # LLM CALL (made by whoever drives these steps)
     try:
-        answer = groq_generate(llm_client, prompt)
-    except:
+        answer = yield prompt
+    except Exception:
         return {
             "reply": "⚠️ Server error. Please try again.",
             "follow_ups": [],
@@ -372,10 +519,7 @@ YOUR ANSWER:
     followups = followups[:3]
 
     # Clean text
-    cleaned = re.sub(r"https?://\S+", "", answer)
-    cleaned = re.sub(r"\[[^\]]+\]\([^\)]+\)", "", cleaned)
-    cleaned = re.sub(r"Know more about:.*", "", cleaned, flags=re.IGNORECASE)
-    cleaned = cleaned.strip()
+    cleaned = clean_reply(answer)
 
     # ==================================================
     # STATIC LINKS BASED ON QUERY
@@ -429,12 +573,15 @@ YOUR ANSWER:
 
     final_links = llm_links + extra_links
 
-    return {
+    result = {
         "reply": cleaned,
         "follow_ups": followups,
         "pdf": None,
         "links": final_links
     }
+    if should_cache(cleaned, context):
+        answers.put(query, partition, current.version, result, query_embedding)
+    return result
 
 
 # =====================================================
@@ -449,19 +596,41 @@ def chat_api():
 
     if not query:
         return jsonify({"reply": "Please type something."})
+    if not startup.ready:
+        return jsonify({"reply": "⏳ The assistant is starting up, please try again in a few seconds."}), 503
 
     return jsonify(generate_answer(query, profile))
 
 
+@app.route("/api/chat/stream", methods=["POST"])
+def chat_stream_api():
+    """ /api/chat as Server-Sent Events: "token"/"replace" while the LLM writes, then "done" with the JSON """
+    data = request.get_json() or {}
+    query = data.get("message", "").strip()
+    profile = data.get("student_profile") or {}
+
+    if not query:
+        events = iter([sse("done", {"reply": "Please type something."})])
+    elif not startup.ready:
+        return jsonify({"reply": "⏳ The assistant is starting up, please try again in a few seconds."}), 503
+    else:
+        steps = answer_steps(query, profile)
+        events = stream_steps(steps, lambda prompt: groq_stream(startup.get("llm"), prompt), answer_view())
+
+    return Response(stream_with_context(events), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @app.route("/files/<path:filename>")
 def download_file(filename):
     return send_from_directory("static", filename, as_attachment=True)
 
 
-@app.route("/healthz")
-def health():
-    return "OK", 200
+register_health_route(app, startup)
+register_cache_route(app, answers=lambda: startup.get("answers"), retrieval=lambda: startup.get("retrieval"))
+register_admin_routes(app, lambda: startup.get("indexes"))
 
 
 if __name__ == "__main__":
+    startup.start()
     app.run(port=5000, host="0.0.0.0", debug=True, use_reloader=False)
@@ -1,17 +1,26 @@
 import os
 import re
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 
-from llama_index.core import StorageContext, load_index_from_storage
+from llama_index.core import StorageContext
 from llama_index.vector_stores.chroma import ChromaVectorStore
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 
-from groq import Groq
+from groq import AsyncGroq, Groq
 import chromadb
-from sentence_transformers import CrossEncoder
 from intent_links import intent_to_url
+from answer_cache import AnswerCache, partition_key, query_entities, register_cache_route, should_cache
+from compact_store import CompactVectorStore, collection_revision
+from numpy_store import NumpyVectorStore
+from index_manager import IndexManager, register_admin_routes
+from llm_steps import AnswerStream, run_steps, stream_steps
+from lexical_index import load_hybrid_index
+from onnx_backend import OnnxCrossEncoder, OnnxEmbedding, model_dir, use_onnx
+from rerank import RERANK_CANDIDATES, RerankStage
+from retrieval import Retrieval
+from startup import Startup, register_health_route
+from table_store import TableStore
 
 
 # ---------------------------
@@ -45,20 +54,52 @@ def init_llm():
     return Groq(api_key=api_key)
 
 
+def init_async_llm():
+    """ Groq client for the ASGI server (asgi_server.py); same key rotation """
+    api_key = get_next_groq_key()
+    print(f"🔑 Using GROQ Key (async): {api_key[:6]}*****")
+
+    return AsyncGroq(api_key=api_key)
+
+
 # ---------------------------
 # RAG COMPONENT INITIALIZERS
 # ---------------------------
 def init_embed_model():
+    # INFERENCE_BACKEND=onnx serves the int8 export made by onnx_backend.py
+    if use_onnx():
+        return OnnxEmbedding(model_dir("minilm"))
+
+    # torch / sentence-transformers are imported here, on a startup thread, not at import
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
     return HuggingFaceEmbedding("sentence-transformers/all-MiniLM-L6-v2")
 
 
 def init_reranker():
+    if use_onnx():
+        return OnnxCrossEncoder(model_dir("reranker"))
+
+    from sentence_transformers import CrossEncoder
+
     return CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
 
 
 def init_vector_store(persist_dir="./chroma_db", collection_name="rag-collection"):
     client = chromadb.PersistentClient(path=persist_dir)
     coll = client.get_or_create_collection(collection_name)
+    # VECTOR_STORE=compact searches the quantized copy built by compact_store.py;
+    # a copy older than the last index update refuses to load
+    if os.getenv("VECTOR_STORE", "chroma") == "compact":
+        compact_dir = os.path.join(os.path.dirname(persist_dir), "compact_index")
+        store = CompactVectorStore(os.getenv("COMPACT_INDEX_DIR", compact_dir),
+                                   revision=collection_revision(coll))
+        print(f"💾 {store.memory_report()}")
+        return store
+    # VECTOR_STORE=numpy does exact search over the mmap'd copy built by numpy_store.py
+    if os.getenv("VECTOR_STORE", "chroma") == "numpy":
+        numpy_dir = os.path.join(os.path.dirname(persist_dir), "numpy_index")
+        return NumpyVectorStore(os.getenv("NUMPY_INDEX_DIR", numpy_dir), revision=collection_revision(coll))
     return ChromaVectorStore(chroma_collection=coll)
 
 
@@ -67,29 +108,56 @@ def load_index(persist_dir="./chroma_db", index_dir="./index", embed_model=None,
         persist_dir=index_dir,
         vector_store=vector_store
     )
-    return load_index_from_storage(sc, embed_model=embed_model)
+    # as_retriever() fuses vector and BM25 results when the index has lexical.sqlite
+    return load_hybrid_index(sc, index_dir, embed_model=embed_model)
+
+
+def init_index_manager(embed_model):
+    """ Versioned indexes under ./indexes (./chroma_db + ./index until one is published) """
+    def load_version(version_dir):
+        persist_dir = os.path.join(version_dir, "chroma_db")
+        store = init_vector_store(persist_dir)
+        return load_index(persist_dir, os.path.join(version_dir, "index"), embed_model=embed_model, vector_store=store)
+
+    manager = IndexManager(load_version)
+    manager.start()
+    return manager
+
+
+def warm_up(startup):
+    # the index manager already ran warm-up retrievals; this covers the first embed and rerank
+    startup.get("embed_model").get_query_embedding("warm up")
+    startup.get("reranker").warm_up()
+
+
+# Nothing loads at import: models load in parallel once the server starts (or on first request)
+startup = Startup({
+    "llm": lambda s: init_llm(),
+    "async_llm": lambda s: init_async_llm(),
+    "embed_model": lambda s: init_embed_model(),
+    "indexes": lambda s: init_index_manager(s.get("embed_model")),
+    "reranker": lambda s: RerankStage(init_reranker()),
+    "tables": lambda s: TableStore(),
+    "retrieval": lambda s: Retrieval(s.get("embed_model")),
+    "answers": lambda s: AnswerCache(s.get("retrieval").embed_query),
+}, warmup=warm_up, name="rag_pipeline")
 
 
 def initialize_pipeline():
-    embed = init_embed_model()
-    store = init_vector_store()
-    llm_client = init_llm()
-    index = load_index(embed_model=embed, vector_store=store)
-    reranker = init_reranker()
+    """ Blocks until every component is loaded and warmed up """
+    if not startup.wait():
+        raise RuntimeError(f"❌ Pipeline failed to start: {startup.error}")
 
     return {
-        "llm": llm_client,
-        "embed_model": embed,
-        "vector_store": store,
-        "index": index,
-        "reranker": reranker
+        "llm": startup.get("llm"),
+        "embed_model": startup.get("embed_model"),
+        "indexes": startup.get("indexes"),
+        "reranker": startup.get("reranker"),
+        "retrieval": startup.get("retrieval"),
+        "answers": startup.get("answers")
     }
 
 
-pipeline = initialize_pipeline()
-print("✅ Pipeline initialized successfully.")
-
-
 # ---------------------------
 # GROQ GENERATION FUNCTION
 # ---------------------------
@@ -100,7 +168,7 @@ def groq_generate(llm, prompt):
             messages=[{"role": "user", "content": prompt}],
             temperature=0.1
         )
-        return response.choices[0].message["content"]
+        return response.choices[0].message.content
 
     except Exception as e:
         print("⚠️ GROQ error:", e)
@@ -114,7 +182,76 @@ def groq_generate(llm, prompt):
             messages=[{"role": "user", "content": prompt}],
             temperature=0.1
         )
-        return response.choices[0].message["content"]
+        return response.choices[0].message.content
+
+
+async def agroq_generate(prompt):
+    """ groq_generate for the ASGI server: awaited, so no thread waits on Groq """
+    llm = startup.get("async_llm")
+    try:
+        response = await llm.chat.completions.create(
+            model="llama3.1-8b-instant",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1
+        )
+        return response.choices[0].message.content
+
+    except Exception as e:
+        print("⚠️ GROQ error:", e)
+
+        # fallback: try next API key
+        print("🔄 Switching API Key...")
+        response = await init_async_llm().chat.completions.create(
+            model="llama3.1-8b-instant",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1
+        )
+        return response.choices[0].message.content
+
+
+def _open_stream(client, prompt):
+    return client.chat.completions.create(
+        model="llama3.1-8b-instant",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.1,
+        stream=True
+    )
+
+
+def groq_stream(llm, prompt):
+    """ groq_generate for /api/chat/stream: text pieces as they arrive """
+    try:
+        stream = _open_stream(llm, prompt)
+    except Exception as e:
+        print("⚠️ GROQ error:", e)
+
+        # fallback: try next API key
+        print("🔄 Switching API Key...")
+        stream = _open_stream(init_llm(), prompt)
+
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def agroq_stream(prompt):
+    try:
+        stream = await _open_stream(startup.get("async_llm"), prompt)
+    except Exception as e:
+        print("⚠️ GROQ error:", e)
+
+        # fallback: try next API key
+        print("🔄 Switching API Key...")
+        stream = await _open_stream(init_async_llm(), prompt)
+
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def answer_view():
+    """ What a streamed answer looks like before the follow-ups are split off """
+    return AnswerStream(["know more about", "suggestion", "follow-up question"])
 
 
 # ---------------------------
@@ -131,26 +268,48 @@ session = {
 # ---------------------------
 def generate_answer(query, pipeline=None, student_profile=None):
     if pipeline is None:
-        pipeline = globals().get("pipeline")
-        if pipeline is None:
-            pipeline = initialize_pipeline()
+        pipeline = initialize_pipeline()
 
     llm = pipeline["llm"]
-    index = pipeline["index"]
+    return run_steps(answer_steps(query, pipeline, student_profile), lambda prompt: groq_generate(llm, prompt))
+
+
+def answer_steps(query, pipeline, student_profile=None):
+    """ generate_answer minus the LLM call: yields the prompt, receives the reply (see llm_steps.py) """
+    # read once: this request finishes on this index even if a swap happens meanwhile
+    current = pipeline["indexes"].current
 
     vague_keywords = ["fee", "admission", "form", "hostel", "apply", "scholarship", "process"]
 
+    clarified = False
     if session["expecting_clarification"] and session["original_query"]:
         query = f"{session['original_query']} for {query}"
         session["original_query"] = None
         session["expecting_clarification"] = False
+        clarified = True
 
-    elif any(k in query.lower() for k in vague_keywords):
+    # Fee/seat questions that match a table row are answered from the row, no LLM call
+    table_reply = startup.get("tables").answer(query, department=(student_profile or {}).get("department"))
+    if table_reply:
+        return table_reply
+
+    if not clarified and any(k in query.lower() for k in vague_keywords):
         session["original_query"] = query
         session["expecting_clarification"] = True
 
-    retriever = index.as_retriever(similarity_top_k=3)
-    context = "\n\n---\n\n".join(node.get_content() for node in retriever.retrieve(query))
+    # Repeated questions (same or near-identical wording, same profile and
+    # same departments / years / degrees asked about) skip retrieval and Groq
+    profile = student_profile or {}
+    partition = partition_key(profile.get("full_name"), profile.get("department"), profile.get("batch"),
+                              query_entities(query))
+    cached, query_embedding = pipeline["answers"].get(query, partition, current.version)
+    if cached:
+        return cached
+
+    # over-retrieve, then only the 3 best by cross-encoder score reach the LLM
+    hits = pipeline["retrieval"].retrieve(current, query, RERANK_CANDIDATES)
+    nodes = pipeline["reranker"].rerank(query, hits)
+    context = "\n\n---\n\n".join(node.get_content() for node in nodes)
 
     personalization_prompt = ""
     if student_profile and student_profile.get("full_name"):
@@ -258,7 +417,7 @@ Follow-Up Suggestions (only after giving a complete answer):
 """.strip()
 
     try:
-        reply = groq_generate(llm, prompt)
+        reply = yield prompt
 
     except Exception as e:
         print("❌ Fatal Groq Error:", e)
@@ -289,19 +448,25 @@ Follow-Up Suggestions (only after giving a complete answer):
         else:
             parsed_links.append({"label": label_clean, "url": url_clean})
 
-    return {
+    result = {
         "reply": cleaned_reply,
         "follow_ups": follow_ups or ["Scholarships", "Hostels", "Campus Life"],
         "links": parsed_links,
         "pdf": pdf_url
     }
+    if should_cache(cleaned_reply, context):
+        pipeline["answers"].put(query, partition, current.version, result, query_embedding)
+    return result
 
 
 # ---------------------------
 # FLASK ROUTES
 # ---------------------------
 app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": "http://localhost:5173"}})
+# asgi_server.py applies the same rule when it serves this engine
+CORS_ORIGINS = ["http://localhost:5173"]
+CORS_CREDENTIALS = False
+CORS(app, resources={r"/api/*": {"origins": CORS_ORIGINS}}, supports_credentials=CORS_CREDENTIALS)
 
 
 @app.route("/api/chat", methods=["POST"])
@@ -309,19 +474,39 @@ def chat():
     data = request.get_json()
     query = data.get("message", "")
     student_profile = data.get("student_profile", None)
-    result = generate_answer(query, pipeline, student_profile)
+    if not startup.ready:
+        return jsonify({"reply": "⏳ The assistant is starting up, please try again in a few seconds.",
+                        "follow_ups": []}), 503
+    result = generate_answer(query, initialize_pipeline(), student_profile)
     return jsonify(result)
 
 
+@app.route("/api/chat/stream", methods=["POST"])
+def chat_stream():
+    """ /api/chat as Server-Sent Events: "token"/"replace" while the LLM writes, then "done" with the JSON """
+    data = request.get_json()
+    query = data.get("message", "")
+    student_profile = data.get("student_profile", None)
+    if not startup.ready:
+        return jsonify({"reply": "⏳ The assistant is starting up, please try again in a few seconds.",
+                        "follow_ups": []}), 503
+    pipeline = initialize_pipeline()
+    steps = answer_steps(query, pipeline, student_profile)
+    events = stream_steps(steps, lambda prompt: groq_stream(pipeline["llm"], prompt), answer_view())
+    return Response(stream_with_context(events), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @app.route("/files/<path:filename>")
 def download_file(filename):
     return send_from_directory("static", filename)
 
 
-@app.route("/healthz")
-def health():
-    return "OK", 200
+register_health_route(app, startup)
+register_cache_route(app, answers=lambda: startup.get("answers"), retrieval=lambda: startup.get("retrieval"))
+register_admin_routes(app, lambda: startup.get("indexes"))
 
 
 if __name__ == "__main__":
+    startup.start()
     app.run(port=5000, host="0.0.0.0", debug=True)
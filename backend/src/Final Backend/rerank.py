@@ -0,0 +1,94 @@
+# rerank.py
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+RERANK_CANDIDATES = 10                                       # retrieved before reranking
+RERANK_TOP_N = 3                                             # chunks that reach the LLM
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "200"))
+
+
+def query_key(query):
+    return hashlib.sha1(" ".join(query.lower().split()).encode("utf-8")).hexdigest()
+
+
+class RerankStage:
+    """
+    Cross-encoder rerank of over-retrieved candidates under a latency budget.
+
+    Candidates not in the (query hash, node id) score cache are scored in one
+    padded batch. The number scored is capped by the budget, using a running
+    estimate of the per-pair cost, and the lowest-retrieved candidates are
+    dropped first. The dropped ones keep their retrieval order behind the
+    scored ones, so a tight budget degrades to plain retrieval order rather
+    than a slow answer.
+    """
+
+    def __init__(self, model, top_n=RERANK_TOP_N, budget_ms=RERANK_BUDGET_MS, cache_size=20000):
+        self.model = model
+        self.top_n = top_n
+        self.budget_ms = budget_ms
+        self.cache_size = cache_size
+        self.ms_per_pair = None
+        self.stats = {"queries": 0, "scored": 0, "cached": 0, "dropped": 0}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _score(self, pairs):
+        started = time.perf_counter()
+        scores = self.model.predict(pairs, batch_size=len(pairs))
+        per_pair = (time.perf_counter() - started) * 1000 / len(pairs)
+        # smoothed, so one slow call (GC, noisy neighbour) doesn't halve the next batch
+        self.ms_per_pair = per_pair if self.ms_per_pair is None else 0.8 * self.ms_per_pair + 0.2 * per_pair
+        return [float(s) for s in scores]
+
+    def warm_up(self, pairs=RERANK_CANDIDATES):
+        """ First call pays for lazy init; the second measures the per-pair cost for the budget """
+        batch = [["warm up query", "warm up passage " * 20]] * pairs
+        self._score(batch)
+        self.ms_per_pair = None
+        self._score(batch)
+
+    def rerank(self, query, nodes, top_n=None, budget_ms=None):
+        """ Best `top_n` of the retrieved NodeWithScore list, each carrying its cross-encoder score """
+        top_n = top_n or self.top_n
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        key = query_key(query)
+
+        with self._lock:
+            scores = {}
+            for hit in nodes:
+                cached = self._cache.get((key, hit.node.node_id))
+                if cached is not None:
+                    self._cache.move_to_end((key, hit.node.node_id))
+                    scores[hit.node.node_id] = cached
+        missing = [hit for hit in nodes if hit.node.node_id not in scores]
+
+        # how many uncached pairs fit in the budget (all of them until the cost is known)
+        allowed = len(missing)
+        if self.ms_per_pair:
+            allowed = min(allowed, int(budget_ms / self.ms_per_pair))
+        to_score = missing[:allowed]
+        if to_score:
+            new = self._score([[query, hit.node.get_content()] for hit in to_score])
+            with self._lock:
+                for hit, score in zip(to_score, new):
+                    scores[hit.node.node_id] = score
+                    self._cache[(key, hit.node.node_id)] = score
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        self.stats["queries"] += 1
+        self.stats["scored"] += len(to_score)
+        self.stats["cached"] += len(nodes) - len(missing)
+        self.stats["dropped"] += len(missing) - len(to_score)
+
+        scored = sorted((hit for hit in nodes if hit.node.node_id in scores),
+                        key=lambda hit: scores[hit.node.node_id], reverse=True)
+        unscored = [hit for hit in nodes if hit.node.node_id not in scores]
+        for hit in scored:
+            hit.score = scores[hit.node.node_id]
+        return (scored + unscored)[:top_n]
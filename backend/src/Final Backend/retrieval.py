@@ -0,0 +1,104 @@
+# retrieval.py
+
+import threading
+from collections import OrderedDict
+
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+from answer_cache import normalize_query
+
+
+class LRU:
+    """ Small thread-safe LRU with hit/miss counters """
+
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def drop(self, keep):
+        """ Remove every entry whose key fails `keep(key)` """
+        with self._lock:
+            for key in [k for k in self._items if not keep(k)]:
+                del self._items[key]
+
+    def report(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._items),
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None}
+
+
+class Retrieval:
+    """
+    Retrieval layer kept alive across requests.
+
+    - one retriever per (index version, top_k, filters), built once instead of per request
+    - query text -> embedding LRU, shared with the answer cache
+    - (index version, normalized query, top_k, filters) -> retrieved nodes LRU;
+      entries of other versions are dropped when the index is swapped
+    """
+
+    def __init__(self, embed_model, embedding_cache_size=4096, result_cache_size=2048):
+        self.embed_model = embed_model
+        self.embeddings = LRU(embedding_cache_size)
+        self.results = LRU(result_cache_size)
+        self.retrievers_built = 0
+        self._retrievers = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def embed_query(self, text):
+        key = " ".join(text.split())
+        embedding = self.embeddings.get(key)
+        if embedding is None:
+            embedding = self.embed_model.get_query_embedding(key)
+            self.embeddings.put(key, embedding)
+        return embedding
+
+    def _retriever(self, loaded, top_k, filters, filters_key):
+        key = (loaded.version, top_k, filters_key)
+        with self._lock:
+            if loaded.version != self._version:
+                # a swap happened: forget retrievers and results of other versions
+                self._retrievers = {k: r for k, r in self._retrievers.items() if k[0] == loaded.version}
+                self.results.drop(lambda k: k[0] == loaded.version)
+                self._version = loaded.version
+            if key not in self._retrievers:
+                self._retrievers[key] = loaded.index.as_retriever(similarity_top_k=top_k, filters=filters)
+                self.retrievers_built += 1
+            return self._retrievers[key]
+
+    def retrieve(self, loaded, query, top_k, filters=None):
+        """ Top-k NodeWithScore for `query` from `loaded` (an IndexManager LoadedIndex) """
+        filters_key = filters.model_dump_json() if filters is not None else None
+        retriever = self._retriever(loaded, top_k, filters, filters_key)
+        key = (loaded.version, normalize_query(query), top_k, filters_key)
+        hits = self.results.get(key)
+        if hits is None:
+            hits = retriever.retrieve(QueryBundle(query, embedding=self.embed_query(query)))
+            self.results.put(key, [(hit.node, hit.score) for hit in hits])
+            return hits
+        # fresh wrappers: later stages (rerank) overwrite .score
+        return [NodeWithScore(node=node, score=score) for node, score in hits]
+
+    def report(self):
+        return {"query_embeddings": self.embeddings.report(), "results": self.results.report(),
+                "retrievers_built": self.retrievers_built, "index_version": self._version}
@@ -0,0 +1,99 @@
+# startup.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Startup:
+    """
+    Deferred, parallel initialization for the chat servers.
+
+    Nothing loads at import. `start()` (idempotent, non-blocking) runs every
+    loader on its own thread. A loader that needs another component calls
+    `get(name)`, which waits for that component only. Once all loaders are
+    done, `warmup(startup)` runs (dummy embed / retrieve) and then the server
+    reports ready. Per-step timings are logged and exposed on /healthz.
+    """
+
+    def __init__(self, loaders, warmup=None, name="server"):
+        self.loaders = loaders
+        self.warmup = warmup
+        self.name = name
+        self.state = "cold"
+        self.error = None
+        self.timings = {}
+        self._futures = {}
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._started = None
+
+    def start(self):
+        with self._lock:
+            if self.state != "cold":
+                return self
+            self.state = "loading"
+            self._started = time.perf_counter()
+            # one thread per loader, so a loader waiting on another never starves it
+            pool = ThreadPoolExecutor(max_workers=len(self.loaders), thread_name_prefix=f"{self.name}-init")
+            for name, loader in self.loaders.items():
+                self._futures[name] = pool.submit(self._timed, name, loader)
+            pool.shutdown(wait=False)
+        threading.Thread(target=self._finish, name=f"{self.name}-warmup", daemon=True).start()
+        return self
+
+    def _timed(self, name, loader):
+        started = time.perf_counter()
+        component = loader(self)
+        self.timings[name] = {"seconds": round(time.perf_counter() - started, 2),
+                              "done_at": round(time.perf_counter() - self._started, 2)}
+        return component
+
+    def _finish(self):
+        try:
+            for future in self._futures.values():
+                future.result()
+            if self.warmup:
+                self._timed("warmup", self.warmup)
+            self.state = "ready"
+        except Exception as e:
+            self.state = "failed"
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"❌ {self.name} startup failed: {self.error}")
+        self.timings["total"] = round(time.perf_counter() - self._started, 2)
+        self._ready.set()
+        if self.state == "ready":
+            steps = ", ".join(f"{name} {t['seconds']:.1f}s" for name, t in self.timings.items() if name != "total")
+            print(f"⏱️ {self.name} ready in {self.timings['total']:.1f}s ({steps})")
+
+    def get(self, name):
+        """ A loaded component; starts loading if needed and blocks until that component is done """
+        self.start()
+        return self._futures[name].result()
+
+    def wait(self, timeout=None):
+        """ Block until warmed up; True if ready """
+        self.start()
+        self._ready.wait(timeout)
+        return self.state == "ready"
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def status(self):
+        return {"status": self.state, "error": self.error, "timings": self.timings}
+
+
+def register_health_route(app, startup):
+    """ /healthz: 200 once warmed up, 503 while loading or after a failed start """
+    from flask import jsonify, request
+
+    @app.before_request
+    def begin_loading():
+        # under a WSGI server `__main__` never runs, so the first request kicks off loading
+        startup.start()
+
+    @app.route("/healthz")
+    def health():
+        return jsonify(startup.status()), 200 if startup.ready else 503
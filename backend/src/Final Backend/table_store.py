@@ -0,0 +1,501 @@
+# table_store.py
+
+import json
+import os
+import re
+import sqlite3
+import time
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tables.db")
+
+NUMBER = re.compile(r"^[₹\s]*\d[\d,]*(\.\d+)?$")
+YEAR = re.compile(r"\b(1st|2nd|3rd|4th|5th|6th|first|second|third|fourth|fifth|sixth)\s*(year|yr)\b", re.IGNORECASE)
+SESSION = re.compile(r"\b(20\d{2})\s*-\s*(?:20)?(\d{2})\b")
+YEAR_WORDS = {"first": "1st", "second": "2nd", "third": "3rd", "fourth": "4th", "fifth": "5th", "sixth": "6th"}
+
+# Column roles recognised from the (merged) header text, checked in order
+ROLE_PATTERNS = [
+    ("serial", re.compile(r"^(sr|s)\.?\s*no|^serial", re.IGNORECASE)),
+    ("category", re.compile(r"\bmode\b|categor|\btype\b", re.IGNORECASE)),
+    ("department", re.compile(r"\bdep(artmen)?tt?\b|institute|centre|\bschool\b", re.IGNORECASE)),
+    ("course", re.compile(r"course|programme|program|\bclass\b|degree", re.IGNORECASE)),
+    ("session", re.compile(r"session", re.IGNORECASE)),
+]
+TEXT_ROLES = ("department", "course", "category")
+
+KIND_HEADERS = [
+    ("fee", re.compile(r"\bfee|tuition|charges|installment", re.IGNORECASE)),
+    ("seats", re.compile(r"\bseats?\b|intake", re.IGNORECASE)),
+]
+KIND_QUERIES = {
+    "fee": re.compile(r"\b(fee|fees|tuition|cost|charges|installments?)\b", re.IGNORECASE),
+    "seats": re.compile(r"\b(seats?|intake)\b", re.IGNORECASE),
+}
+
+STOPWORDS = {"department", "deptt", "dept", "of", "and", "the", "for", "in", "institute", "university",
+             "school", "centre", "center", "studies", "course"}
+
+
+# ---------------------------
+# NORMALIZATION
+# ---------------------------
+def clean_cell(value):
+    if value is None:
+        return ""
+    return " ".join(str(value).split())
+
+
+def clean_label(text):
+    # "1st install- ment" -> "1st installment"
+    return re.sub(r"(\w)-\s+(\w)", r"\1\2", clean_cell(text))
+
+
+def tokens(text):
+    """ Lowercase word tokens with dots dropped, so "M.Sc." and "MSc" both give "msc" """
+    return re.findall(r"[a-z0-9]+", text.lower().replace(".", ""))
+
+
+def compact(text):
+    return "".join(tokens(text))
+
+
+def normalize_year(text):
+    match = YEAR.search(text or "")
+    if not match:
+        return ""
+    word = match.group(1).lower()
+    return YEAR_WORDS.get(word, word)
+
+
+def normalize_session(text):
+    match = SESSION.search(text or "")
+    return f"{match.group(1)}-{match.group(2)}" if match else ""
+
+
+def department_key(name):
+    return " ".join(w for w in tokens(name) if w not in STOPWORDS)
+
+
+def department_acronym(name):
+    # "University Institute of Engineering & Technology" -> "uiet"
+    words = [w for w in re.findall(r"[A-Za-z]+", name) if w.lower() not in ("of", "and", "the", "for", "in")]
+    return "".join(w[0] for w in words).lower() if len(words) > 1 else ""
+
+
+def course_keys(course):
+    """
+    Course key ("bschons" for "B.Sc. (Hons.) in Maths"), degree ("bsc") and
+    specialisation words ("hons", "maths"), for matching however a query spells it.
+    """
+    parts = re.split(r"\s+in\s+", course, maxsplit=1, flags=re.IGNORECASE)
+    degree, _, rest = course.strip().partition(" ")
+    return compact(parts[0]), compact(degree), [w for w in tokens(rest) if w not in STOPWORDS]
+
+
+def format_value(kind, label, value):
+    if kind != "fee" or not NUMBER.match(value):
+        return value
+    amount = f"{float(value.replace(',', '').replace('₹', '')):,.0f}"
+    return f"US${amount}" if re.search(r"US\$|USD|\$", label) else f"₹{amount}"
+
+
+# ---------------------------
+# TABLE PARSING
+# ---------------------------
+def _header_rows(table):
+    for i, row in enumerate(table):
+        if any(NUMBER.match(clean_cell(c)) for c in row):
+            return i
+    return len(table)
+
+
+def _merge_header(rows, width):
+    """ One label per column start; None for columns covered by a merged cell """
+    merged = []
+    for c in range(width):
+        cells = [r[c] for r in rows if c < len(r)]
+        if all(cell is None for cell in cells):
+            merged.append(None)
+        else:
+            merged.append(clean_label(" ".join(clean_cell(cell) for cell in cells if cell)))
+    return merged
+
+
+def table_kind(header_text):
+    for kind, pattern in KIND_HEADERS:
+        if pattern.search(header_text):
+            return kind
+    return None
+
+
+def parse_table(table):
+    """
+    Turn one pdfplumber table into records: {department, course, category,
+    session, year, values: [(label, value)]}. Handles the multi-line headers,
+    merged cells and wrapped rows pdfplumber produces for the PU fee PDFs.
+    Returns (kind, records); kind is None for tables that are not fee/seat tables.
+    """
+    if not table or len(table) < 2:
+        return None, []
+    width = max(len(r) for r in table)
+    split = _header_rows(table)
+    if split == 0 or split == len(table):
+        return None, []
+
+    header = _merge_header(table[:split], width)
+    kind = table_kind(" ".join(h for h in header if h))
+    if kind is None:
+        return None, []
+
+    # every non-None header cell starts a column range that runs to the next one
+    starts = [c for c, h in enumerate(header) if h is not None]
+    columns = []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else width
+        label = header[start]
+        role = next((r for r, p in ROLE_PATTERNS if p.search(label)), "value" if label else None)
+        if NUMBER.match(label.rstrip(".")):
+            role = "serial"  # numbered header cells ("18.") are not values
+        columns.append((start, end, role, label))
+
+    # pdfplumber often shifts numbers one cell left of their header, into an
+    # unlabelled column: such cells belong to the next labelled value column
+    value_column = {}
+    target = None
+    for start, end, role, label in reversed(columns):
+        if role == "value":
+            target = label
+        elif role is not None:
+            target = None
+        for c in range(start, end):
+            value_column[c] = target
+
+    records = []
+    last = None
+    for row in table[split:]:
+        fields = {"values": []}
+        for start, end, role, label in columns:
+            value = next((clean_cell(c) for c in row[start:end] if clean_cell(c)), "")
+            if not value or role not in TEXT_ROLES + ("session", None):
+                continue
+            if role is None:
+                # unlabelled column: year of study or session, judged by content
+                if normalize_year(value):
+                    fields["year"] = value
+                elif normalize_session(value):
+                    fields["session"] = value
+            else:
+                fields[role] = value
+
+        seen = set()
+        for c, cell in enumerate(row):
+            value = clean_cell(cell)
+            label = value_column.get(c)
+            # merged cells repeat their number; the first one wins
+            if label and label not in seen and NUMBER.match(value):
+                fields["values"].append((label, value))
+                seen.add(label)
+
+        if not fields["values"]:
+            # wrapped text of the previous row ("Traditional" / "course")
+            if last is not None:
+                for role in TEXT_ROLES:
+                    if fields.get(role):
+                        sep = "" if last.get(role, "").endswith("-") else " "
+                        last[role] = (last.get(role, "") + sep + fields[role]).strip()
+            continue
+
+        # merged cells: department/course/category are written once for several rows
+        if last is not None:
+            for role in TEXT_ROLES:
+                fields.setdefault(role, last.get(role, ""))
+        records.append(fields)
+        last = fields
+
+    return kind, records
+
+
+# ---------------------------
+# STORE
+# ---------------------------
+class TableStore:
+    """
+    SQLite store of fee and seat table rows extracted from the PDFs, with
+    department, course and category normalized so a query can be answered
+    straight from the rows. Records are kept in memory for lookups.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS records (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                department TEXT, department_key TEXT, department_acronym TEXT,
+                course TEXT, course_key TEXT, course_degree TEXT, course_spec TEXT,
+                category TEXT, category_key TEXT,
+                session TEXT, year TEXT,
+                source TEXT, url TEXT, page_number INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS record_values (
+                record_id INTEGER NOT NULL, position INTEGER NOT NULL, label TEXT, value TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_records_page ON records(url, page_number);
+            CREATE INDEX IF NOT EXISTS idx_records_course ON records(kind, course_key);
+            CREATE INDEX IF NOT EXISTS idx_values_record ON record_values(record_id);
+        """)
+        self.conn.commit()
+        self._records = None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    # ---- writing ----
+
+    def add_page(self, url, page_number, tables, source=None):
+        """ Replace every record taken from one PDF page; returns the number stored """
+        self.conn.execute(
+            "DELETE FROM record_values WHERE record_id IN (SELECT id FROM records WHERE url=? AND page_number=?)",
+            (url, page_number),
+        )
+        self.conn.execute("DELETE FROM records WHERE url=? AND page_number=?", (url, page_number))
+        stored = 0
+        for table in tables or []:
+            kind, records = parse_table(table)
+            for rec in records:
+                course = rec.get("course", "")
+                key, degree, spec = course_keys(course)
+                category = rec.get("category", "")
+                cursor = self.conn.execute(
+                    "INSERT INTO records(kind, department, department_key, department_acronym, course, course_key, "
+                    "course_degree, course_spec, category, category_key, session, year, source, url, page_number) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (kind, rec.get("department", ""), department_key(rec.get("department", "")),
+                     department_acronym(rec.get("department", "")), course, key, degree, " ".join(spec),
+                     category, " ".join(tokens(category)), normalize_session(rec.get("session", "")),
+                     normalize_year(rec.get("year", "")), source or url, url, page_number),
+                )
+                self.conn.executemany(
+                    "INSERT INTO record_values(record_id, position, label, value) VALUES (?, ?, ?, ?)",
+                    [(cursor.lastrowid, i, label, value) for i, (label, value) in enumerate(rec["values"])],
+                )
+                stored += 1
+        self._records = None
+        return stored
+
+    def add_frame(self, frame):
+        """
+        Store the tables of a db_creation page DataFrame (url, pdf_file, page_number, tables).
+        Every url in the frame is replaced as a whole, so rows of pages that lost their
+        tables (or no longer exist) do not outlive the update.
+        """
+        for url in frame["url"].unique():
+            self.delete_url(url)
+        stored = 0
+        for row in frame.itertuples():
+            if row.tables:
+                stored += self.add_page(row.url, int(row.page_number), row.tables, source=row.pdf_file)
+        self.conn.commit()
+        return stored
+
+    def delete_url(self, url):
+        """ Remove every record taken from `url` (all pages); returns the number removed """
+        self.conn.execute(
+            "DELETE FROM record_values WHERE record_id IN (SELECT id FROM records WHERE url=?)", (url,)
+        )
+        removed = self.conn.execute("DELETE FROM records WHERE url=?", (url,)).rowcount
+        self._records = None
+        return removed
+
+    def add_pdf(self, path, url=None):
+        """ Extract and store the tables of a local PDF with pdfplumber """
+        import pdfplumber
+
+        stored = 0
+        with pdfplumber.open(path) as pdf:
+            for number, page in enumerate(pdf.pages, start=1):
+                stored += self.add_page(url or path, number, page.extract_tables(), source=os.path.basename(path))
+        self.conn.commit()
+        return stored
+
+    def commit(self):
+        self.conn.commit()
+
+    # ---- lookups ----
+
+    def _load(self):
+        if self._records is None:
+            values = {}
+            for record_id, label, value in self.conn.execute(
+                "SELECT record_id, label, value FROM record_values ORDER BY record_id, position"
+            ):
+                values.setdefault(record_id, []).append((label, value))
+            columns = ["id", "kind", "department", "department_key", "department_acronym", "course", "course_key",
+                       "course_degree", "course_spec", "category", "category_key", "session", "year", "source", "url", "page_number"]
+            self._records = []
+            for row in self.conn.execute(f"SELECT {', '.join(columns)} FROM records ORDER BY id"):
+                rec = dict(zip(columns, row))
+                rec["values"] = values.get(rec["id"], [])
+                self._records.append(rec)
+        return self._records
+
+    @staticmethod
+    def _department_score(rec, words):
+        if rec["department_acronym"] and rec["department_acronym"] in words:
+            return 2.0
+        dept_words = [w for w in rec["department_key"].split() if len(w) > 2]
+        if not dept_words:
+            return 0.0
+        # "maths" should still find "mathematics"
+        matched = sum(1 for w in dept_words if any(q[:4] == w[:4] and len(q) >= 4 for q in words) or w in words)
+        fraction = matched / len(dept_words)
+        return 2.0 * fraction if fraction >= 0.5 else 0.0
+
+    def lookup(self, query, department=None, max_groups=3):
+        """
+        Records answering a fee/seat query, best match first, or [] when the
+        query is not a table question or matches nothing unambiguously.
+        `department` (e.g. from the student profile) is used when the query names none.
+        """
+        kind = next((k for k, p in KIND_QUERIES.items() if p.search(query)), None)
+        if kind is None:
+            return []
+
+        words = tokens(query)
+        grams = {"".join(words[i:i + n]) for n in range(1, 5) for i in range(len(words) - n + 1)}
+        year = normalize_year(query)
+        session = normalize_session(query)
+        profile_words = tokens(department or "")
+
+        scored = []
+        for rec in self._load():
+            if rec["kind"] != kind:
+                continue
+            if year and rec["year"] and rec["year"] != year:
+                continue
+            if session and rec["session"] and rec["session"] != session:
+                continue
+
+            course = 0.0
+            key = rec["course_key"]
+            spec = rec["course_spec"].split()
+            spec_matched = sum(1 for w in spec if w in words) / len(spec) if spec else 0.0
+            if len(key) >= 3 and key in grams:
+                course = 2.0 + 0.5 * spec_matched
+            elif key.endswith("hons") and len(key) > 6 and key[:-4] in grams:
+                course = 1.5
+            elif rec["course_degree"] in words and spec_matched >= 0.5:
+                # "BE computer science" for "B.E Computer Science & Engineering"
+                course = 1.0 + spec_matched
+
+            dept = self._department_score(rec, words)
+            if not dept and profile_words:
+                dept = 0.5 * self._department_score(rec, profile_words)
+            if not course and dept < 1.5:
+                continue
+
+            score = course + dept
+            if rec["category_key"] and set(rec["category_key"].split()) & set(words):
+                score += 0.25
+            scored.append((score, rec))
+
+        if not scored:
+            return []
+        best = max(score for score, _ in scored)
+        matches = [rec for score, rec in scored if score == best]
+        groups = {(r["department"], r["course"], r["category"]) for r in matches}
+        if len(groups) > max_groups:
+            # too broad to answer from rows ("fee structure of the university")
+            return []
+        return matches[:12]
+
+    def answer(self, query, department=None):
+        """ Chat response built straight from matching rows, or None to fall back to the LLM """
+        started = time.perf_counter()
+        matches = self.lookup(query, department)
+        if not matches:
+            return None
+
+        kind = matches[0]["kind"]
+        lines = []
+        sources = []
+        for (dept, course, category) in dict.fromkeys((r["department"], r["course"], r["category"]) for r in matches):
+            title = " — ".join(x for x in (course, dept) if x)
+            heading = "Fee structure" if kind == "fee" else "Seats"
+            lines.append(f"**{heading} for {title}**" + (f" ({category})" if category else "") + ":")
+            for rec in matches:
+                if (rec["department"], rec["course"], rec["category"]) != (dept, course, category):
+                    continue
+                when = " ".join(x for x in (rec["session"], f"{rec['year']} year" if rec["year"] else "") if x)
+                values = ", ".join(f"{label}: {format_value(kind, label, value)}" for label, value in rec["values"])
+                lines.append(f"- {when + ': ' if when else ''}{values}")
+                sources.append((rec["source"], rec["url"], rec["page_number"]))
+
+        sources = list(dict.fromkeys(sources))
+        lines.append("")
+        lines.append("📄 Source: " + "; ".join(f"{src}, page {page}" for src, _, page in sources))
+        links = [{"label": f"📄 {os.path.basename(src)} (page {page})", "url": url}
+                 for src, url, page in sources if url.startswith(("http", "/files/"))]
+        pdf = next((link["url"] for link in links if link["url"].lower().endswith(".pdf")), None)
+
+        print(f"📊 Answered from table store in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return {
+            "reply": "\n".join(lines),
+            "follow_ups": ["Fee payment portal", "Hostel fees", "Scholarships"] if kind == "fee"
+            else ["Eligibility criteria", "Admission process", "Fee structure"],
+            "links": links,
+            "pdf": pdf,
+            "sources": [{"file": src, "url": url, "page": page} for src, url, page in sources],
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+# ---------------------------
+# BUILD CLI
+# ---------------------------
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Build the fee/seat table store, or query it")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--store", help="corpus store directory to read PDF tables from")
+    parser.add_argument("--json", help="pdf_data.json written by text_from_pdf.py")
+    parser.add_argument("--pdf", action="append", default=[], help="local PDF to extract tables from")
+    parser.add_argument("--url", help="URL recorded for --pdf (e.g. /files/pu_fee_structure.pdf)")
+    parser.add_argument("--query", help="answer a question from the store")
+    args = parser.parse_args()
+
+    tables = TableStore(args.db)
+    stored = 0
+    if args.store:
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Scraping", "scripts"))
+        from corpus_store import CorpusStore  # noqa: E402
+
+        corpus = CorpusStore(args.store)
+        for rec in corpus.iter_records(columns=["url", "filename", "page_number", "tables"], source_type="pdf"):
+            page_tables = json.loads(rec["tables"]) if rec.get("tables") else []
+            if page_tables:
+                stored += tables.add_page(rec["url"], int(rec["page_number"] or 0), page_tables,
+                                          source=rec.get("filename") or rec["url"])
+        corpus.close()
+    if args.json:
+        with open(args.json, "r", encoding="utf-8") as f:
+            for doc in json.load(f):
+                for page in doc["content"]:
+                    if page.get("tables"):
+                        stored += tables.add_page(doc.get("url", doc["pdf_file"]), page["page_number"],
+                                                  page["tables"], source=doc["pdf_file"])
+    for path in args.pdf:
+        stored += tables.add_pdf(path, args.url)
+    tables.commit()
+    if args.store or args.json or args.pdf:
+        print(f"✅ Stored {stored} table rows ({len(tables)} in {args.db})")
+
+    if args.query:
+        result = tables.answer(args.query)
+        print(result["reply"] if result else "❌ No table match, the LLM would answer this one.")
+    tables.close()
@@ -0,0 +1,313 @@
+# corpus_store.py
+
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+SCHEMA = pa.schema([
+    ("url", pa.string()),
+    ("fetched_at", pa.float64()),     # unix seconds
+    ("source_type", pa.string()),     # "site" | "pdf"
+    ("filename", pa.string()),
+    ("page_number", pa.int32()),      # null for web pages
+    ("text", pa.large_string()),
+    ("tables", pa.string()),          # JSON list of pdfplumber tables
+    ("deleted", pa.bool_()),          # tombstone written for removed pages
+])
+
+# web pages have no page number; the index needs a non-null key
+NO_PAGE = -1
+
+
+def _page_key(page_number):
+    return NO_PAGE if page_number is None else int(page_number)
+
+
+class CorpusStore:
+    """
+    Append-only corpus of scraped pages stored as zstd-compressed Parquet shards.
+
+    Each write adds a new shard; a small SQLite index maps (url, page_number)
+    to the shard and row of its newest version, so readers can stream only
+    live rows shard by shard, or jump straight to one document. Memory use of
+    a full scan is bounded by one record batch, not by corpus size.
+    """
+
+    def __init__(self, root="corpus", shard_rows=5000):
+        self.root = root
+        self.shard_rows = shard_rows
+        os.makedirs(root, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root, "index.sqlite"))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS docs (
+                url TEXT NOT NULL,
+                page_number INTEGER NOT NULL,
+                source_type TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                shard TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                deleted INTEGER NOT NULL,
+                PRIMARY KEY (url, page_number)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_shard ON docs(shard)")
+        # shard numbers are handed out here, so concurrent writers never pick the same name
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS shard_ids (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+        self._continue_numbering()
+
+    # ---------------------------
+    # WRITING
+    # ---------------------------
+    def _continue_numbering(self):
+        # stores written before shard_ids existed: continue after their last shard
+        self.conn.execute("BEGIN IMMEDIATE")
+        if self.conn.execute("SELECT 1 FROM shard_ids LIMIT 1").fetchone() is None:
+            last = max((int(f[5:-len(".parquet")]) for f in self.shards()), default=None)
+            if last is not None:
+                self.conn.execute("INSERT INTO shard_ids(seq, created_at) VALUES (?, ?)", (last, time.time()))
+        self.conn.commit()
+
+    def _next_shard_name(self):
+        seq = self.conn.execute("INSERT INTO shard_ids(created_at) VALUES (?)", (time.time(),)).lastrowid
+        self.conn.commit()
+        return f"part-{seq:05d}.parquet"
+
+    def _write_shard(self, rows):
+        columns = {name: [r.get(name) for r in rows] for name in SCHEMA.names}
+        table = pa.Table.from_pydict(columns, schema=SCHEMA)
+
+        shard = self._next_shard_name()
+        path = os.path.join(self.root, shard)
+        pq.write_table(table, path + ".tmp", compression="zstd", row_group_size=1000)
+        os.replace(path + ".tmp", path)
+
+        # newest fetch wins; an older re-import never overwrites a newer version
+        self.conn.executemany(
+            "INSERT INTO docs(url, page_number, source_type, fetched_at, shard, row, deleted) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(url, page_number) DO UPDATE SET fetched_at=excluded.fetched_at, "
+            "shard=excluded.shard, row=excluded.row, deleted=excluded.deleted "
+            "WHERE excluded.fetched_at >= docs.fetched_at",
+            [
+                (r["url"], _page_key(r.get("page_number")), r["source_type"], r["fetched_at"],
+                 shard, i, int(bool(r.get("deleted"))))
+                for i, r in enumerate(rows)
+            ],
+        )
+        self.conn.commit()
+        return shard
+
+    def writer(self):
+        return CorpusWriter(self)
+
+    def append(self, records):
+        with self.writer() as w:
+            for record in records:
+                w.add(**record)
+
+    # ---------------------------
+    # READING
+    # ---------------------------
+    def shards(self):
+        return sorted(f for f in os.listdir(self.root) if f.startswith("part-") and f.endswith(".parquet"))
+
+    def _live_rows(self, shard, source_type=None):
+        query = "SELECT row FROM docs WHERE shard=? AND deleted=0"
+        params = [shard]
+        if source_type is not None:
+            query += " AND source_type=?"
+            params.append(source_type)
+        return {row for (row,) in self.conn.execute(query, params)}
+
+    def iter_batches(self, columns=None, source_type=None, latest_only=True, batch_size=1024):
+        """
+        Stream pyarrow RecordBatches. Shards are memory-mapped, so text buffers
+        are not copied until a caller converts them to Python objects.
+        """
+        for shard in self.shards():
+            live = self._live_rows(shard, source_type) if latest_only else None
+            if live is not None and not live:
+                continue
+
+            parquet_file = pq.ParquetFile(os.path.join(self.root, shard), memory_map=True)
+            read_columns = columns
+            if columns is not None and live is None and source_type is not None:
+                read_columns = list(dict.fromkeys(list(columns) + ["source_type"]))
+
+            offset = 0
+            for batch in parquet_file.iter_batches(batch_size=batch_size, columns=read_columns):
+                mask = None
+                if live is not None:
+                    mask = pa.array([offset + i in live for i in range(batch.num_rows)])
+                elif source_type is not None:
+                    mask = pc.equal(batch.column("source_type"), source_type)
+                offset += batch.num_rows
+
+                if mask is not None:
+                    batch = batch.filter(mask)
+                if read_columns is not columns:
+                    batch = batch.select(list(columns))
+                if batch.num_rows:
+                    yield batch
+
+    def iter_records(self, **kwargs):
+        for batch in self.iter_batches(**kwargs):
+            yield from batch.to_pylist()
+
+    def iter_frames(self, **kwargs):
+        """ pandas DataFrames one batch at a time, for the cleaning notebooks """
+        for batch in self.iter_batches(**kwargs):
+            yield batch.to_pandas()
+
+    def get(self, url, page_number=None):
+        """ Latest live version(s) of `url`; every page for a PDF unless page_number is given """
+        query = "SELECT shard, row FROM docs WHERE url=? AND deleted=0"
+        params = [url]
+        if page_number is not None:
+            query += " AND page_number=?"
+            params.append(page_number)
+        query += " ORDER BY page_number"
+
+        records = []
+        for shard, row in self.conn.execute(query, params).fetchall():
+            parquet_file = pq.ParquetFile(os.path.join(self.root, shard), memory_map=True)
+            start = 0
+            for rg in range(parquet_file.num_row_groups):
+                rg_rows = parquet_file.metadata.row_group(rg).num_rows
+                if row < start + rg_rows:
+                    table = parquet_file.read_row_group(rg)
+                    records.append(table.slice(row - start, 1).to_pylist()[0])
+                    break
+                start += rg_rows
+        return records
+
+    def urls(self, source_type=None):
+        """ Live URLs in the store, read from the index without touching the shards """
+        query = "SELECT DISTINCT url FROM docs WHERE deleted=0"
+        params = []
+        if source_type is not None:
+            query += " AND source_type=?"
+            params.append(source_type)
+        return {url for (url,) in self.conn.execute(query, params)}
+
+    def compact(self):
+        """ Rewrite live rows into fresh shards and drop superseded versions and tombstones """
+        old_shards = self.shards()
+        with self.writer() as w:
+            for record in self.iter_records():
+                w.add(**record)
+        new_shards = set(self.shards()) - set(old_shards)
+        self.conn.execute(
+            f"DELETE FROM docs WHERE shard NOT IN ({','.join('?' * len(new_shards))})", list(new_shards)
+        )
+        self.conn.commit()
+        for shard in old_shards:
+            os.remove(os.path.join(self.root, shard))
+
+    def close(self):
+        self.conn.close()
+
+
+class CorpusWriter:
+    """ Buffers records and flushes a new shard every `shard_rows` rows """
+
+    def __init__(self, store):
+        self.store = store
+        self.rows = []
+        self.written = 0
+
+    def add(self, url, text="", source_type="site", page_number=None, filename=None,
+            tables=None, fetched_at=None, deleted=False):
+        if tables is not None and not isinstance(tables, str):
+            tables = json.dumps(tables, ensure_ascii=False)
+        self.rows.append({
+            "url": url,
+            "fetched_at": time.time() if fetched_at is None else fetched_at,
+            "source_type": source_type,
+            "filename": filename,
+            "page_number": page_number,
+            "text": text or "",
+            "tables": tables,
+            "deleted": deleted,
+        })
+        if len(self.rows) >= self.store.shard_rows:
+            self.flush()
+
+    def delete(self, url, source_type="site", page_number=None):
+        self.add(url, source_type=source_type, page_number=page_number, deleted=True)
+
+    def flush(self):
+        if self.rows:
+            self.store._write_shard(self.rows)
+            self.written += len(self.rows)
+            self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+
+# ---------------------------
+# CSV IMPORT (one-off migration of the raw_*_data folders)
+# ---------------------------
+def import_csv(store, csv_path, source_type):
+    """
+    Stream a legacy CSV into the store. Handles the site layout (URL, Text),
+    the PDF layout (filename, url, text) and rag_pdf_data.csv (filename, text).
+    """
+    csv.field_size_limit(sys.maxsize)
+    fetched_at = os.path.getmtime(csv_path)
+    count = 0
+    with open(csv_path, newline="", encoding="utf-8") as f, store.writer() as w:
+        for row in csv.DictReader(f):
+            row = {k.lower(): v for k, v in row.items() if k}
+            filename = row.get("filename")
+            url = row.get("url") or (f"file://{filename}" if filename else None)
+            if not url:
+                continue
+            page = row.get("page_number")
+            w.add(
+                url=url,
+                text=row.get("text", ""),
+                source_type=source_type,
+                filename=filename,
+                page_number=int(page) if page else None,
+                tables=row.get("tables") or None,
+                fetched_at=fetched_at,
+            )
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import legacy scraped CSVs into the corpus store")
+    parser.add_argument("csv_files", nargs="+")
+    parser.add_argument("--source-type", choices=["site", "pdf"], required=True)
+    parser.add_argument("--store", default="corpus")
+    parser.add_argument("--compact", action="store_true")
+    args = parser.parse_args()
+
+    store = CorpusStore(args.store)
+    for path in args.csv_files:
+        print(f"📥 {path}: {import_csv(store, path, args.source_type)} rows")
+    if args.compact:
+        store.compact()
+    print(f"✅ Store has {len(store.shards())} shards, {len(store.urls())} live URLs")
+    store.close()
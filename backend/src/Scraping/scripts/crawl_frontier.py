@@ -0,0 +1,241 @@
+# crawl_frontier.py
+
+import asyncio
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+ROOT_URL = "https://puchd.ac.in"
+ALLOWED_HOST_SUFFIX = "puchd.ac.in"
+
+SKIP_PREFIXES = ("mailto:", "tel:", "javascript:", "whatsapp:", "data:", "#")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+# ---------------------------
+# URL CANONICALIZATION
+# ---------------------------
+def repair_legacy_join(url):
+    """
+    Undo the old `"https://puchd.ac.in" + href` join from gathering_links.py,
+    e.g. "https://puchd.ac.inpage.php" or "https://puchd.ac.inmailto:x@y".
+    """
+    if url.startswith(ROOT_URL) and len(url) > len(ROOT_URL) and url[len(ROOT_URL)] not in "/:?#":
+        rest = url[len(ROOT_URL):]
+        if rest.startswith(("http://", "https://")) or rest.startswith(SKIP_PREFIXES):
+            return rest
+        return ROOT_URL + "/" + rest
+    return url
+
+
+def canonicalize_url(href, base_url=ROOT_URL):
+    """
+    Resolve `href` against the page it was found on and normalise it so the
+    same page is only ever stored once. Returns None for links we never crawl.
+    """
+    if not href:
+        return None
+    href = href.strip()
+    if not href or href.lower().startswith(SKIP_PREFIXES):
+        return None
+
+    url = repair_legacy_join(urljoin(base_url, href))
+    if url.lower().startswith(SKIP_PREFIXES):
+        return None
+
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https"):
+        return None
+
+    host = (parts.hostname or "").lower().rstrip(".")
+    if not host:
+        return None
+    netloc = host
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+
+    path = parts.path or "/"
+    path = path.replace(" ", "%20")
+    while "//" in path:
+        path = path.replace("//", "/")
+
+    # fragments never change the served document
+    return urlunsplit((scheme, netloc, path, parts.query, ""))
+
+
+def is_pdf(url):
+    return urlsplit(url).path.lower().endswith(".pdf")
+
+
+def is_in_scope(url, host_suffix=ALLOWED_HOST_SUFFIX):
+    host = urlsplit(url).hostname or ""
+    return host == host_suffix or host.endswith("." + host_suffix)
+
+
+# ---------------------------
+# PER-HOST POLITENESS
+# ---------------------------
+class HostLimiter:
+    """
+    Caps how many requests run against one host at a time and enforces a
+    minimum gap between request starts on that host.
+    """
+
+    def __init__(self, max_per_host=2, min_delay=0.5):
+        self.max_per_host = max_per_host
+        self.min_delay = min_delay
+        self._semaphores = {}
+        self._locks = {}
+        self._last_start = {}
+
+    async def acquire(self, host):
+        sem = self._semaphores.setdefault(host, asyncio.Semaphore(self.max_per_host))
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        await sem.acquire()
+        async with lock:
+            wait = self._last_start.get(host, 0) + self.min_delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_start[host] = time.monotonic()
+
+    def release(self, host):
+        self._semaphores[host].release()
+
+
+class ThreadedHostLimiter:
+    """ Same politeness rules as HostLimiter, for thread-pool downloaders """
+
+    def __init__(self, max_per_host=2, min_delay=0.5):
+        self.max_per_host = max_per_host
+        self.min_delay = min_delay
+        self._guard = threading.Lock()
+        self._semaphores = {}
+        self._locks = {}
+        self._last_start = {}
+
+    @contextmanager
+    def slot(self, host):
+        with self._guard:
+            sem = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.max_per_host))
+            lock = self._locks.setdefault(host, threading.Lock())
+        with sem:
+            with lock:
+                wait = self._last_start.get(host, 0) + self.min_delay - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                self._last_start[host] = time.monotonic()
+            yield
+
+
+# ---------------------------
+# ON-DISK FRONTIER
+# ---------------------------
+class CrawlFrontier:
+    """
+    SQLite-backed crawl frontier. Every URL is stored once (primary key on the
+    canonical URL), so membership checks are index lookups instead of list
+    scans. Every status change is committed, which makes the database itself
+    the checkpoint: re-opening it after a crash resumes where the crawl stopped.
+    """
+
+    def __init__(self, db_path="crawl_frontier.db"):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                host TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                error TEXT,
+                updated_at REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_urls_status ON urls(status, depth)")
+        self.conn.commit()
+        self.resume()
+
+    def resume(self):
+        """ Pages that were in flight when the process died go back to pending """
+        cur = self.conn.execute("UPDATE urls SET status='pending' WHERE status='in_progress'")
+        self.conn.commit()
+        return cur.rowcount
+
+    def add(self, urls, depth=0):
+        """ Insert canonical URLs; duplicates are ignored. Returns number of new URLs. """
+        now = time.time()
+        rows = []
+        for u in urls:
+            kind = "pdf" if is_pdf(u) else "page"
+            # PDFs are recorded for text_from_pdf.py but never opened by the crawler,
+            # off-site links are remembered so they are not re-checked on every page
+            status = "pending" if kind == "page" and is_in_scope(u) else "skipped"
+            rows.append((u, urlsplit(u).hostname or "", kind, depth, status, now))
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO urls(url, host, kind, depth, status, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        self.conn.commit()
+        return self.conn.total_changes - before
+
+    def claim(self, limit, max_depth=None):
+        """ Take up to `limit` pending pages (shallowest first) and mark them in progress """
+        query = "SELECT url, depth FROM urls WHERE status='pending' AND kind='page'"
+        params = []
+        if max_depth is not None:
+            query += " AND depth <= ?"
+            params.append(max_depth)
+        query += " ORDER BY depth LIMIT ?"
+        params.append(limit)
+
+        rows = self.conn.execute(query, params).fetchall()
+        if rows:
+            self.conn.executemany(
+                "UPDATE urls SET status='in_progress', updated_at=? WHERE url=?",
+                [(time.time(), url) for url, _ in rows],
+            )
+            self.conn.commit()
+        return rows
+
+    def mark_done(self, url):
+        self.conn.execute("UPDATE urls SET status='done', error=NULL, updated_at=? WHERE url=?", (time.time(), url))
+        self.conn.commit()
+
+    def mark_failed(self, url, error):
+        self.conn.execute(
+            "UPDATE urls SET status='failed', error=?, updated_at=? WHERE url=?",
+            (str(error)[:500], time.time(), url),
+        )
+        self.conn.commit()
+
+    def retry_failed(self):
+        cur = self.conn.execute("UPDATE urls SET status='pending', error=NULL WHERE status='failed'")
+        self.conn.commit()
+        return cur.rowcount
+
+    def stats(self):
+        rows = self.conn.execute("SELECT kind, status, COUNT(*) FROM urls GROUP BY kind, status").fetchall()
+        return {f"{kind}:{status}": count for kind, status, count in rows}
+
+    def export(self, pdf_file="pdf_links.txt", page_file="internal_links.txt"):
+        """ Write each known URL exactly once, in the format the extract scripts read """
+        pdf_count = page_count = 0
+        with open(pdf_file, "w", encoding="utf-8") as f:
+            for (url,) in self.conn.execute("SELECT url FROM urls WHERE kind='pdf' ORDER BY url"):
+                f.write(url + "\n")
+                pdf_count += 1
+        with open(page_file, "w", encoding="utf-8") as f:
+            for (url,) in self.conn.execute("SELECT url FROM urls WHERE kind='page' AND status='done' ORDER BY url"):
+                f.write(url + "\n")
+                page_count += 1
+        return pdf_count, page_count
+
+    def close(self):
+        self.conn.close()
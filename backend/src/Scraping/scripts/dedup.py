@@ -0,0 +1,243 @@
+# dedup.py
+
+import hashlib
+import json
+import re
+from collections import defaultdict
+
+import numpy as np
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize(text):
+    return " ".join(TOKEN.findall(text.lower()))
+
+
+def shingles(text, size=5):
+    """ Word n-gram shingles hashed to 32-bit ints """
+    words = normalize(text).split()
+    if len(words) < size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = (" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+    return np.array(
+        sorted({int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little") for g in grams}),
+        dtype=np.uint64,
+    )
+
+
+class NearDuplicateIndex:
+    """
+    Streaming MinHash + LSH index. Each added text is either new (becomes a
+    canonical copy) or matched to an earlier canonical whose estimated Jaccard
+    similarity is at least `threshold`; matched keys are recorded as aliases.
+    Memory per canonical is one signature, so it scales to the whole corpus.
+    """
+
+    def __init__(self, threshold=0.85, num_perm=128, bands=16, shingle_size=5, seed=1):
+        assert num_perm % bands == 0, "num_perm must be divisible by bands"
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.seed = seed
+
+        # a, b < 2^32 keep a * x + b inside uint64 for 32-bit shingle hashes
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, MAX_HASH, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, MAX_HASH, size=num_perm, dtype=np.uint64)
+
+        self.buckets = [defaultdict(list) for _ in range(bands)]
+        self.signatures = {}
+        self.exact = {}
+        self.aliases = defaultdict(list)
+        self.stats = {"seen": 0, "kept": 0, "exact_dupes": 0, "near_dupes": 0}
+
+    def signature(self, text):
+        hashed = shingles(text, self.shingle_size)
+        if hashed.size == 0:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        # (a * x + b) mod p for every permutation/shingle pair, then min per permutation
+        phv = (np.outer(self.a, hashed) + self.b[:, None]) % MERSENNE_PRIME
+        return (phv & MAX_HASH).min(axis=1)
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key, text):
+        """ Returns the canonical key `key` duplicates, or None if `key` is now canonical """
+        self.stats["seen"] += 1
+
+        if not normalize(text):
+            # blank pages (scanned PDFs, table-only pages) are kept, never matched to each other
+            self.stats["kept"] += 1
+            return None
+
+        digest = hashlib.sha1(normalize(text).encode("utf-8")).hexdigest()
+        canonical = self._exact(digest)
+        if canonical is not None:
+            self.aliases[canonical].append(key)
+            self.stats["exact_dupes"] += 1
+            return canonical
+
+        signature = self.signature(text)
+        band_keys = self._band_keys(signature)
+        best, best_score = None, 0.0
+        for candidate, candidate_signature in self._candidates(band_keys):
+            score = float(np.mean(candidate_signature == signature))
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is not None and best_score >= self.threshold:
+            self.aliases[best].append(key)
+            self.stats["near_dupes"] += 1
+            return best
+
+        self._remember(key, digest, signature, band_keys)
+        self.stats["kept"] += 1
+        return None
+
+    # canonical entries: kept in memory here, in SQLite by StoredDuplicateIndex
+    def _exact(self, digest):
+        return self.exact.get(digest)
+
+    def _candidates(self, band_keys):
+        """ (key, signature) of the canonicals sharing a band with `band_keys` """
+        candidates = set()
+        for band, band_key in zip(self.buckets, band_keys):
+            candidates.update(band.get(band_key, ()))
+        return [(candidate, self.signatures[candidate]) for candidate in candidates]
+
+    def _remember(self, key, digest, signature, band_keys):
+        self.exact[digest] = key
+        self.signatures[key] = signature
+        for band, band_key in zip(self.buckets, band_keys):
+            band[band_key].append(key)
+
+    def report(self, label="items"):
+        seen = self.stats["seen"]
+        dropped = self.stats["exact_dupes"] + self.stats["near_dupes"]
+        share = dropped / seen * 100 if seen else 0.0
+        return (f"{label}: kept {self.stats['kept']} of {seen}, dropped {dropped} ({share:.1f}%) - "
+                f"{self.stats['exact_dupes']} exact, {self.stats['near_dupes']} near-duplicate")
+
+
+class StoredDuplicateIndex(NearDuplicateIndex):
+    """
+    NearDuplicateIndex whose canonical entries (digest, signature, band keys)
+    live in SQLite, so an index can be deduplicated against in later runs
+    without MinHashing it again. Lookups go through indexed band keys, and
+    only entries that are added or forgotten are written. Several kinds
+    (pages, chunks) share one connection, which the caller commits.
+    `url_of(key)` names the document a key belongs to, for `forget`.
+    """
+
+    def __init__(self, conn, kind, url_of, **kwargs):
+        super().__init__(**kwargs)
+        self.conn = conn
+        self.kind = kind
+        self.url_of = url_of
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS dedup_params (kind TEXT PRIMARY KEY, params TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS dedup_entries (
+                kind TEXT NOT NULL, key TEXT NOT NULL, url TEXT NOT NULL, digest TEXT NOT NULL,
+                signature BLOB NOT NULL, PRIMARY KEY (kind, key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_dedup_digest ON dedup_entries(kind, digest);
+            CREATE INDEX IF NOT EXISTS idx_dedup_url ON dedup_entries(kind, url);
+            CREATE TABLE IF NOT EXISTS dedup_bands (
+                kind TEXT NOT NULL, band INTEGER NOT NULL, band_key BLOB NOT NULL, key TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_dedup_band ON dedup_bands(kind, band, band_key);
+            CREATE INDEX IF NOT EXISTS idx_dedup_band_owner ON dedup_bands(kind, key);
+        """)
+        # signatures are only comparable between indexes with the same permutations
+        params = json.dumps({"num_perm": self.num_perm, "bands": self.bands,
+                             "shingle_size": self.shingle_size, "seed": self.seed})
+        conn.execute("INSERT OR IGNORE INTO dedup_params VALUES (?, ?)", (kind, params))
+        (stored,) = conn.execute("SELECT params FROM dedup_params WHERE kind=?", (kind,)).fetchone()
+        if stored != params:
+            raise ValueError(f"{kind} signatures were stored with {stored}, not {params}")
+
+    @staticmethod
+    def _dump(key):
+        return json.dumps(key)
+
+    @staticmethod
+    def _load(stored):
+        key = json.loads(stored)
+        return tuple(key) if isinstance(key, list) else key
+
+    def _exact(self, digest):
+        row = self.conn.execute("SELECT key FROM dedup_entries WHERE kind=? AND digest=? LIMIT 1",
+                                (self.kind, digest)).fetchone()
+        return self._load(row[0]) if row else None
+
+    def _candidates(self, band_keys):
+        bands = " OR ".join("(band=? AND band_key=?)" for _ in band_keys)
+        rows = self.conn.execute(
+            f"SELECT key, signature FROM dedup_entries WHERE kind=? AND key IN "
+            f"(SELECT key FROM dedup_bands WHERE kind=? AND ({bands}))",
+            [self.kind, self.kind, *(value for band in enumerate(band_keys) for value in band)],
+        ).fetchall()
+        return [(self._load(key), np.frombuffer(signature, dtype=np.uint64)) for key, signature in rows]
+
+    def _remember(self, key, digest, signature, band_keys):
+        stored = self._dump(key)
+        self.conn.execute("DELETE FROM dedup_bands WHERE kind=? AND key=?", (self.kind, stored))
+        self.conn.execute("INSERT OR REPLACE INTO dedup_entries VALUES (?, ?, ?, ?, ?)",
+                          (self.kind, stored, self.url_of(key), digest, signature.tobytes()))
+        self.conn.executemany("INSERT INTO dedup_bands VALUES (?, ?, ?, ?)",
+                              [(self.kind, band, band_key, stored) for band, band_key in enumerate(band_keys)])
+
+    def save(self, index):
+        """ Store the canonical entries of an in-memory index, e.g. the one of a full build """
+        for digest, key in index.exact.items():
+            signature = index.signatures[key]
+            self._remember(key, digest, signature, self._band_keys(signature))
+
+    def forget(self, url):
+        """ Drop the entries of `url`, whose document is being replaced or deleted """
+        owned = "SELECT key FROM dedup_entries WHERE kind=? AND url=?"
+        self.conn.execute(f"DELETE FROM dedup_bands WHERE kind=? AND key IN ({owned})", (self.kind, self.kind, url))
+        self.conn.execute("DELETE FROM dedup_entries WHERE kind=? AND url=?", (self.kind, url))
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM dedup_entries WHERE kind=?", (self.kind,)).fetchone()[0]
+
+
+def deduplicate(records, index, key, text, label=None):
+    """
+    The records `index` keeps as canonical, in order. Dropped copies are
+    recorded in `index.aliases` under their canonical's key, which may be a
+    record added earlier, in this call or before. `key` and `text` are
+    functions of a record; the index's report is printed under `label`.
+    """
+    kept = [record for record in records if index.add(key(record), text(record) or "") is None]
+    if label:
+        print(f"🧹 {index.report(label)}")
+    return kept
+
+
+if __name__ == "__main__":
+    import argparse
+    from corpus_store import CorpusStore
+
+    parser = argparse.ArgumentParser(description="Report near-duplicate pages in the corpus store")
+    parser.add_argument("--store", default="corpus")
+    parser.add_argument("--source-type", choices=["site", "pdf"], default="site")
+    parser.add_argument("--threshold", type=float, default=0.85)
+    args = parser.parse_args()
+
+    store = CorpusStore(args.store)
+    index = NearDuplicateIndex(threshold=args.threshold)
+    deduplicate(store.iter_records(columns=["url", "page_number", "text"], source_type=args.source_type), index,
+                key=lambda record: (record["url"], record["page_number"]), text=lambda record: record["text"],
+                label=f"{args.source_type} pages")
+    largest = sorted(index.aliases.items(), key=lambda kv: len(kv[1]), reverse=True)[:10]
+    for canonical, aliases in largest:
+        print(f"  {canonical[0]} (p{canonical[1]}): {len(aliases)} copies")
+    store.close()
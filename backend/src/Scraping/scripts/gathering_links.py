@@ -1,58 +1,164 @@
-from playwright.sync_api import sync_playwright
+import argparse
+import asyncio
+from urllib.parse import urlsplit
 
-def get_links(page):
-    pdfs = []
-    normal = []
+import requests
+from playwright.async_api import async_playwright
 
-    links = page.query_selector_all("a")
-    for link in links:
-        href = link.get_attribute("href")
-        if not href:
-            continue
+from crawl_frontier import ROOT_URL, CrawlFrontier, HostLimiter, canonicalize_url
+from link_discovery import DiscoveryStats, fetch_anchors_http
 
-        if not href.startswith("https://"):
-            href = "https://puchd.ac.in" + href
 
-        if href.endswith(".pdf"):
-            pdfs.append(href)
-        else:
-            normal.append(href)
+async def get_links(page, base_url):
+    """ Return every canonical link on the loaded page (PDFs and normal pages) """
+    hrefs = await page.eval_on_selector_all("a[href]", "els => els.map(e => e.getAttribute('href'))")
+    return canonical_links(hrefs, base_url)
 
-    with open('pdf_links(1).txt', 'a', encoding='utf-8') as f:
-        for i in pdfs:
-            f.write(i + '\n')
 
-    with open('internal_links(1).txt', 'a', encoding='utf-8') as f:
-        for i in normal:
-            f.write(i + '\n')
+def canonical_links(hrefs, base_url):
+    links = set()
+    for href in hrefs:
+        url = canonicalize_url(href, base_url)
+        if url:
+            links.add(url)
+    return links
 
-    print(f"Collected {len(pdfs)} PDF links and {len(normal)} normal links.")
-    
-    return normal
 
+class LazyBrowser:
+    """ Starts Chromium only when the first page actually needs it """
 
-def open_links():
-    pass
+    def __init__(self, headed=False):
+        self.headed = headed
+        self._lock = asyncio.Lock()
+        self._playwright = None
+        self._browser = None
+        self._context = None
 
+    async def new_page(self):
+        async with self._lock:
+            if self._context is None:
+                print("🌐 Launching Chromium for JS-rendered pages...")
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=not self.headed)
+                self._context = await self._browser.new_context(ignore_https_errors=True)
+        return await self._context.new_page()
 
-with sync_playwright() as p:
-    browser = p.chromium.launch(headless=False)
-    context = browser.new_context(ignore_https_errors=True)
-    page = context.new_page()
-    page.goto("https://puchd.ac.in", wait_until="domcontentloaded", timeout=60000)
+    async def close(self):
+        if self._browser is not None:
+            await self._browser.close()
+            await self._playwright.stop()
 
-    visited_links = []
-    list_of_links = get_links(page)
 
-    for l in list_of_links:
-        if ('.ac' in l) and l not in visited_links:
+async def discover_links(url, args, browser, worker_state, stats):
+    """ Plain HTTP first; escalate to the browser only for pages that need JS """
+    if args.mode == "http-first":
+        try:
+            result = await asyncio.to_thread(fetch_anchors_http, url, args.timeout / 1000)
+        except requests.HTTPError:
+            raise
+        except Exception as e:
+            # TLS and connection quirks are handled more leniently by the browser
+            print(f"HTTP fetch failed for {url} ({e}), retrying in browser")
+            result = None
+
+        if result is not None:
+            final_url, anchors = result
+            stats.http += 1
+            return canonical_links((href for href, _ in anchors), final_url)
+
+    if worker_state.get("page") is None:
+        worker_state["page"] = await browser.new_page()
+    page = worker_state["page"]
+    await page.goto(url, wait_until="domcontentloaded", timeout=args.timeout)
+    stats.browser += 1
+    # redirects change the base that relative links resolve against
+    return await get_links(page, page.url)
+
+
+async def crawl_worker(worker_id, frontier, limiter, browser, args, counters, stats):
+    worker_state = {"page": None}
+    try:
+        while True:
+            if args.max_pages and counters["visited"] >= args.max_pages:
+                return
+
+            claimed = frontier.claim(1, max_depth=args.max_depth)
+            if not claimed:
+                if counters["active"] == 0:
+                    return
+                # other workers may still add links to the frontier
+                await asyncio.sleep(0.2)
+                continue
+
+            url, depth = claimed[0]
+            host = urlsplit(url).hostname or ""
+            counters["active"] += 1
+            await limiter.acquire(host)
             try:
-                print(f"Visiting: {l}")
-                page.goto(l, timeout=10000)
-                get_links(page)
-                visited_links.append(l)
+                print(f"[{worker_id}] Visiting: {url}")
+                links = await discover_links(url, args, browser, worker_state, stats)
+                new = frontier.add(links, depth=depth + 1)
+                frontier.mark_done(url)
+                counters["visited"] += 1
+                print(f"[{worker_id}] Collected {len(links)} links ({new} new) from {url}")
             except Exception as e:
-                print(f"Timeout or error at {l}: {e}")
-                continue
+                print(f"[{worker_id}] Timeout or error at {url}: {e}")
+                frontier.mark_failed(url, e)
+                stats.failed += 1
+            finally:
+                limiter.release(host)
+                counters["active"] -= 1
+    finally:
+        if worker_state["page"] is not None:
+            await worker_state["page"].close()
+
+
+async def crawl(args):
+    frontier = CrawlFrontier(args.db)
+    if args.retry_failed:
+        print(f"🔄 Re-queued {frontier.retry_failed()} failed pages")
+    frontier.add([canonicalize_url(args.seed)], depth=0)
+    print(f"📌 Frontier: {frontier.stats()}")
+
+    limiter = HostLimiter(max_per_host=args.per_host, min_delay=args.delay)
+    browser = LazyBrowser(headed=args.headed)
+    counters = {"visited": 0, "active": 0}
+    stats = DiscoveryStats()
+
+    try:
+        workers = [
+            crawl_worker(i, frontier, limiter, browser, args, counters, stats)
+            for i in range(args.concurrency)
+        ]
+        await asyncio.gather(*workers)
+    finally:
+        await browser.close()
+
+    pdf_count, page_count = frontier.export(args.pdf_out, args.links_out)
+    print(f"\n✅ Visited {counters['visited']} pages this run. Frontier: {frontier.stats()}")
+    print(f"📊 Discovery: {stats.summary()}")
+    print(f"💾 Wrote {pdf_count} PDF links to {args.pdf_out} and {page_count} page links to {args.links_out}")
+    frontier.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Resumable concurrent crawl of puchd.ac.in")
+    parser.add_argument("--seed", default=ROOT_URL)
+    parser.add_argument("--db", default="crawl_frontier.db", help="frontier/checkpoint database")
+    parser.add_argument("--mode", choices=["http-first", "browser"], default="http-first",
+                        help="http-first only opens Chromium for pages that need JS")
+    parser.add_argument("--concurrency", type=int, default=8, help="pages fetching at once")
+    parser.add_argument("--per-host", type=int, default=2, help="max in-flight requests per host")
+    parser.add_argument("--delay", type=float, default=0.5, help="min seconds between requests to one host")
+    parser.add_argument("--timeout", type=int, default=15000, help="page load timeout in ms")
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--max-pages", type=int, default=0, help="stop after this many pages (0 = no limit)")
+    parser.add_argument("--retry-failed", action="store_true", help="re-queue pages that failed last run")
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--pdf-out", default="pdf_links.txt")
+    parser.add_argument("--links-out", default="internal_links.txt")
+    return parser.parse_args(argv)
+
 
-    print(len(visited_links))
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(crawl(parse_args()))
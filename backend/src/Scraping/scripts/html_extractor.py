@@ -0,0 +1,144 @@
+# html_extractor.py
+
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from urllib.parse import urlsplit
+
+import lxml.html
+
+from http_client import ResponseTooLarge, fetch
+
+DEFAULT_MAX_BYTES = 2_000_000
+
+# Removed with their contents; <header> only outside the main content
+DROP_XPATH = (
+    "//script | //style | //noscript | //template | //svg | //iframe"
+    " | //nav | //footer | //aside | //*[@role='navigation'] | //*[@role='contentinfo']"
+    " | //header[not(ancestor::main) and not(ancestor::article)]"
+)
+
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "dl", "dt", "dd",
+    "table", "tr", "td", "th", "caption", "h1", "h2", "h3", "h4", "h5", "h6",
+    "br", "blockquote", "pre", "form", "fieldset", "address",
+}
+
+WHITESPACE = re.compile(r"\s+")
+
+
+PageTooLarge = ResponseTooLarge
+
+
+# ---------------------------
+# STREAMING FETCH
+# ---------------------------
+def fetch_html(url, headers=None, timeout=10, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Stream `url` through the shared client and stop as soon as it is known to
+    exceed `max_bytes`, from Content-Length when the server sends it, otherwise
+    while reading. Returns (response, body_bytes); status handling is left to the caller.
+    """
+    response = fetch(url, headers=headers, timeout=timeout, max_bytes=max_bytes)
+    return response, response.content
+
+
+# ---------------------------
+# SITE-WIDE BOILERPLATE
+# ---------------------------
+def _fingerprint(line):
+    return hashlib.blake2b(line.lower().encode("utf-8"), digest_size=8).hexdigest()
+
+
+class BoilerplateFilter:
+    """
+    Learns, per host, which text blocks repeat across many pages (menus,
+    footers, notice tickers) and strips them. Counts can be saved and loaded
+    so a nightly crawl and the live chatbot start with what was learned before.
+    """
+
+    def __init__(self, path=None, min_pages=20, min_ratio=0.3):
+        self.path = path
+        self.min_pages = min_pages
+        self.min_ratio = min_ratio
+        self.pages = Counter()
+        self.blocks = {}
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def observe(self, host, lines):
+        self.pages[host] += 1
+        counts = self.blocks.setdefault(host, Counter())
+        counts.update({_fingerprint(line) for line in lines})
+
+    def is_boilerplate(self, host, line):
+        seen = self.pages.get(host, 0)
+        if seen < self.min_pages:
+            return False
+        return self.blocks.get(host, {}).get(_fingerprint(line), 0) / seen >= self.min_ratio
+
+    def filter(self, host, lines, learn=True):
+        if learn:
+            self.observe(host, lines)
+        return [line for line in lines if not self.is_boilerplate(host, line)]
+
+    def load(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.pages = Counter(data.get("pages", {}))
+        self.blocks = {host: Counter(counts) for host, counts in data.get("blocks", {}).items()}
+
+    def save(self, path=None):
+        path = path or self.path
+        # rare blocks are never boilerplate; keep the file small
+        blocks = {
+            host: {fp: n for fp, n in counts.items() if n > 1}
+            for host, counts in self.blocks.items()
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"pages": self.pages, "blocks": blocks}, f)
+
+
+# ---------------------------
+# EXTRACTION
+# ---------------------------
+def extract_lines(html):
+    """ Visible text blocks of a page, one per line, parsed with lxml (libxml2) """
+    if not html or not html.strip():
+        return []
+    try:
+        root = lxml.html.fromstring(html)
+    except (lxml.etree.ParserError, ValueError):
+        return []
+
+    for element in root.xpath(DROP_XPATH):
+        if element.getparent() is not None:
+            element.drop_tree()
+
+    # Newlines around block elements so text_content() keeps block boundaries
+    for element in root.iter():
+        if isinstance(element.tag, str) and element.tag in BLOCK_TAGS:
+            element.tail = "\n" + (element.tail or "")
+            element.text = "\n" + (element.text or "")
+
+    lines = []
+    for raw in root.text_content().split("\n"):
+        line = WHITESPACE.sub(" ", raw).strip()
+        if line:
+            lines.append(line)
+    return lines
+
+
+def extract_text(html, url=None, boilerplate=None, min_chars=0, learn=True):
+    """
+    Shared extractor for the scrapers and the live chatbot path.
+    `html` may be str or bytes (bytes let lxml honour the page's meta charset).
+    """
+    lines = extract_lines(html)
+    if boilerplate is not None and url:
+        lines = boilerplate.filter(urlsplit(url).hostname or "", lines, learn=learn)
+    if min_chars:
+        lines = [line for line in lines if len(line) > min_chars]
+    return "\n".join(lines)
@@ -0,0 +1,312 @@
+# http_client.py
+
+import email.utils
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
+}
+DEFAULT_TIMEOUT = (5, 15)  # (connect, read) seconds
+READ_CHUNK = 64 * 1024
+
+CACHE_DIR = os.getenv("HTTP_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "http_cache"))
+CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_MB", "2048")) * 1024 * 1024
+CACHE_MAX_AGE = float(os.getenv("HTTP_CACHE_MAX_AGE_DAYS", "30")) * 86400
+PRUNE_EVERY = 256  # stores between size checks
+
+
+class ResponseTooLarge(Exception):
+    pass
+
+
+# ---------------------------
+# POOLED SESSION
+# ---------------------------
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size=32):
+    """ One keep-alive session for the whole process, with retry + backoff """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET", "HEAD"),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            _session = session
+        return _session
+
+
+# ---------------------------
+# ON-DISK HTTP CACHE
+# ---------------------------
+def _cache_paths(url):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    folder = os.path.join(CACHE_DIR, key[:2])
+    return os.path.join(folder, key + ".json"), os.path.join(folder, key + ".body")
+
+
+def _parse_cache_control(value):
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"')
+    return directives
+
+
+def _freshness_lifetime(headers):
+    """ Seconds a stored response may be served without revalidation (0 = always revalidate) """
+    cc = _parse_cache_control(headers.get("Cache-Control"))
+    if "no-cache" in cc:
+        return 0
+    for directive in ("s-maxage", "max-age"):
+        if cc.get(directive, "").isdigit():
+            return int(cc[directive])
+    expires = headers.get("Expires")
+    if expires:
+        try:
+            expires_at = email.utils.parsedate_to_datetime(expires).timestamp()
+            date = headers.get("Date")
+            date_at = email.utils.parsedate_to_datetime(date).timestamp() if date else time.time()
+            return max(0, expires_at - date_at)
+        except (TypeError, ValueError):
+            return 0
+    last_modified = headers.get("Last-Modified")
+    if last_modified:
+        # heuristic freshness (RFC 9111 4.2.2): 10% of the document's age, at most a day
+        try:
+            age = time.time() - email.utils.parsedate_to_datetime(last_modified).timestamp()
+            return min(max(0, age * 0.1), 86400)
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+def _is_storable(response):
+    if response.status_code != 200:
+        return False
+    cc = _parse_cache_control(response.headers.get("Cache-Control"))
+    return "no-store" not in cc and "private" not in cc
+
+
+def _load_cached(url):
+    meta_path, body_path = _cache_paths(url)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            body = f.read()
+    except (OSError, ValueError):
+        return None, None
+    meta["headers"] = CaseInsensitiveDict(meta["headers"])
+    return meta, body
+
+
+def _write_atomic(path, data):
+    # unique temp name: crawl and extract workers may store the same URL at once
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as f:
+        f.write(data)
+    os.replace(f.name, path)
+
+
+def _dump_meta(meta):
+    # header names are case-insensitive; store them lowercased and read them back as a CaseInsensitiveDict
+    headers = {name.lower(): value for name, value in meta["headers"].items()}
+    return json.dumps(dict(meta, headers=headers)).encode("utf-8")
+
+
+def _store(url, response, body):
+    meta_path, body_path = _cache_paths(url)
+    os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+    meta = {
+        "url": response.url,
+        "status": response.status_code,
+        "headers": response.headers,
+        "stored_at": time.time(),
+    }
+    _write_atomic(body_path, body)
+    _write_atomic(meta_path, _dump_meta(meta))
+    _count_store()
+
+
+def _refresh_meta(url, meta, not_modified):
+    """ A 304 carries updated freshness headers for the stored body """
+    meta_path, _ = _cache_paths(url)
+    updated = CaseInsensitiveDict(not_modified.headers)
+    for name in ("Cache-Control", "Expires", "Date", "ETag", "Last-Modified"):
+        if name in updated:
+            meta["headers"][name] = updated[name]
+    meta["stored_at"] = time.time()
+    _write_atomic(meta_path, _dump_meta(meta))
+
+
+def _mark_used(url):
+    # body mtime is the last use, so pruning drops the least recently used entries first
+    try:
+        os.utime(_cache_paths(url)[1])
+    except OSError:
+        pass
+
+
+def cached_body_path(url):
+    """ Path of the stored body of `url`, or None when the cache does not hold it """
+    meta_path, body_path = _cache_paths(url)
+    return body_path if os.path.exists(meta_path) and os.path.exists(body_path) else None
+
+
+# ---------------------------
+# EVICTION
+# ---------------------------
+_stores = 0
+_stores_lock = threading.Lock()
+
+
+def _count_store():
+    global _stores
+    with _stores_lock:
+        _stores += 1
+        due = _stores % PRUNE_EVERY == 0
+    if due:
+        prune_cache()
+
+
+def prune_cache(max_bytes=CACHE_MAX_BYTES, max_age=CACHE_MAX_AGE):
+    """
+    Drop entries unused for `max_age` seconds, then the least recently used
+    ones until the cache fits in `max_bytes`. Returns (entries removed, bytes kept).
+    """
+    now = time.time()
+    entries = []
+    for folder in os.scandir(CACHE_DIR) if os.path.isdir(CACHE_DIR) else ():
+        if not folder.is_dir():
+            continue
+        for entry in os.scandir(folder.path):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if entry.name.endswith(".tmp") and now - stat.st_mtime > 3600:
+                # left behind by a crashed writer
+                os.remove(entry.path)
+            elif entry.name.endswith(".body"):
+                entries.append((stat.st_mtime, stat.st_size, entry.path[:-len(".body")]))
+
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for used_at, size, stem in entries:
+        if now - used_at <= max_age and total <= max_bytes:
+            break
+        for suffix in (".json", ".body"):
+            try:
+                os.remove(stem + suffix)
+            except FileNotFoundError:
+                pass
+        total -= size
+        removed += 1
+    return removed, total
+
+
+def _response_from_cache(meta, body):
+    response = requests.models.Response()
+    response.status_code = meta["status"]
+    response.headers = CaseInsensitiveDict(meta["headers"])
+    response.url = meta["url"]
+    response._content = body
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.from_cache = True
+    return response
+
+
+# ---------------------------
+# FETCH
+# ---------------------------
+def _check_cached_size(url, body, max_bytes):
+    # a cached body skips _read_body, so the caller's limit is applied here
+    if max_bytes and len(body) > max_bytes:
+        raise ResponseTooLarge(f"{url} is {len(body)} bytes in the cache (limit {max_bytes})")
+
+
+def _read_body(response, max_bytes):
+    length = response.headers.get("Content-Length", "")
+    if max_bytes and length.isdigit() and int(length) > max_bytes:
+        raise ResponseTooLarge(f"{response.url} is {int(length)} bytes (limit {max_bytes})")
+
+    chunks = []
+    size = 0
+    for chunk in response.iter_content(READ_CHUNK):
+        size += len(chunk)
+        if max_bytes and size > max_bytes:
+            raise ResponseTooLarge(f"{response.url} exceeded {max_bytes} bytes while downloading")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def fetch(url, headers=None, timeout=DEFAULT_TIMEOUT, max_bytes=None, use_cache=True):
+    """
+    GET `url` through the shared pooled session and the on-disk cache.
+
+    Fresh cached copies are returned without touching the network; stale ones
+    are revalidated with If-None-Match / If-Modified-Since. Bodies are streamed
+    and abandoned once `max_bytes` is exceeded; a cached body over the limit
+    raises ResponseTooLarge as well. The returned Response has its
+    body loaded and a `from_cache` attribute. Callers that send their own
+    validators manage freshness themselves, so those requests bypass the cache.
+    """
+    headers = dict(headers or {})
+    if "If-None-Match" in headers or "If-Modified-Since" in headers:
+        use_cache = False
+
+    meta = body = None
+    if use_cache:
+        meta, body = _load_cached(url)
+        if meta is not None:
+            age = time.time() - meta["stored_at"]
+            if age < _freshness_lifetime(meta["headers"]):
+                _check_cached_size(url, body, max_bytes)
+                _mark_used(url)
+                return _response_from_cache(meta, body)
+            if meta["headers"].get("ETag"):
+                headers["If-None-Match"] = meta["headers"]["ETag"]
+            if meta["headers"].get("Last-Modified"):
+                headers["If-Modified-Since"] = meta["headers"]["Last-Modified"]
+
+    response = get_session().get(url, headers=headers, timeout=timeout, stream=True)
+    try:
+        if meta is not None and response.status_code == 304:
+            _refresh_meta(url, meta, response)
+            _check_cached_size(url, body, max_bytes)
+            _mark_used(url)
+            return _response_from_cache(meta, body)
+
+        content = _read_body(response, max_bytes)
+    finally:
+        response.close()
+
+    response._content = content
+    response.from_cache = False
+    if use_cache and _is_storable(response):
+        _store(url, response, content)
+    return response
@@ -0,0 +1,114 @@
+# link_discovery.py
+
+import re
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from http_client import fetch
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
+}
+
+# Hosts known to render their navigation client-side
+JS_HOSTS = {
+    "admissions.puchd.ac.in",
+    "results.puexam.in",
+}
+
+# Markers of an empty single-page-app shell
+SPA_MARKERS = re.compile(
+    r'<div[^>]+id=["\'](?:root|app|__next)["\'][^>]*>\s*</div>'
+    r'|__NEXT_DATA__|ng-app=|data-reactroot|enable javascript to run',
+    re.IGNORECASE,
+)
+
+MIN_TEXT_CHARS = 200
+
+
+class AnchorParser(HTMLParser):
+    """ Collects (href, anchor text) pairs and a rough count of visible text """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.anchors = []
+        self.text_chars = 0
+        self._href = None
+        self._text = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style", "noscript"):
+            self._skip += 1
+        elif tag == "a":
+            self._href = dict(attrs).get("href")
+            self._text = []
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style", "noscript"):
+            self._skip = max(0, self._skip - 1)
+        elif tag == "a" and self._href is not None:
+            self.anchors.append((self._href, " ".join(self._text).strip()))
+            self._href = None
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        stripped = data.strip()
+        self.text_chars += len(stripped)
+        if self._href is not None and stripped:
+            self._text.append(stripped)
+
+
+def parse_anchors(html):
+    parser = AnchorParser()
+    parser.feed(html)
+    parser.close()
+    return parser.anchors, parser.text_chars
+
+
+def needs_browser(url, html, anchors, text_chars):
+    """ True when a plain HTTP fetch cannot be trusted to show the page's links """
+    if (urlsplit(url).hostname or "") in JS_HOSTS:
+        return True
+    if not html or not html.strip():
+        return True
+    if SPA_MARKERS.search(html) and len(anchors) < 5:
+        return True
+    return not anchors and text_chars < MIN_TEXT_CHARS
+
+
+def fetch_anchors_http(url, timeout=10):
+    """
+    Fetch `url` over plain HTTP and parse its anchors.
+    Returns (final_url, anchors) or None when the page needs a browser.
+    Raises on network errors so callers can decide whether to fall back.
+    """
+    # non-HTML links (images, archives) are abandoned instead of downloaded in full
+    response = fetch(url, headers=HEADERS, timeout=timeout, max_bytes=2_000_000)
+    response.raise_for_status()
+
+    content_type = response.headers.get("Content-Type", "")
+    if "html" not in content_type and content_type:
+        return response.url, []
+
+    html = response.text
+    anchors, text_chars = parse_anchors(html)
+    if needs_browser(response.url, html, anchors, text_chars):
+        return None
+    return response.url, anchors
+
+
+class DiscoveryStats:
+    """ Counts which path each page took so the browser share can be tracked """
+
+    def __init__(self):
+        self.http = 0
+        self.browser = 0
+        self.failed = 0
+
+    def summary(self):
+        total = self.http + self.browser + self.failed
+        share = (self.browser / total * 100) if total else 0.0
+        return (f"{total} pages: {self.http} via HTTP, {self.browser} via browser "
+                f"({share:.1f}%), {self.failed} failed")
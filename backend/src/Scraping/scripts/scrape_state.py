@@ -0,0 +1,76 @@
+# scrape_state.py
+
+import hashlib
+import sqlite3
+import time
+
+
+def text_hash(text):
+    """ Hash of the extracted text with whitespace collapsed, so re-indented HTML is not a change """
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ScrapeState:
+    """
+    Remembers, per URL, the HTTP validators (ETag / Last-Modified) and the hash
+    of the page text we extracted last time (before boilerplate stripping), so
+    a refresh can send conditional requests and only report pages whose
+    content actually changed.
+    """
+
+    def __init__(self, db_path="scrape_state.db"):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                text_hash TEXT,
+                fetched_at REAL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, url):
+        row = self.conn.execute(
+            "SELECT etag, last_modified, text_hash FROM pages WHERE url=?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "text_hash": row[2]}
+
+    def conditional_headers(self, url):
+        known = self.get(url)
+        headers = {}
+        if known:
+            if known["etag"]:
+                headers["If-None-Match"] = known["etag"]
+            if known["last_modified"]:
+                headers["If-Modified-Since"] = known["last_modified"]
+        return headers
+
+    def update(self, url, etag, last_modified, hash_value):
+        self.conn.execute(
+            "INSERT INTO pages(url, etag, last_modified, text_hash, fetched_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET etag=excluded.etag, last_modified=excluded.last_modified, "
+            "text_hash=excluded.text_hash, fetched_at=excluded.fetched_at",
+            (url, etag, last_modified, hash_value, time.time()),
+        )
+
+    def touch(self, url):
+        self.conn.execute("UPDATE pages SET fetched_at=? WHERE url=?", (time.time(), url))
+
+    def delete(self, url):
+        self.conn.execute("DELETE FROM pages WHERE url=?", (url,))
+
+    def urls(self):
+        return {row[0] for row in self.conn.execute("SELECT url FROM pages")}
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
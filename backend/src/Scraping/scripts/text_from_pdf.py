@@ -1,58 +1,198 @@
-import requests
-import fitz  # PyMuPDF
+import argparse
 import csv
+import hashlib
+import json
 import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse
-from time import sleep
 
-# Load PDF links from txt file
-with open("pdf_links.txt", "r", encoding="utf-8") as f:
-    pdf_links = [line.strip() for line in f if line.strip()]
+import fitz  # PyMuPDF
+
+from corpus_store import CorpusStore
+from crawl_frontier import ThreadedHostLimiter
+from http_client import cached_body_path, fetch
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Referer": "https://puchd.ac.in"
+}
+
+PAGES_PER_TASK = 16
+
 
-# Prepare CSV file
-with open("pu_pdf_data.csv", "w", newline="", encoding="utf-8") as csv_file:
-    csv_writer = csv.writer(csv_file)
-    csv_writer.writerow(["filename", "url", "text"])  # header
+def log_failure(url, reason):
+    with open("failed_pdfs.txt", "a", encoding="utf-8") as fail_log:
+        fail_log.write(f"{url} - {reason}\n")
 
-    for i, url in enumerate(pdf_links, 1):
+
+# ---------------------------
+# DOWNLOAD (threads, per-host politeness)
+# ---------------------------
+def download_pdf(url, limiter, cache_dir):
+    """ Download one PDF and return its local path (None if skipped) """
+    host = urlparse(url).hostname or ""
+    # Unchanged PDFs are served (or revalidated) from the shared HTTP cache
+    with limiter.slot(host):
+        response = fetch(url, headers=HEADERS, timeout=(5, 60))
+
+    # Skip if request failed or content is not a PDF
+    if response.status_code != 200 or "application/pdf" not in response.headers.get("Content-Type", ""):
+        print(f"Skipping (status {response.status_code}): {url}")
+        log_failure(url, f"status {response.status_code}")
+        return None
+
+    # Extraction workers read a file in `cache_dir` that the HTTP cache cannot
+    # replace or prune under them: a hard link to the cached body (no second copy
+    # on disk), or the body written out when linking is not possible or the
+    # cache may not store it (no-store, private)
+    path = os.path.join(cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".pdf")
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+    linked = False
+    cached = cached_body_path(url)
+    if cached is not None:
         try:
-            print(f"Processing {i}/{len(pdf_links)}: {url}")
+            os.link(cached, tmp_path)
+            linked = True
+        except OSError:
+            pass  # another filesystem, or pruned since the fetch
+    if not linked:
+        with open(tmp_path, "wb") as f:
+            f.write(response.content)
+    os.replace(tmp_path, path)
+    return path
+
+
+# ---------------------------
+# EXTRACTION (process pool, page ranges)
+# ---------------------------
+def count_pages(path):
+    with fitz.open(path) as doc:
+        return doc.page_count
+
+
+def extract_page_range(path, url, start, end, with_tables):
+    """
+    Worker: extract pages [start, end) of one PDF. Each page becomes its own
+    record so page boundaries survive into chunking and citations.
+    """
+    filename = os.path.basename(urlparse(url).path)
+    records = []
+    with fitz.open(path) as doc:
+        for number in range(start, end):
+            records.append({
+                "filename": filename,
+                "url": url,
+                "page_number": number + 1,
+                "text": doc[number].get_text().strip(),
+                "tables": [],
+            })
+
+    if with_tables:
+        # Same table extraction as the "Data collection" notebook, done in this pass
+        import pdfplumber
+        with pdfplumber.open(path, pages=list(range(start + 1, end + 1))) as pdf:
+            for record, page in zip(records, pdf.pages):
+                record["tables"] = page.extract_tables()
+
+    return records
+
+
+def write_outputs(records, csv_file, json_file, store_dir=None):
+    records.sort(key=lambda r: (r["url"], r["page_number"]))
+
+    if store_dir:
+        store = CorpusStore(store_dir)
+        with store.writer() as corpus:
+            for r in records:
+                corpus.add(url=r["url"], text=r["text"], source_type="pdf", filename=r["filename"],
+                           page_number=r["page_number"], tables=r["tables"])
+        store.close()
+
+    with open(csv_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["filename", "url", "page_number", "text", "tables"])  # header
+        for r in records:
+            writer.writerow([r["filename"], r["url"], r["page_number"], r["text"],
+                             json.dumps(r["tables"], ensure_ascii=False)])
+
+    # Grouped layout read by db_creation.load_json_to_dataframe
+    grouped = {}
+    for r in records:
+        doc = grouped.setdefault(r["url"], {"pdf_file": r["filename"], "url": r["url"], "content": []})
+        doc["content"].append({"page_number": r["page_number"], "text": r["text"], "tables": r["tables"]})
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump(list(grouped.values()), f, indent=2, ensure_ascii=False)
+
 
-            headers = {
-                "User-Agent": "Mozilla/5.0",
-                "Referer": "https://puchd.ac.in"
-            }
+def process_pdfs(pdf_links, args):
+    os.makedirs(args.cache_dir, exist_ok=True)
+    limiter = ThreadedHostLimiter(max_per_host=args.per_host, min_delay=args.delay)
+    started = time.perf_counter()
 
-            response = requests.get(url, headers=headers, timeout=15)
+    records = []
+    page_count = 0
+    with ThreadPoolExecutor(max_workers=args.download_workers) as downloads, \
+            ProcessPoolExecutor(max_workers=args.extract_workers) as extractors:
+        download_futures = {
+            downloads.submit(download_pdf, url, limiter, args.cache_dir): url
+            for url in pdf_links
+        }
+        extract_futures = {}
 
-            # Skip if request failed or content is not a PDF
-            if response.status_code != 200 or "application/pdf" not in response.headers.get("Content-Type", ""):
-                print(f"Skipping (status {response.status_code}): {url}")
-                with open("failed_pdfs.txt", "a", encoding="utf-8") as fail_log:
-                    fail_log.write(f"{url} - status {response.status_code}\n")
-                continue
+        # Extraction of a PDF starts as soon as its download finishes
+        for i, future in enumerate(as_completed(download_futures), 1):
+            url = download_futures[future]
+            try:
+                path = future.result()
+                if path is None:
+                    continue
+                pages = count_pages(path)
+                print(f"Downloaded {i}/{len(pdf_links)} ({pages} pages): {url}")
+                for start in range(0, pages, PAGES_PER_TASK):
+                    end = min(start + PAGES_PER_TASK, pages)
+                    task = extractors.submit(extract_page_range, path, url, start, end, args.tables)
+                    extract_futures[task] = url
+            except Exception as e:
+                print(f"Exception for {url}: {e}")
+                log_failure(url, f"exception: {e}")
 
-            # Create a filename from URL
-            parsed_url = urlparse(url)
-            filename = os.path.basename(parsed_url.path)
+        for task in as_completed(extract_futures):
+            url = extract_futures[task]
+            try:
+                page_records = task.result()
+                records.extend(page_records)
+                page_count += len(page_records)
+            except Exception as e:
+                print(f"Exception for {url}: {e}")
+                log_failure(url, f"exception: {e}")
 
-            # Extract text from PDF
-            doc = fitz.open(stream=response.content, filetype="pdf")
-            text = ""
-            for page in doc:
-                text += page.get_text()
-            doc.close()
+    write_outputs(records, args.csv_out, args.json_out, args.store)
 
-            # Write extracted text to CSV
-            csv_writer.writerow([filename, url, text.strip().replace("\n", " ")])
+    elapsed = time.perf_counter() - started
+    docs = len({r["url"] for r in records})
+    print(f"\n📊 {docs} PDFs, {page_count} pages in {elapsed:.1f}s "
+          f"({page_count / elapsed if elapsed else 0:.1f} pages/s)")
+    print(f"All PDFs processed and saved to {args.csv_out} and {args.json_out}")
 
-            sleep(0.5)  # be polite to server
 
-        except Exception as e:
-            print(f"Exception for {url}: {e}")
-            with open("failed_pdfs.txt", "a", encoding="utf-8") as fail_log:
-                fail_log.write(f"{url} - exception: {e}\n")
-            continue
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download PU PDFs and extract per-page text")
+    parser.add_argument("--input", default="pdf_links.txt")
+    parser.add_argument("--csv-out", default="pu_pdf_data.csv")
+    parser.add_argument("--json-out", default="pdf_data.json")
+    parser.add_argument("--cache-dir", default="pdf_cache", help="PDFs the shared HTTP cache may not store")
+    parser.add_argument("--store", default="corpus", help="corpus store directory shared with the indexers")
+    parser.add_argument("--download-workers", type=int, default=8)
+    parser.add_argument("--extract-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--per-host", type=int, default=2, help="max concurrent downloads per host")
+    parser.add_argument("--delay", type=float, default=0.5, help="min seconds between requests to one host")
+    parser.add_argument("--tables", action="store_true", help="also extract tables with pdfplumber")
+    args = parser.parse_args()
 
-print("All PDFs processed and saved to pu_pdf_data.csv")
+    # Load PDF links from txt file
+    with open(args.input, "r", encoding="utf-8") as f:
+        pdf_links = list(dict.fromkeys(line.strip() for line in f if line.strip()))
 
+    process_pdfs(pdf_links, args)
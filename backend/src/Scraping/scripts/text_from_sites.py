@@ -1,16 +1,34 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
 import csv
+from urllib.parse import urlsplit
 from tqdm import tqdm
-import gc
 
-def get_visible_text(html):
-    soup = BeautifulSoup(html, "html.parser")
-    for element in soup(["script", "style", "noscript"]):
-        element.decompose()
-    return soup.get_text(separator="\n", strip=True)
+from corpus_store import CorpusStore
+from html_extractor import BoilerplateFilter, PageTooLarge, extract_lines, fetch_html
+from scrape_state import ScrapeState, text_hash
 
-def scrape_urls(urls, output_csv_file="pu_scraped_text.csv", max_size=2_000_000):
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
+}
+
+# Site-wide menus/footers learned across runs, shared with the live chatbot
+boilerplate = BoilerplateFilter("boilerplate.json")
+
+def get_visible_text(html, url=None):
+    """ (visible text without boilerplate, hash of the page text before the boilerplate filter) """
+    lines = extract_lines(html)
+    # The filter keeps learning, so its output can change while the page has not:
+    # change detection must not depend on it
+    page_hash = text_hash("\n".join(lines))
+    if url:
+        lines = boilerplate.filter(urlsplit(url).hostname or "", lines)
+    return "\n".join(lines), page_hash
+
+def remember_page(state, url, response, page_hash):
+    if state is not None:
+        state.update(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), page_hash)
+
+def scrape_urls(urls, output_csv_file="pu_scraped_text.csv", max_size=2_000_000, state=None, corpus=None):
     with open(output_csv_file, "w", newline='', encoding="utf-8") as csvfile:
         writer = csv.writer(csvfile)
         writer.writerow(["URL", "Text"])  # Header
@@ -18,29 +36,93 @@ def scrape_urls(urls, output_csv_file="pu_scraped_text.csv", max_size=2_000_000)
         for url in tqdm(urls, desc="Scraping Progress", unit="url"):
             if 'puchd.ac' in url:
                 try:
-                    headers = {
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-                    }
-                    response = requests.get(url, headers=headers, timeout=10)
-
-                    # Skip large pages
-                    if len(response.content) > max_size:
-                        print(f"\nSkipping large page: {url}")
-                        continue
-
+                    # Large pages are abandoned before their body is downloaded
+                    response, body = fetch_html(url, headers=HEADERS, timeout=10, max_bytes=max_size)
                     response.raise_for_status()
-                    text = get_visible_text(response.text)
+                    text, page_hash = get_visible_text(body, url)
                     writer.writerow([url, text])
+                    if corpus is not None:
+                        corpus.add(url=url, text=text, source_type="site")
+                    # Baseline for the next --incremental run
+                    remember_page(state, url, response, page_hash)
 
+                except PageTooLarge:
+                    print(f"\nSkipping large page: {url}")
                 except Exception as e:
                     print(f"\nFailed to scrape {url}: {e}")
 
-                # Force garbage collection
-                gc.collect()
-
+    if state is not None:
+        state.commit()
     print(f"\nScraping complete. Output saved to '{output_csv_file}'")
 
-def run_scraper_with_chunking(input_txt_file, chunk_size=50):
+def refresh_urls(urls, state, delta_csv_file="pu_scraped_delta.csv", max_size=2_000_000, corpus=None):
+    """
+    Incremental refresh: send conditional requests using the stored validators
+    and write only new, changed and deleted pages to `delta_csv_file`.
+    """
+    counts = {"new": 0, "changed": 0, "unchanged": 0, "deleted": 0, "failed": 0}
+    urls = [url for url in urls if 'puchd.ac' in url]
+
+    with open(delta_csv_file, "w", newline='', encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["URL", "Text", "Change"])  # Header
+
+        for url in tqdm(urls, desc="Refreshing", unit="url"):
+            known = state.get(url)
+            try:
+                response, body = fetch_html(url, headers={**HEADERS, **state.conditional_headers(url)},
+                                            timeout=10, max_bytes=max_size)
+
+                if response.status_code == 304:
+                    state.touch(url)
+                    counts["unchanged"] += 1
+                    continue
+
+                if response.status_code in (404, 410):
+                    if known is not None:
+                        writer.writerow([url, "", "deleted"])
+                        if corpus is not None:
+                            corpus.delete(url)
+                        state.delete(url)
+                        counts["deleted"] += 1
+                    continue
+
+                response.raise_for_status()
+                text, page_hash = get_visible_text(body, url)
+
+                if known is not None and known["text_hash"] == page_hash:
+                    # Server ignored the validators but the content is the same
+                    remember_page(state, url, response, page_hash)
+                    counts["unchanged"] += 1
+                    continue
+
+                change = "new" if known is None else "changed"
+                writer.writerow([url, text, change])
+                if corpus is not None:
+                    corpus.add(url=url, text=text, source_type="site")
+                remember_page(state, url, response, page_hash)
+                counts[change] += 1
+
+            except PageTooLarge:
+                print(f"\nSkipping large page: {url}")
+            except Exception as e:
+                # Transient failures keep the previous version rather than deleting it
+                print(f"\nFailed to refresh {url}: {e}")
+                counts["failed"] += 1
+
+        # Pages no longer linked from the site are gone from the corpus
+        for url in sorted(state.urls() - set(urls)):
+            writer.writerow([url, "", "deleted"])
+            if corpus is not None:
+                corpus.delete(url)
+            state.delete(url)
+            counts["deleted"] += 1
+
+    state.commit()
+    print(f"\nRefresh complete: {counts}. Delta saved to '{delta_csv_file}'")
+    return counts
+
+def run_scraper_with_chunking(input_txt_file, chunk_size=50, state=None, corpus=None):
     with open(input_txt_file, "r") as file:
         all_urls = [line.strip() for line in file if line.strip()]
 
@@ -49,7 +131,28 @@ def run_scraper_with_chunking(input_txt_file, chunk_size=50):
         chunk_urls = all_urls[i:i + chunk_size]
         output_file = f"pu_scraped_part_{i//chunk_size + 1}.csv"
         print(f"\nProcessing chunk {i//chunk_size + 1} with {len(chunk_urls)} URLs")
-        scrape_urls(chunk_urls, output_csv_file=output_file)
+        scrape_urls(chunk_urls, output_csv_file=output_file, state=state, corpus=corpus)
 
 # Run it
-run_scraper_with_chunking("internal_links.txt", chunk_size=500)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape visible text from PU web pages")
+    parser.add_argument("--input", default="internal_links.txt")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--incremental", action="store_true",
+                        help="only emit new/changed/deleted pages since the last run")
+    parser.add_argument("--state", default="scrape_state.db")
+    parser.add_argument("--delta-out", default="pu_scraped_delta.csv")
+    parser.add_argument("--store", default="corpus", help="corpus store directory shared with the indexers")
+    args = parser.parse_args()
+
+    state = ScrapeState(args.state)
+    store = CorpusStore(args.store)
+    with store.writer() as corpus:
+        if args.incremental:
+            with open(args.input, "r") as file:
+                refresh_urls([line.strip() for line in file if line.strip()], state, args.delta_out, corpus=corpus)
+        else:
+            run_scraper_with_chunking(args.input, chunk_size=args.chunk_size, state=state, corpus=corpus)
+    store.close()
+    state.close()
+    boilerplate.save()
@@ -1,13 +1,22 @@
 # content_extractor.py
 
-import requests
+import os
+import sys
 import fitz  # PyMuPDF
-from bs4 import BeautifulSoup
 import io
 
+SCRAPING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Scraping", "scripts")
+sys.path.append(SCRAPING_DIR)
+from html_extractor import BoilerplateFilter, extract_text, fetch_html  # noqa: E402
+from http_client import fetch  # noqa: E402
+
+# Menus and footers learned by the nightly text_from_sites.py crawl
+boilerplate = BoilerplateFilter(os.path.join(SCRAPING_DIR, "boilerplate.json"))
+
 def extract_pdf_text(pdf_url):
     try:
-        response = requests.get(pdf_url)
+        # Repeat requests for the same fee/admission PDF are served from the HTTP cache
+        response = fetch(pdf_url, timeout=(5, 30))
         response.raise_for_status()
         
         # Load PDF directly from memory
@@ -24,18 +33,11 @@ def extract_pdf_text(pdf_url):
 def extract_html_text(url):
     try:
         headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=15)
+        response, body = fetch_html(url, headers=headers, timeout=15)
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        content = []
-
-        for tag in soup.find_all(["p", "li", "td", "h1", "h2", "h3"]):
-            text = tag.get_text(strip=True)
-            if text and len(text) > 30:
-                content.append(text)
-
-        return "\n".join(content)
+        # Same extractor as the scrapers; short lines are mostly menu labels
+        return extract_text(body, url=url, boilerplate=boilerplate, min_chars=30, learn=False)
 
     except Exception as e:
         print(f"[ERROR] Failed to extract HTML: {e}")
@@ -1,12 +1,16 @@
 # generate_answer.py
 
 import os
+import sys
 from dotenv import load_dotenv
 from llama_index.core import Document, VectorStoreIndex
 from llama_index.llms.groq import Groq
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.core.prompts import PromptTemplate
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Final Backend"))
+from onnx_backend import BGE_QUERY_INSTRUCTION, OnnxEmbedding, model_dir, use_onnx  # noqa: E402
+
 load_dotenv()
 groq_api_key = os.getenv("GROQ_API_KEY")
 
@@ -14,7 +18,11 @@ groq_api_key = os.getenv("GROQ_API_KEY")
 llm = Groq(api_key=groq_api_key, model="llama3-8b-8192")
 
 # 🔹 Embedding: Use local HuggingFace model (no OpenAI needed)
-embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5")  # lightweight + accurate
+# INFERENCE_BACKEND=onnx serves the int8 export made by onnx_backend.py instead of PyTorch
+if use_onnx():
+    embed_model = OnnxEmbedding(model_dir("bge-small"), query_instruction=BGE_QUERY_INSTRUCTION)
+else:
+    embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5")  # lightweight + accurate
 
 def generate_answer(query, context):
     doc = Document(text=context)
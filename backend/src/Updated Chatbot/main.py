@@ -1,11 +1,16 @@
 # main.py
 
+import os
+import sys
+
+# link_discovery, html_extractor and http_client live with the scrapers
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Scraping", "scripts"))
+
 from intent_classifier import classify_intent
 from intent_map import intent_to_url
 from search_links import search_links_within_intent_urls
 from content_extractor import extract_pdf_text, extract_html_text
 from generate_answer import generate_answer
-import os
 from dotenv import load_dotenv
 from llama_index.llms.groq import Groq
 
@@ -1,35 +1,76 @@
 # search_links.py
 
+from urllib.parse import urljoin
+
+from link_discovery import DiscoveryStats, fetch_anchors_http
 from playwright.sync_api import sync_playwright
 
+
+def _anchors_from_browser(p_state, url):
+    if p_state.get("page") is None:
+        pw = sync_playwright().start()
+        browser = None
+        try:
+            browser = pw.chromium.launch(headless=True)
+            page = browser.new_page()
+        except Exception:
+            # a failed launch must not leave the Playwright driver running
+            if browser is not None:
+                browser.close()
+            pw.stop()
+            p_state.clear()
+            raise
+        p_state.update(pw=pw, browser=browser, page=page)
+
+    page = p_state["page"]
+    page.goto(url, timeout=20000)
+    anchors = []
+    for a in page.query_selector_all("a"):
+        anchors.append((a.get_attribute("href"), a.inner_text()))
+    return page.url, anchors
+
+
 def search_links_within_intent_urls(query, urls):
     query_keywords = query.lower().split()
     matched_links = []
+    p_state = {}
+    discovery_stats = DiscoveryStats()
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-
+    try:
         for url in urls:
             try:
-                page.goto(url, timeout=20000)
-                anchors = page.query_selector_all("a")
+                # Most intent pages are server-rendered; only JS shells need Chromium
+                result = None
+                try:
+                    result = fetch_anchors_http(url, timeout=15)
+                except Exception as e:
+                    print(f"[WARN] HTTP fetch failed for {url}: {e}")
 
-                for a in anchors:
-                    href = a.get_attribute("href")
-                    text = a.inner_text().strip().lower()
+                if result is not None:
+                    discovery_stats.http += 1
+                else:
+                    result = _anchors_from_browser(p_state, url)
+                    discovery_stats.browser += 1
+                base_url, anchors = result
 
+                for href, text in anchors:
+                    text = (text or "").strip().lower()
                     if not href or not text:
                         continue
                     if any(kw in text for kw in query_keywords):
-                        full_url = href if href.startswith("http") else url.rsplit("/", 1)[0] + "/" + href.lstrip("/")
-                        matched_links.append((text, full_url))
-            
+                        matched_links.append((text, urljoin(base_url, href)))
+
             except Exception as e:
+                discovery_stats.failed += 1
                 print(f"[WARN] Could not open {url}: {e}")
+    finally:
+        if p_state.get("browser") is not None:
+            p_state["browser"].close()
+            p_state["pw"].stop()
+        p_state.clear()
+
+    print(f"[INFO] Link discovery: {discovery_stats.summary()}")
 
-        browser.close()
-    
     # Remove duplicates
     seen = set()
     unique_links = []
@@ -0,0 +1,24 @@
+# conftest.py
+
+import os
+import re
+import sys
+
+import pytest
+
+# the backend modules are flat scripts in folders with spaces, not packages
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+sys.path.append(os.path.join(SRC, "Final Backend"))
+sys.path.append(os.path.join(SRC, "Scraping", "scripts"))
+
+
+class WordTokenizer:
+    """ Stand-in for a fast tokenizer: one token per whitespace-separated word, with offsets """
+
+    def __call__(self, texts, **kwargs):
+        return {"offset_mapping": [[m.span() for m in re.finditer(r"\S+", t)] for t in texts]}
+
+
+@pytest.fixture
+def word_tokenizer():
+    return WordTokenizer()
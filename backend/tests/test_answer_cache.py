@@ -0,0 +1,71 @@
+# test_answer_cache.py
+
+import numpy as np
+
+from answer_cache import AnswerCache, normalize_query, partition_key, query_entities, should_cache
+
+VECTORS = {
+    "fee structure": [1.0, 0.0, 0.0],
+    "what is the fee structure": [0.99, 0.14, 0.0],
+    "hostel rules": [0.0, 1.0, 0.0],
+}
+
+
+def embed(query):
+    return VECTORS.get(normalize_query(query), [0.0, 0.0, 1.0])
+
+
+def test_normalize_query():
+    assert normalize_query("Fee structure for UIET??") == normalize_query("fee  structure for uiet")
+
+
+def test_query_entities():
+    assert query_entities("Fee for CSE in 2nd year of B.Tech") == "2nd btech cse"
+    assert query_entities("fee for ece") == "ece"
+    assert query_entities("fee for M.Tech 2024-25") == "2024-25 mtech"
+    assert query_entities("what is the fee") == ""
+    # questions about different programmes never share a partition
+    assert partition_key("", query_entities("fee for cse")) != partition_key("", query_entities("fee for ece"))
+
+
+def test_should_cache_only_grounded_answers():
+    assert should_cache("The fee is 1,20,000.", "context about fees")
+    assert not should_cache("The fee is 1,20,000.", "")
+    assert not should_cache("Could you please clarify which department?", "context")
+    assert not should_cache("I couldn't find that in the documents.", "context")
+    assert not should_cache("⚠️ Something went wrong", "context")
+    assert not should_cache("  ", "context")
+
+
+def test_exact_and_semantic_hits():
+    cache = AnswerCache(embed, threshold=0.95)
+    answer, embedding = cache.get("fee structure", "p", 1)
+    assert answer is None
+    cache.put("fee structure", "p", 1, "1,20,000", embedding)
+
+    assert cache.get("Fee  Structure?", "p", 1)[0] == "1,20,000"
+    assert cache.get("what is the fee structure", "p", 1)[0] == "1,20,000"
+    assert cache.get("hostel rules", "p", 1)[0] is None
+    assert cache.get("fee structure", "other", 1)[0] is None
+    report = cache.report()
+    assert (report["exact_hits"], report["semantic_hits"], report["misses"]) == (1, 1, 3)
+
+
+def test_ttl_version_and_size_bounds(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("answer_cache.time.time", lambda: clock[0])
+    cache = AnswerCache(embed, ttl=60, max_entries=2)
+    vector = np.array(embed("fee structure"), dtype=np.float32)
+
+    cache.put("fee structure", "p", 1, "a", vector)
+    clock[0] += 61
+    assert cache.get("fee structure", "p", 1)[0] is None
+
+    cache.put("fee structure", "p", 1, "a", vector)
+    assert cache.get("fee structure", "p", 2)[0] is None
+    assert cache.stats["invalidations"] == 1
+
+    for query in ("q1", "q2", "q3"):
+        cache.put(query, "p", 2, query, vector)
+    assert cache.report()["entries"] == 2
+    assert cache.stats["evicted"] == 1
@@ -0,0 +1,62 @@
+# test_asgi_server.py
+
+import sys
+import types
+
+import pytest
+from fastapi.testclient import TestClient
+from flask import Flask
+
+import asgi_server
+from llm_steps import AnswerStream
+
+ORIGIN = "http://localhost:5173"
+
+
+def answer_steps(query):
+    reply = yield f"PROMPT {query}"
+    return {"reply": reply}
+
+
+async def agroq_generate(prompt):
+    return f"answer to {prompt}"
+
+
+async def agroq_stream(prompt):
+    for piece in ("answer ", "streamed"):
+        yield piece
+
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = types.ModuleType("fake_engine")
+    engine.CORS_ORIGINS = [ORIGIN]
+    engine.CORS_CREDENTIALS = False
+    engine.startup = types.SimpleNamespace(ready=True, start=lambda: None, status=lambda: {"status": "ready"})
+    engine.app = Flask("fake_engine")
+    engine.agroq_generate = agroq_generate
+    engine.agroq_stream = agroq_stream
+    engine.answer_view = lambda: AnswerStream(["know more about"])
+    monkeypatch.setitem(sys.modules, "fake_engine", engine)
+    monkeypatch.setitem(asgi_server.ENGINES, "fake_engine",
+                        (lambda engine, data: (answer_steps(data["message"]), None), False))
+    with TestClient(asgi_server.create_app("fake_engine")) as client:
+        yield client
+
+
+def test_cors_follows_the_engine_origins(client):
+    preflight = {"Access-Control-Request-Method": "POST", "Access-Control-Request-Headers": "content-type"}
+    allowed = client.options("/api/chat", headers={"Origin": ORIGIN, **preflight})
+    assert allowed.headers["access-control-allow-origin"] == ORIGIN
+    assert "access-control-allow-credentials" not in allowed.headers
+
+    other = client.options("/api/chat", headers={"Origin": "https://example.com", **preflight})
+    assert "access-control-allow-origin" not in other.headers
+    response = client.post("/api/chat", json={"message": "fee"}, headers={"Origin": "https://example.com"})
+    assert "access-control-allow-origin" not in response.headers
+
+
+def test_chat_and_stream(client):
+    assert client.post("/api/chat", json={"message": "fee"}).json() == {"reply": "answer to PROMPT fee"}
+    body = client.post("/api/chat/stream", json={"message": "fee"}).text
+    assert body.endswith('event: done\ndata: {"reply": "answer streamed"}\n\n')
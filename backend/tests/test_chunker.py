@@ -0,0 +1,39 @@
+# test_chunker.py
+
+from chunker import chunk_documents, chunk_text
+
+
+def words(prefix, n):
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+def test_chunks_are_slices_of_the_source(word_tokenizer):
+    text = "Fee  Structure\n\n" + words("w", 30)
+    for chunk in chunk_documents([text], word_tokenizer, max_tokens=8, stride=2)[0]:
+        assert chunk.text == text[chunk.start:chunk.end].strip()
+
+
+def test_cuts_prefer_paragraph_boundaries(word_tokenizer):
+    first, second = words("a", 6), words("b", 6)
+    assert chunk_text(f"{first}\n\n{second}", word_tokenizer, max_tokens=8, stride=2) == [first, second]
+
+
+def test_hard_cut_overlaps_by_stride(word_tokenizer):
+    chunks = chunk_documents([words("w", 20)], word_tokenizer, max_tokens=8, stride=2)[0]
+    assert [c.text.split()[0] for c in chunks] == ["w0", "w6", "w12"]
+    assert chunks[-1].text.split()[-1] == "w19"
+
+
+def test_empty_and_non_string_texts(word_tokenizer):
+    assert chunk_documents(["", None], word_tokenizer) == [[], []]
+    assert chunk_documents([""], word_tokenizer, parent_tokens=16) == [([], [])]
+
+
+def test_children_point_at_their_parent_window(word_tokenizer):
+    text = "\n\n".join(words(f"p{i}_", 10) for i in range(4))
+    parents, children = chunk_documents([text], word_tokenizer, max_tokens=4, stride=0, parent_tokens=20)[0]
+    assert len(parents) == 2
+    assert {c.parent for c in children} == {0, 1}
+    for child in children:
+        parent = parents[child.parent]
+        assert parent.start <= child.start and child.end <= parent.end
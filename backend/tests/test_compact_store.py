@@ -0,0 +1,94 @@
+# test_compact_store.py
+
+import uuid
+
+import chromadb
+import numpy as np
+import pytest
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import MetadataFilter, MetadataFilters, VectorStoreQuery
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
+
+from compact_store import (CompactVectorStore, Quantizer, build_compact_index, collection_revision, mark_revision,
+                           rebuild_compact_index, recall_at_k)
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).normal(size=(300, 128)).astype(np.float32)
+
+
+def node_metadatas(ids):
+    # stored the way Chroma holds llama-index nodes
+    return [node_to_metadata_dict(TextNode(id_=node_id, metadata={"source_url": f"https://puchd.ac.in/{i}"}),
+                                  remove_text=True, flat_metadata=False) for i, node_id in enumerate(ids)]
+
+
+def build(tmp_path, vectors, **kwargs):
+    ids = [f"n{i}" for i in range(len(vectors))]
+    build_compact_index(str(tmp_path), ids, vectors, [f"text {i}" for i in ids], node_metadatas(ids), **kwargs)
+    return CompactVectorStore(str(tmp_path))
+
+
+def test_quantizer_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        Quantizer("int4")
+
+
+@pytest.mark.parametrize("kwargs", [{"mode": "int8"}, {"mode": "binary"}, {"mode": "int8", "dims": 64, "pca": True}])
+def test_rescored_search_matches_exact_search(tmp_path, vectors, kwargs):
+    store = build(tmp_path, vectors, **kwargs)
+    rows, scores = store.search(vectors[7], 3)
+    assert rows[0] == 7
+    assert scores[0] == pytest.approx(1.0, abs=1e-5)
+    assert list(scores) == sorted(scores, reverse=True)
+    assert recall_at_k(store, vectors[:20], k=1) == (1.0, 1.0)
+
+
+def test_int8_recall(tmp_path, vectors):
+    store = build(tmp_path, vectors)
+    queries = vectors[:20] + np.random.default_rng(1).normal(0, 0.3, (20, vectors.shape[1]))
+    assert recall_at_k(store, queries, k=3)[0] >= 0.95
+
+
+def test_query_returns_nodes(tmp_path, vectors):
+    store = build(tmp_path, vectors)
+    result = store.query(VectorStoreQuery(query_embedding=vectors[3].tolist(), similarity_top_k=2))
+    assert result.ids[0] == "n3"
+    assert result.nodes[0].get_content() == "text n3"
+    assert result.nodes[0].metadata["source_url"] == "https://puchd.ac.in/3"
+    with pytest.raises(NotImplementedError):
+        store.add([])
+
+
+def test_filtered_query(tmp_path, vectors):
+    store = build(tmp_path, vectors)
+    filters = MetadataFilters(filters=[MetadataFilter(key="source_url", value="https://puchd.ac.in/5")])
+    result = store.query(VectorStoreQuery(query_embedding=vectors[3].tolist(), similarity_top_k=2, filters=filters))
+    assert result.ids == ["n5"]
+    result = store.query(VectorStoreQuery(query_embedding=vectors[3].tolist(), similarity_top_k=3,
+                                          node_ids=["n8", "n9"]))
+    assert sorted(result.ids) == ["n8", "n9"]
+
+
+def test_copy_of_an_older_revision_refuses_to_load(tmp_path, vectors):
+    build(tmp_path, vectors, revision="r1")
+    assert CompactVectorStore(str(tmp_path), revision="r1")
+    with pytest.raises(ValueError):
+        CompactVectorStore(str(tmp_path), revision="r2")
+
+
+def test_rebuild_follows_the_collection(tmp_path, vectors):
+    collection = chromadb.EphemeralClient().create_collection(f"test-{uuid.uuid4().hex}", embedding_function=None)
+    ids = [f"n{i}" for i in range(50)]
+    collection.add(ids=ids, embeddings=vectors[:50].tolist(), documents=ids, metadatas=node_metadatas(ids))
+    build(tmp_path, vectors[:50], mode="binary", revision=collection_revision(collection))
+
+    collection.delete(ids=["n0"])
+    revision = mark_revision(collection)
+    with pytest.raises(ValueError):
+        CompactVectorStore(str(tmp_path), revision=revision)
+    rebuild_compact_index(str(tmp_path), collection)
+    store = CompactVectorStore(str(tmp_path), revision=revision)
+    assert store._meta["count"] == 49
+    assert store._meta["mode"] == "binary"
@@ -0,0 +1,74 @@
+# test_corpus_store.py
+
+import multiprocessing
+import os
+
+from corpus_store import CorpusStore
+
+
+def test_newest_version_wins(tmp_path):
+    store = CorpusStore(str(tmp_path), shard_rows=2)
+    store.append([
+        {"url": "https://puchd.ac.in/a", "text": "old", "fetched_at": 1.0},
+        {"url": "https://puchd.ac.in/b", "text": "b", "fetched_at": 1.0},
+        {"url": "https://puchd.ac.in/f.pdf", "text": "p1", "source_type": "pdf", "page_number": 1, "fetched_at": 1.0},
+    ])
+    store.append([{"url": "https://puchd.ac.in/a", "text": "new", "fetched_at": 2.0}])
+    # an older re-import does not overwrite a newer version
+    store.append([{"url": "https://puchd.ac.in/a", "text": "stale", "fetched_at": 0.5}])
+
+    assert [r["text"] for r in store.get("https://puchd.ac.in/a")] == ["new"]
+    assert store.get("https://puchd.ac.in/f.pdf", page_number=1)[0]["text"] == "p1"
+    assert store.urls(source_type="site") == {"https://puchd.ac.in/a", "https://puchd.ac.in/b"}
+    texts = sorted(r["text"] for r in store.iter_records(columns=["text"]))
+    assert texts == ["b", "new", "p1"]
+    assert [r["text"] for r in store.iter_records(columns=["text"], source_type="pdf")] == ["p1"]
+    store.close()
+
+
+def test_tombstones_and_compact(tmp_path):
+    store = CorpusStore(str(tmp_path))
+    store.append([{"url": "https://puchd.ac.in/a", "text": "a", "fetched_at": 1.0},
+                  {"url": "https://puchd.ac.in/b", "text": "b", "fetched_at": 1.0}])
+    with store.writer() as w:
+        w.delete("https://puchd.ac.in/b")
+    assert store.urls() == {"https://puchd.ac.in/a"}
+
+    store.compact()
+    assert len(store.shards()) == 1
+    assert [r["url"] for r in store.iter_records(latest_only=False)] == ["https://puchd.ac.in/a"]
+    store.close()
+
+
+def test_numbering_continues_after_reopen(tmp_path):
+    store = CorpusStore(str(tmp_path))
+    store.append([{"url": "https://puchd.ac.in/a"}])
+    store.append([{"url": "https://puchd.ac.in/b"}])
+    store.close()
+    store = CorpusStore(str(tmp_path))
+    store.append([{"url": "https://puchd.ac.in/c"}])
+    assert store.shards() == ["part-00001.parquet", "part-00002.parquet", "part-00003.parquet"]
+    store.close()
+
+
+def _write_many(root, worker):
+    store = CorpusStore(root, shard_rows=1)
+    store.append([{"url": f"https://puchd.ac.in/{worker}/{i}", "text": str(i)} for i in range(10)])
+    store.close()
+
+
+def test_concurrent_writers_never_share_a_shard(tmp_path):
+    root = str(tmp_path)
+    CorpusStore(root).close()
+    procs = [multiprocessing.Process(target=_write_many, args=(root, w)) for w in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+        assert p.exitcode == 0
+
+    store = CorpusStore(root)
+    assert len(store.shards()) == 40
+    assert len(store.urls()) == 40
+    assert not [f for f in os.listdir(root) if f.endswith(".tmp")]
+    store.close()
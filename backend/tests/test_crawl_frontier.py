@@ -0,0 +1,59 @@
+# test_crawl_frontier.py
+
+from crawl_frontier import CrawlFrontier, canonicalize_url, is_in_scope, repair_legacy_join
+
+
+def test_repair_legacy_join():
+    assert repair_legacy_join("https://puchd.ac.inpage.php") == "https://puchd.ac.in/page.php"
+    assert repair_legacy_join("https://puchd.ac.inmailto:x@y") == "mailto:x@y"
+    assert repair_legacy_join("https://puchd.ac.inhttps://uiet.puchd.ac.in/") == "https://uiet.puchd.ac.in/"
+    assert repair_legacy_join("https://puchd.ac.in/page.php") == "https://puchd.ac.in/page.php"
+
+
+def test_canonicalize_url():
+    assert canonicalize_url("/a//b c.php#top", "https://PUCHD.ac.in:443/x/") == "https://puchd.ac.in/a/b%20c.php"
+    assert canonicalize_url("page.php?id=2", "https://puchd.ac.in/dir/") == "https://puchd.ac.in/dir/page.php?id=2"
+    assert canonicalize_url("http://puchd.ac.in:8080") == "http://puchd.ac.in:8080/"
+    for href in (None, "", "  ", "#top", "mailto:a@b", "javascript:void(0)", "ftp://puchd.ac.in/f"):
+        assert canonicalize_url(href) is None
+
+
+def test_is_in_scope():
+    assert is_in_scope("https://puchd.ac.in/")
+    assert is_in_scope("https://uiet.puchd.ac.in/x")
+    assert not is_in_scope("https://notpuchd.ac.in/")
+
+
+def test_add_claim_and_resume(tmp_path):
+    db = str(tmp_path / "frontier.db")
+    frontier = CrawlFrontier(db)
+    added = frontier.add(["https://puchd.ac.in/a", "https://puchd.ac.in/f.pdf", "https://example.com/"])
+    assert added == 3
+    assert frontier.add(["https://puchd.ac.in/a"]) == 0
+    frontier.add(["https://puchd.ac.in/deep"], depth=2)
+
+    # only in-scope pages are crawled, shallowest first
+    assert frontier.claim(1) == [("https://puchd.ac.in/a", 0)]
+    assert frontier.claim(10, max_depth=1) == []
+    assert frontier.stats() == {"page:in_progress": 1, "page:pending": 1, "page:skipped": 1, "pdf:skipped": 1}
+    frontier.close()
+
+    # a crash leaves the claimed page in progress; reopening puts it back
+    frontier = CrawlFrontier(db)
+    assert frontier.stats()["page:pending"] == 2
+    frontier.close()
+
+
+def test_failed_and_export(tmp_path):
+    frontier = CrawlFrontier(str(tmp_path / "frontier.db"))
+    frontier.add(["https://puchd.ac.in/a", "https://puchd.ac.in/b", "https://puchd.ac.in/f.pdf"])
+    frontier.claim(2)
+    frontier.mark_done("https://puchd.ac.in/a")
+    frontier.mark_failed("https://puchd.ac.in/b", "timeout")
+    assert frontier.retry_failed() == 1
+
+    pdf_file, page_file = tmp_path / "pdf.txt", tmp_path / "pages.txt"
+    assert frontier.export(str(pdf_file), str(page_file)) == (1, 1)
+    assert pdf_file.read_text().splitlines() == ["https://puchd.ac.in/f.pdf"]
+    assert page_file.read_text().splitlines() == ["https://puchd.ac.in/a"]
+    frontier.close()
@@ -0,0 +1,74 @@
+# test_db_creation.py
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("llama_index.embeddings.huggingface")
+from chunker import chunk_text  # noqa: E402
+from db_creation import clean_text, deduplicate_documents, page_dedup_text, stable_doc_id  # noqa: E402
+
+TEXT = " ".join(f"word{i}" for i in range(120))
+OTHER = " ".join(f"other{i}" for i in range(120))
+TABLE = [[["Course", "Fee"], ["B.Tech CSE", "1,20,000"]]]
+
+
+def frame(rows):
+    return pd.DataFrame([{"pdf_file": "fees.pdf", "tables": [], **row} for row in rows])
+
+
+def test_stable_doc_id():
+    assert stable_doc_id("https://puchd.ac.in/a", 0) == "https://puchd.ac.in/a"
+    assert stable_doc_id("https://puchd.ac.in/f.pdf", 3) == "https://puchd.ac.in/f.pdf#page=3"
+
+
+def test_cleaned_text_keeps_sentence_boundaries(word_tokenizer):
+    cleaned = clean_text("Fees are due in July.   Hostel forms open in June!  Apply online @ puchd.")
+    assert cleaned == "Fees are due in July. Hostel forms open in June! Apply online puchd."
+    assert chunk_text(cleaned, word_tokenizer, max_tokens=8, stride=2) == [
+        "Fees are due in July.", "Hostel forms open in June! Apply online puchd."]
+
+
+def test_page_dedup_text_includes_tables():
+    assert "Course: B.Tech CSE, Fee: 1,20,000" in page_dedup_text("", TABLE)
+
+
+def test_same_filename_at_different_urls_is_kept(word_tokenizer):
+    docs = deduplicate_documents([frame([
+        {"url": "https://uiet.puchd.ac.in/fees.pdf", "page_number": 1, "text": TEXT},
+        {"url": "https://uibs.puchd.ac.in/fees.pdf", "page_number": 1, "text": OTHER},
+    ])], word_tokenizer)
+    assert sorted(d.metadata["source_url"] for d in docs) == [
+        "https://uibs.puchd.ac.in/fees.pdf", "https://uiet.puchd.ac.in/fees.pdf"]
+
+
+def test_duplicate_pages_record_url_aliases(word_tokenizer):
+    docs = deduplicate_documents([frame([
+        {"url": "https://puchd.ac.in/a.pdf", "page_number": 1, "text": TEXT},
+        {"url": "https://puchd.ac.in/b.pdf", "page_number": 1, "text": TEXT},
+    ])], word_tokenizer)
+    assert len(docs) == 1
+    assert docs[0].metadata["source_id"] == "https://puchd.ac.in/a.pdf#page=1"
+    assert docs[0].metadata["aliases"] == "https://puchd.ac.in/b.pdf"
+    assert "aliases" in docs[0].excluded_embed_metadata_keys
+
+
+def test_table_only_pages_survive(word_tokenizer):
+    docs = deduplicate_documents([frame([
+        {"url": "https://puchd.ac.in/a.pdf", "page_number": 1, "text": "", "tables": TABLE},
+        {"url": "https://puchd.ac.in/a.pdf", "page_number": 2, "text": "", "tables": [[["Seat", "Count"], ["CSE", "60"]]]},
+    ])], word_tokenizer)
+    assert sorted(d.metadata["page_number"] for d in docs) == [1, 2]
+    assert {d.metadata["chunk_type"] for d in docs} == {"table"}
+
+
+def test_rebuilt_chunks_keep_their_ids(word_tokenizer):
+    from llama_index.core.node_parser import SimpleNodeParser
+    from db_creation import build_documents, stable_node_id
+
+    pages = frame([{"url": "https://puchd.ac.in/a", "page_number": 0, "text": TEXT, "source_type": "site"}])
+    runs = [SimpleNodeParser(id_func=stable_node_id).get_nodes_from_documents(build_documents(pages, word_tokenizer))
+            for _ in range(2)]
+    assert [n.node_id for n in runs[0]] == [n.node_id for n in runs[1]]
+    assert runs[0][0].node_id == "https://puchd.ac.in/a::text_0#0"
+    assert runs[0][0].metadata["source_type"] == "site"
+    assert "source_type" not in runs[0][0].get_content(metadata_mode="llm")
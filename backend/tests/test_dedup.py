@@ -0,0 +1,62 @@
+# test_dedup.py
+
+import sqlite3
+
+import pytest
+
+from dedup import NearDuplicateIndex, StoredDuplicateIndex, deduplicate, normalize
+
+WORDS = " ".join(f"word{i}" for i in range(200))
+
+
+def test_normalize():
+    assert normalize("Fee  Structure, UIET!") == "fee structure uiet"
+
+
+def test_exact_and_near_duplicates():
+    index = NearDuplicateIndex(threshold=0.8)
+    assert index.add("a", WORDS) is None
+    assert index.add("b", WORDS.upper() + "!!") == "a"
+    assert index.add("c", WORDS + " footer") == "a"
+    assert index.add("d", " ".join(f"other{i}" for i in range(200))) is None
+    assert index.aliases == {"a": ["b", "c"]}
+    assert index.stats == {"seen": 4, "kept": 2, "exact_dupes": 1, "near_dupes": 1}
+
+
+def test_blank_texts_are_kept_and_never_matched():
+    index = NearDuplicateIndex()
+    assert index.add("scan-1", "") is None
+    assert index.add("scan-2", "  ...  ") is None
+    assert not index.aliases
+    assert index.stats["kept"] == 2
+
+
+def test_deduplicate_keeps_canonical_records_across_calls():
+    index = NearDuplicateIndex()
+    records = [{"url": "u1", "text": WORDS}, {"url": "u2", "text": WORDS}, {"url": "u3", "text": None}]
+    kept = deduplicate(records, index, key=lambda r: r["url"], text=lambda r: r["text"])
+    assert [r["url"] for r in kept] == ["u1", "u3"]
+
+    # a later batch is deduplicated against everything the index has kept so far
+    assert deduplicate([{"url": "u4", "text": WORDS + " footer"}], index, key=lambda r: r["url"],
+                       text=lambda r: r["text"]) == []
+    assert index.aliases == {"u1": ["u2", "u4"]}
+
+
+def test_stored_index_matches_the_in_memory_one(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "dedup.sqlite"))
+    stored = StoredDuplicateIndex(conn, "pages", url_of=lambda key: key.split("#")[0], threshold=0.8)
+    memory = NearDuplicateIndex(threshold=0.8)
+    memory.add("a#1", WORDS)
+    stored.save(memory)
+    conn.commit()
+
+    stored = StoredDuplicateIndex(sqlite3.connect(str(tmp_path / "dedup.sqlite")), "pages",
+                                  url_of=lambda key: key.split("#")[0], threshold=0.8)
+    assert stored.add("b#1", WORDS.upper()) == "a#1"
+    assert stored.add("c#1", WORDS + " footer") == "a#1"
+    stored.forget("a")
+    assert stored.add("c#1", WORDS + " footer") is None
+    assert len(stored) == 1
+    with pytest.raises(ValueError):
+        StoredDuplicateIndex(stored.conn, "pages", url_of=str, num_perm=64)
@@ -0,0 +1,61 @@
+# test_embedding_cache.py
+
+import os
+import time
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache, chunk_key
+
+
+def test_key_ignores_whitespace_but_not_model():
+    assert chunk_key("bge", "fee  structure\n") == chunk_key("bge", "fee structure")
+    assert chunk_key("bge", "fee structure") != chunk_key("minilm", "fee structure")
+
+
+def test_lookup_fills_hits_and_reports_misses(tmp_path):
+    cache = EmbeddingCache("org/model", root=str(tmp_path))
+    assert cache.lookup(["a", "b"]) == (None, [0, 1])
+
+    cache.add(["a", "b", "a"], [[1, 0], [0, 1], [9, 9]])
+    assert len(cache) == 2
+    vectors, missing = cache.lookup(["b", "c", " a "])
+    assert missing == [1]
+    np.testing.assert_array_equal(vectors, [[0, 1], [0, 0], [1, 0]])
+    assert cache.summary().startswith("2/5 chunks from cache")
+    cache.close()
+
+    # dtype and dim survive a reopen
+    cache = EmbeddingCache("org/model", root=str(tmp_path))
+    assert (cache.dim, cache.dtype) == (2, np.float16)
+    assert cache.lookup(["a"])[1] == []
+    cache.close()
+
+
+def test_evict_compacts_vector_file(tmp_path):
+    cache = EmbeddingCache("model", root=str(tmp_path))
+    cache.add(["old", "new"], [[1, 1], [2, 2]])
+    cache.conn.execute("UPDATE entries SET last_used=? WHERE key=?",
+                       (time.time() - 40 * 86400, chunk_key("model", "old")))
+    cache.conn.commit()
+
+    assert cache.evict(older_than_days=30) == 1
+    assert os.path.getsize(cache.vectors_path) == 2 * 2
+    vectors, missing = cache.lookup(["new", "old"])
+    assert missing == [1]
+    np.testing.assert_array_equal(vectors[0], [2, 2])
+    cache.close()
+
+
+def test_evict_keeps_what_the_latest_build_used(tmp_path):
+    cache = EmbeddingCache("model", root=str(tmp_path))
+    cache.add(["dropped", "fee", "hostel"], [[1, 1], [2, 2], [3, 3]])
+
+    # recently used, yet gone from the index
+    assert cache.evict(keep=["hostel", " fee "]) == 1
+    assert len(cache) == 2
+    vectors, missing = cache.lookup(["hostel", "fee", "dropped"])
+    assert missing == [2]
+    np.testing.assert_array_equal(vectors[:2], [[3, 3], [2, 2]])
+    assert cache.evict(keep=["fee", "hostel"]) == 0
+    cache.close()
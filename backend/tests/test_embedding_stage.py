@@ -0,0 +1,48 @@
+# test_embedding_stage.py
+
+import numpy as np
+import pytest
+
+import embedding_stage
+from embedding_cache import EmbeddingCache
+
+
+class LengthModel:
+    """ SentenceTransformer stand-in: [len(text), batch size] per text """
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, batch_size, **kwargs):
+        self.encoded.extend(texts)
+        return np.array([[len(t), len(texts)] for t in texts], dtype=np.float64)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    model = LengthModel()
+    monkeypatch.setattr(embedding_stage, "_load_model", lambda name, threads: model)
+    return model
+
+
+def test_batches_by_length_and_restores_order(model):
+    texts = ["ccc", "a", "dddd", "bb", "eeeee"]
+    vectors = embedding_stage.embed_texts(texts, batch_size=2, workers=1)
+    assert vectors.dtype == np.float32
+    assert vectors[:, 0].tolist() == [3, 1, 4, 2, 5]
+    # shortest texts share a batch
+    assert model.encoded == ["a", "bb", "ccc", "dddd", "eeeee"]
+    assert vectors[:, 1].tolist() == [2, 2, 2, 2, 1]
+
+
+def test_cache_sends_only_new_texts_to_the_model(model, tmp_path):
+    cache = EmbeddingCache("m", root=str(tmp_path))
+    embedding_stage.embed_texts(["a", "bb"], workers=1, cache=cache)
+    vectors = embedding_stage.embed_texts(["bb", "ccc", "a"], workers=1, cache=cache)
+    assert model.encoded == ["a", "bb", "ccc"]
+    assert vectors[:, 0].tolist() == [2, 3, 1]
+    cache.close()
+
+
+def test_empty_input(model):
+    assert embedding_stage.embed_texts([]).shape == (0, 0)
@@ -0,0 +1,36 @@
+# test_html_extractor.py
+
+from html_extractor import BoilerplateFilter, extract_lines, extract_text
+
+PAGE = """<html><head><style>p {}</style></head><body>
+<nav><a href="/">Home</a></nav>
+<header>University header</header>
+<main><header>Admissions 2024</header><p>Fee   is <b>1,20,000</b></p><ul><li>CSE</li><li>ECE</li></ul></main>
+<script>alert(1)</script><footer>Copyright</footer></body></html>"""
+
+
+def test_extract_lines_keeps_main_content_blocks():
+    assert extract_lines(PAGE) == ["Admissions 2024", "Fee is 1,20,000", "CSE", "ECE"]
+    assert extract_lines("") == []
+    assert extract_lines(b'<meta charset="utf-8"><p>caf\xc3\xa9</p>') == ["café"]
+
+
+def test_boilerplate_is_learned_per_host(tmp_path):
+    bp = BoilerplateFilter(min_pages=3, min_ratio=0.5)
+    for i in range(3):
+        bp.observe("puchd.ac.in", ["Notice ticker", f"page {i}"])
+    assert bp.filter("puchd.ac.in", ["Notice ticker", "new page"]) == ["new page"]
+    assert bp.filter("uiet.puchd.ac.in", ["Notice ticker"]) == ["Notice ticker"]
+
+    path = str(tmp_path / "boilerplate.json")
+    bp.save(path)
+    loaded = BoilerplateFilter(path, min_pages=3, min_ratio=0.5)
+    assert loaded.is_boilerplate("puchd.ac.in", "notice TICKER")
+    assert not loaded.is_boilerplate("puchd.ac.in", "page 1")
+
+
+def test_extract_text_applies_filter_and_min_chars():
+    bp = BoilerplateFilter(min_pages=1, min_ratio=0.5)
+    bp.observe("puchd.ac.in", ["CSE"])
+    text = extract_text(PAGE, "https://puchd.ac.in/fees", boilerplate=bp, min_chars=3, learn=False)
+    assert text == "Admissions 2024\nFee is 1,20,000"
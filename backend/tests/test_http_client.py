@@ -0,0 +1,88 @@
+# test_http_client.py
+
+import io
+import os
+import time
+
+import pytest
+import requests
+
+import http_client
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_client, "CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def response(url, body, **headers):
+    r = requests.models.Response()
+    r.status_code = 200
+    r.url = url
+    r.headers = requests.structures.CaseInsensitiveDict(headers)
+    r._content = body
+    return r
+
+
+def test_freshness_lifetime():
+    assert http_client._freshness_lifetime({"Cache-Control": "public, max-age=60"}) == 60
+    assert http_client._freshness_lifetime({"Cache-Control": "no-cache, max-age=60"}) == 0
+    assert http_client._freshness_lifetime({
+        "Date": "Mon, 01 Jan 2024 00:00:00 GMT", "Expires": "Mon, 01 Jan 2024 01:00:00 GMT"}) == 3600
+    assert http_client._freshness_lifetime({}) == 0
+
+
+def test_fresh_entry_is_served_without_network(monkeypatch):
+    url = "https://puchd.ac.in/a"
+    http_client._store(url, response(url, b"<p>hi</p>", **{"Cache-Control": "max-age=600"}), b"<p>hi</p>")
+    monkeypatch.setattr(http_client, "get_session", lambda: pytest.fail("network used"))
+
+    cached = http_client.fetch(url)
+    assert cached.from_cache and cached.content == b"<p>hi</p>"
+    with open(http_client.cached_body_path(url), "rb") as f:
+        assert f.read() == b"<p>hi</p>"
+    assert http_client.cached_body_path("https://puchd.ac.in/missing") is None
+
+
+def test_cached_headers_are_case_insensitive(monkeypatch):
+    url = "https://puchd.ac.in/b"
+    http_client._store(url, response(url, b"x" * 100, **{"ETag": '"v1"', "cache-control": "no-cache"}), b"x" * 100)
+    meta, _ = http_client._load_cached(url)
+    assert set(meta["headers"]) == {"etag", "cache-control"}
+
+    class Session:
+        def get(self, url, headers, **kwargs):
+            assert headers["If-None-Match"] == '"v1"'
+            not_modified = response(url, b"", ETAG='"v2"', **{"Cache-Control": "max-age=600"})
+            not_modified.status_code = 304
+            not_modified.raw = io.BytesIO()
+            return not_modified
+
+    monkeypatch.setattr(http_client, "get_session", Session)
+    assert http_client.fetch(url).from_cache
+    meta, _ = http_client._load_cached(url)
+    assert dict(meta["headers"]) == {"etag": '"v2"', "cache-control": "max-age=600"}
+
+    # fresh now, yet the size limit still applies to the cached body
+    with pytest.raises(http_client.ResponseTooLarge):
+        http_client.fetch(url, max_bytes=50)
+    assert http_client.fetch(url, max_bytes=100).content == b"x" * 100
+
+
+def test_prune_drops_old_then_least_recently_used(cache_dir):
+    now = time.time()
+    for i, age in enumerate((40 * 86400, 300, 200, 100)):
+        url = f"https://puchd.ac.in/{i}"
+        http_client._store(url, response(url, b"x" * 100), b"x" * 100)
+        os.utime(http_client._cache_paths(url)[1], (now - age, now - age))
+    stale_tmp = cache_dir / "ab"
+    stale_tmp.mkdir(exist_ok=True)
+    (stale_tmp / "crashed.tmp").write_bytes(b"partial")
+    os.utime(stale_tmp / "crashed.tmp", (now - 7200, now - 7200))
+
+    removed, total = http_client.prune_cache(max_bytes=250, max_age=30 * 86400)
+    assert (removed, total) == (2, 200)
+    kept = [i for i in range(4) if http_client.cached_body_path(f"https://puchd.ac.in/{i}")]
+    assert kept == [2, 3]
+    assert not (stale_tmp / "crashed.tmp").exists()
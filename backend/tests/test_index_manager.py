@@ -0,0 +1,91 @@
+# test_index_manager.py
+
+import os
+import types
+
+import pytest
+
+from index_manager import IndexManager, admin_allowed, list_versions, publish_version, read_active, write_active
+
+
+class FakeIndex:
+    def __init__(self, path):
+        self.path = path
+
+    def as_retriever(self, similarity_top_k):
+        return types.SimpleNamespace(retrieve=lambda query: [])
+
+
+def build(tmp_path, name):
+    for sub in ("chroma_db", "index"):
+        os.makedirs(tmp_path / name / sub)
+        (tmp_path / name / sub / "data").write_text(name)
+    return str(tmp_path / name / "chroma_db"), str(tmp_path / name / "index")
+
+
+def test_only_complete_versions_are_listed(tmp_path):
+    root = str(tmp_path / "indexes")
+    first = publish_version(*build(tmp_path, "a"), root=root)
+    second = publish_version(*build(tmp_path, "b"), root=root, activate=True)
+    os.makedirs(os.path.join(root, "v99999999-half-copied"))
+    assert list_versions(root) == [first, second]
+    assert first != second
+    assert read_active(root) == second
+
+    write_active(first, root)
+    assert read_active(root) == first
+    write_active("gone", root)
+    assert read_active(root) == second
+
+
+def test_swap_and_rollback(tmp_path):
+    root = str(tmp_path / "indexes")
+    first = publish_version(*build(tmp_path, "a"), root=root, activate=True)
+    second = publish_version(*build(tmp_path, "b"), root=root)
+    manager = IndexManager(FakeIndex, root=root)
+    assert manager.start().version == first
+
+    manager.swap(wait=True)
+    assert manager.current.version == second
+    assert manager.current.index.path == os.path.join(root, second)
+    assert read_active(root) == second
+
+    assert manager.rollback() == first
+    assert read_active(root) == first
+    assert manager.status()["previous"] == second
+
+
+def test_failed_swap_keeps_serving(tmp_path):
+    root = str(tmp_path / "indexes")
+    publish_version(*build(tmp_path, "a"), root=root, activate=True)
+    broken = publish_version(*build(tmp_path, "b"), root=root)
+
+    def load(path):
+        if path.endswith(broken):
+            raise OSError("corrupt")
+        return FakeIndex(path)
+
+    manager = IndexManager(load, root=root)
+    serving = manager.start().version
+    manager.swap(broken, wait=True)
+    assert manager.current.version == serving
+    assert "corrupt" in manager.status()["last_error"]
+    with pytest.raises(ValueError):
+        manager.swap("v-unknown")
+
+
+def test_legacy_layout_before_first_publish(tmp_path):
+    manager = IndexManager(FakeIndex, root=str(tmp_path / "indexes"), legacy_dir=str(tmp_path))
+    assert manager.start().version == "legacy"
+    assert manager.current.index.path == str(tmp_path)
+
+
+def test_admin_routes_need_a_token(monkeypatch):
+    local = types.SimpleNamespace(remote_addr="127.0.0.1", headers={})
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert not admin_allowed(local)
+
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+    assert not admin_allowed(local)
+    assert not admin_allowed(types.SimpleNamespace(remote_addr="::1", headers={"X-Admin-Token": "wrong"}))
+    assert admin_allowed(types.SimpleNamespace(remote_addr="10.0.0.7", headers={"X-Admin-Token": "s3cret"}))
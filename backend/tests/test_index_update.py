@@ -0,0 +1,92 @@
+# test_index_update.py
+
+import types
+import uuid
+
+import pytest
+
+pytest.importorskip("llama_index.embeddings.huggingface")
+import chromadb  # noqa: E402
+from llama_index.core.storage.docstore import SimpleDocumentStore  # noqa: E402
+
+from corpus_store import CorpusStore  # noqa: E402
+from db_creation import open_dedup_store  # noqa: E402
+from index_update import delete_document, read_delta, record_aliases, seed_dedup  # noqa: E402
+
+TEXT = " ".join(f"word{i}" for i in range(120))
+PDF = "https://puchd.ac.in/fees.pdf"
+
+
+@pytest.fixture
+def collection():
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection(f"test-{uuid.uuid4().hex}", embedding_function=None)
+    collection.add(
+        ids=["p1::text_0", "p2::text_0", "page::text_0"],
+        embeddings=[[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]],
+        documents=[TEXT, "second page", "a web page"],
+        metadatas=[
+            {"source_url": PDF, "source_id": f"{PDF}#page=1", "page_number": 1, "chunk_id": "text_0",
+             "ref_doc_id": "p1", "aliases": "https://puchd.ac.in/copy.pdf"},
+            {"source_url": PDF, "source_id": f"{PDF}#page=2", "page_number": 2, "chunk_id": "text_0",
+             "ref_doc_id": "p2"},
+            {"source_url": "https://puchd.ac.in/page", "source_id": "https://puchd.ac.in/page",
+             "page_number": 0, "chunk_id": "text_0", "ref_doc_id": "page"},
+        ],
+    )
+    return collection
+
+
+def test_read_delta(tmp_path):
+    csv_file = tmp_path / "delta.csv"
+    csv_file.write_text("URL,Text,Change\nhttps://puchd.ac.in/a,x,new\nhttps://puchd.ac.in/b,,deleted\n")
+    assert read_delta(str(csv_file)) == {"https://puchd.ac.in/a": "new", "https://puchd.ac.in/b": "deleted"}
+    txt_file = tmp_path / "delta.txt"
+    txt_file.write_text("https://puchd.ac.in/a\n\n")
+    assert read_delta(str(txt_file)) == {"https://puchd.ac.in/a": "changed"}
+
+
+def test_delete_document_by_url_or_page_id(collection):
+    index = types.SimpleNamespace(docstore=SimpleDocumentStore())
+    ids, aliases = delete_document(collection, index, f"{PDF}#page=2")
+    assert (ids, aliases) == (["p2::text_0"], [])
+
+    ids, aliases = delete_document(collection, index, PDF)
+    assert (ids, aliases) == (["p1::text_0"], ["https://puchd.ac.in/copy.pdf"])
+    assert collection.get()["ids"] == ["page::text_0"]
+    assert delete_document(collection, index, PDF) == ([], [])
+
+
+def test_seeded_dedup_folds_updates_into_indexed_pages(tmp_path, collection):
+    store = CorpusStore(str(tmp_path / "corpus"))
+    store.append([
+        {"url": PDF, "source_type": "pdf", "page_number": 1, "text": TEXT, "filename": "fees.pdf"},
+        {"url": "https://puchd.ac.in/new.pdf", "source_type": "pdf", "page_number": 1, "text": TEXT},
+    ])
+    conn, page_index, chunk_index = open_dedup_store(str(tmp_path))
+    seed_dedup(collection, store, page_index, chunk_index)
+    store.close()
+    # only indexed pages are seeded: new.pdf is in the corpus but not in the collection
+    assert len(page_index) == 1
+
+    # the updated page is a copy of an indexed one, exactly as a full rebuild would see it
+    assert page_index.add("https://puchd.ac.in/new.pdf#page=1", TEXT) == f"{PDF}#page=1"
+    assert page_index.stats["seen"] == 1
+
+    record_aliases(collection, page_index, chunk_index)
+    meta = collection.get(ids=["p1::text_0"])["metadatas"][0]
+    assert meta["aliases"] == "https://puchd.ac.in/copy.pdf | https://puchd.ac.in/new.pdf"
+
+
+def test_stored_signatures_outlive_the_update(tmp_path, collection):
+    conn, page_index, chunk_index = open_dedup_store(str(tmp_path))
+    seed_dedup(collection, CorpusStore(str(tmp_path / "corpus")), page_index, chunk_index)
+    conn.commit()
+    conn.close()
+
+    # the next update finds indexed chunks without reading the collection again
+    conn, page_index, chunk_index = open_dedup_store(str(tmp_path))
+    assert len(chunk_index) == 3
+    assert chunk_index.add((f"{PDF}#page=9", "text_0"), TEXT + " footer") == (f"{PDF}#page=1", "text_0")
+    chunk_index.forget(PDF)
+    assert chunk_index.add((f"{PDF}#page=9", "text_0"), TEXT + " footer") is None
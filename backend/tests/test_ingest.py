@@ -0,0 +1,101 @@
+# test_ingest.py
+
+import json
+import os
+import types
+
+import pandas as pd
+import pytest
+
+import ingest
+
+calls = []
+
+
+def stage_source(inputs, out, cfg):
+    calls.append("source")
+    with open(os.path.join(out, "data.txt"), "w") as f:
+        f.write(cfg.seed)
+
+
+def stage_upper(inputs, out, cfg):
+    calls.append("upper")
+    with open(os.path.join(inputs["source"], "data.txt")) as f, open(os.path.join(out, "data.txt"), "w") as g:
+        g.write(f.read().upper())
+
+
+@pytest.fixture
+def cfg(tmp_path, monkeypatch):
+    calls.clear()
+    monkeypatch.setattr(ingest, "STAGES", {
+        "source": (stage_source, [], ["seed"]),
+        "upper": (stage_upper, ["source"], []),
+    })
+    return types.SimpleNamespace(work_dir=str(tmp_path), parallel=2, seed="puchd")
+
+
+def test_unchanged_stages_are_cached(cfg):
+    ingest.Pipeline(cfg).run(["source", "upper"], set())
+    assert calls == ["source", "upper"]
+
+    pipeline = ingest.Pipeline(cfg)
+    pipeline.run(["source", "upper"], set())
+    assert calls == ["source", "upper"]
+    assert pipeline.timings["upper"][0] == "cached"
+    with open(os.path.join(pipeline.manifest["upper"]["dir"], "data.txt")) as f:
+        assert f.read() == "PUCHD"
+
+
+def test_config_change_reruns_the_stage_and_its_dependents(cfg):
+    ingest.Pipeline(cfg).run(["source", "upper"], set())
+    cfg.seed = "uiet"
+    ingest.Pipeline(cfg).run(["source", "upper"], set())
+    assert calls == ["source", "upper", "source", "upper"]
+
+
+def test_identical_output_keeps_dependents_cached(cfg):
+    ingest.Pipeline(cfg).run(["source", "upper"], set())
+    # forced, but it writes the same bytes, so "upper" sees the same input digest
+    ingest.Pipeline(cfg).run(["source", "upper"], {"source"})
+    assert calls == ["source", "upper", "source"]
+
+
+def test_missing_dependency_is_an_error(cfg):
+    with pytest.raises(SystemExit):
+        ingest.Pipeline(cfg).run(["upper"], set())
+
+
+def test_expand_and_downstream():
+    assert ingest.expand(["extract", "clean"]) == ["extract-sites", "extract-pdfs", "clean"]
+    assert ingest.downstream(["chunk"]) == {"chunk", "embed", "index"}
+    with pytest.raises(SystemExit):
+        ingest.expand(["nope"])
+
+
+def test_digest_dir_ignores_done_marker(tmp_path):
+    (tmp_path / "a.txt").write_text("x")
+    digest = ingest.digest_dir(str(tmp_path))
+    (tmp_path / ".done").write_text(digest)
+    assert ingest.digest_dir(str(tmp_path)) == digest
+    (tmp_path / "a.txt").write_text("y")
+    assert ingest.digest_dir(str(tmp_path)) != digest
+
+
+def test_stage_dedupe_keys_pages_by_url(tmp_path):
+    pytest.importorskip("llama_index.embeddings.huggingface")
+    text = " ".join(f"word{i}" for i in range(100))
+    table = json.dumps([[["Course", "Fee"], ["CSE", "1"]]])
+    (tmp_path / "clean").mkdir()
+    (tmp_path / "out").mkdir()
+    pd.DataFrame({
+        "url": ["https://a.puchd.ac.in/f.pdf", "https://b.puchd.ac.in/f.pdf", "https://c.puchd.ac.in/f.pdf"],
+        "pdf_file": ["f.pdf", "f.pdf", "f.pdf"],
+        "page_number": [1, 1, 1],
+        "text": [text, text, ""],
+        "tables": ["[]", "[]", table],
+    }).to_parquet(tmp_path / "clean" / "pages.parquet")
+
+    ingest.stage_dedupe({"clean": str(tmp_path / "clean")}, str(tmp_path / "out"),
+                        types.SimpleNamespace(dedup_threshold=0.85))
+    kept = pd.read_parquet(tmp_path / "out" / "pages.parquet")
+    assert kept["url"].tolist() == ["https://a.puchd.ac.in/f.pdf", "https://c.puchd.ac.in/f.pdf"]
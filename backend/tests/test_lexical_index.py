@@ -0,0 +1,81 @@
+# test_lexical_index.py
+
+import uuid
+
+import chromadb
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+from llama_index.core.vector_stores.types import MetadataFilter, MetadataFilters
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
+
+from lexical_index import (HybridRetriever, LexicalIndex, build_from_collection, build_lexical_index,
+                           reciprocal_rank_fusion, tokenize, update_lexical_index)
+
+
+def node(node_id, text):
+    return TextNode(id_=node_id, text=text, metadata={"source_url": f"https://puchd.ac.in/{node_id}"})
+
+
+def search_ids(path, query):
+    return [hit.node_id for hit, _ in LexicalIndex(path).search(query)]
+
+
+def test_tokenize_keeps_compounds_and_parts():
+    assert tokenize("B.Tech CSE-AI fee") == ["btech", "b", "tech", "cseai", "cse", "ai", "fee"]
+
+
+def test_search_ranks_matching_chunks(tmp_path):
+    path = str(tmp_path / "lexical.sqlite")
+    build_lexical_index(path, [node("fees", "B.Tech fee is 1,20,000"), node("hostel", "Hostel rules")])
+    assert search_ids(path, "btech fee") == ["fees"]
+    hit, _ = LexicalIndex(path).search("hostel")[0]
+    assert hit.metadata["source_url"] == "https://puchd.ac.in/hostel"
+    assert LexicalIndex(path).search("!!") == []
+
+
+def test_update_replaces_and_drops_chunks(tmp_path):
+    path = str(tmp_path / "lexical.sqlite")
+    build_lexical_index(path, [node("fees", "old fee 90,000"), node("gone", "retired notice")])
+
+    # a changed page keeps its chunk ids, a deleted one is only removed
+    update_lexical_index(path, ["fees", "gone"], [node("fees", "new fee 1,20,000")])
+    assert search_ids(path, "fee") == ["fees"]
+    assert search_ids(path, "old") == []
+    assert search_ids(path, "retired") == []
+    assert search_ids(path, "new") == ["fees"]
+
+
+def test_build_from_collection_covers_every_source_type(tmp_path):
+    # db_creation fills one collection in a pdf run and a site run; BM25 must see both
+    collection = chromadb.EphemeralClient().create_collection(f"test-{uuid.uuid4().hex}", embedding_function=None)
+    nodes = [node("fees", "B.Tech fee 1,20,000"), node("hostel", "Hostel rules")]
+    collection.add(ids=[n.node_id for n in nodes], embeddings=[[1.0, 0.0], [0.0, 1.0]],
+                   documents=[n.text for n in nodes],
+                   metadatas=[node_to_metadata_dict(n, remove_text=True, flat_metadata=False) for n in nodes])
+    path = str(tmp_path / "lexical.sqlite")
+    assert build_from_collection(path, collection) == 2
+    assert search_ids(path, "fee") == ["fees"]
+    assert search_ids(path, "hostel") == ["hostel"]
+
+
+def test_filters_apply_to_bm25_hits(tmp_path):
+    path = str(tmp_path / "lexical.sqlite")
+    build_lexical_index(path, [node("uiet", "B.Tech fee fee fee"), node("uibs", "MBA fee")])
+    only_uibs = MetadataFilters(filters=[MetadataFilter(key="source_url", value="https://puchd.ac.in/uibs")])
+    assert [hit.node_id for hit, _ in LexicalIndex(path).search("fee", k=1, filters=only_uibs)] == ["uibs"]
+
+    class VectorRetriever:
+        def retrieve(self, query_bundle):
+            return [NodeWithScore(node=node("uibs", "MBA fee"), score=0.9)]
+
+    retriever = HybridRetriever(VectorRetriever(), LexicalIndex(path), similarity_top_k=3, filters=only_uibs)
+    assert [hit.node.node_id for hit in retriever.retrieve(QueryBundle("fee"))] == ["uibs"]
+
+
+def test_reciprocal_rank_fusion():
+    a, b, c = node("a", "a"), node("b", "b"), node("c", "c")
+    fused = reciprocal_rank_fusion([
+        [NodeWithScore(node=a, score=0.9), NodeWithScore(node=b, score=0.8)],
+        [NodeWithScore(node=b, score=12.0), NodeWithScore(node=c, score=3.0)],
+    ])
+    assert [hit.node.node_id for hit in fused] == ["b", "a", "c"]
+    assert fused[0].score == 1 / 62 + 1 / 61
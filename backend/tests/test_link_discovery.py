@@ -0,0 +1,30 @@
+# test_link_discovery.py
+
+from link_discovery import DiscoveryStats, needs_browser, parse_anchors
+
+ARTICLE = "<p>" + "Panjab University admissions and fee notices. " * 10 + "</p>"
+
+
+def test_parse_anchors_skips_scripts():
+    anchors, text_chars = parse_anchors(
+        '<a href="/fees">Fee <b>structure</b></a><script>var a = "<a href=x>";</script><a href="#">x</a>')
+    assert anchors == [("/fees", "Fee structure"), ("#", "x")]
+    assert text_chars == len("Fee") + len("structure") + len("x")
+
+
+def test_needs_browser():
+    page = '<a href="/a">a</a>' + ARTICLE
+    assert not needs_browser("https://puchd.ac.in/", page, *parse_anchors(page))
+    assert needs_browser("https://admissions.puchd.ac.in/", page, *parse_anchors(page))
+    assert needs_browser("https://puchd.ac.in/", "  ", [], 0)
+    shell = '<div id="root"></div><script src="app.js"></script>'
+    assert needs_browser("https://puchd.ac.in/", shell, *parse_anchors(shell))
+    # a text page without links is just a leaf, not a JS page
+    assert not needs_browser("https://puchd.ac.in/", ARTICLE, *parse_anchors(ARTICLE))
+
+
+def test_stats_are_per_instance():
+    first, second = DiscoveryStats(), DiscoveryStats()
+    first.http, first.browser, first.failed = 3, 1, 0
+    assert first.summary() == "4 pages: 3 via HTTP, 1 via browser (25.0%), 0 failed"
+    assert second.summary() == "0 pages: 0 via HTTP, 0 via browser (0.0%), 0 failed"
@@ -0,0 +1,130 @@
+# test_llm_steps.py
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from llm_steps import AnswerStream, arun_steps, astream_steps, run_steps, sse, stream_steps
+
+
+def answer(cached=None):
+    """ Answer generator shaped like answer_steps: cache hit, or one prompt and a reply """
+    if cached:
+        return {"reply": cached}
+    try:
+        reply = yield "PROMPT"
+    except Exception as e:
+        return {"reply": f"⚠️ {e}"}
+    return {"reply": reply.upper()}
+
+
+def twice():
+    yield "one"
+    yield "two"
+
+
+def test_run_steps():
+    assert run_steps(answer(), lambda prompt: f"reply to {prompt}") == {"reply": "REPLY TO PROMPT"}
+    # a generator that returns early never reaches the LLM
+    assert run_steps(answer("cached"), lambda prompt: pytest.fail("LLM called")) == {"reply": "cached"}
+
+
+def test_llm_errors_are_thrown_into_the_generator():
+    def failing(prompt):
+        raise TimeoutError("groq timed out")
+    assert run_steps(answer(), failing) == {"reply": "⚠️ groq timed out"}
+
+
+def test_more_than_one_prompt_is_an_error():
+    with pytest.raises(RuntimeError):
+        run_steps(twice(), str)
+
+
+def test_arun_steps():
+    async def complete(prompt):
+        return f"async {prompt}"
+
+    async def failing(prompt):
+        raise ConnectionError("down")
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        assert asyncio.run(arun_steps(answer(), complete, pool)) == {"reply": "ASYNC PROMPT"}
+        assert asyncio.run(arun_steps(answer(), failing, pool)) == {"reply": "⚠️ down"}
+        assert asyncio.run(arun_steps(answer("hit"), complete, pool)) == {"reply": "hit"}
+
+
+# ---------------------------
+# STREAMING
+# ---------------------------
+def parse(events):
+    parsed = []
+    for event in events:
+        name, data = event.strip().split("\n")
+        parsed.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return parsed
+
+
+def shown(view, pieces):
+    return [event for piece in pieces for event in parse(view.feed(piece))]
+
+
+def test_sse_format():
+    assert sse("token", {"text": "hi"}) == 'event: token\ndata: {"text": "hi"}\n\n'
+
+
+def test_follow_up_block_is_held_back():
+    view = AnswerStream(["know more about"])
+    events = shown(view, ["The fee is 1,20,000.", "\nKnow", " more about:\n- Hostel"])
+    assert events == [("token", {"text": "The fee is 1,20,000."})]
+
+
+def test_unfinished_links_and_urls_wait():
+    view = AnswerStream(["know more about"])
+    assert shown(view, ["See [fees](https://puchd", ".ac.in/fees)"]) == [
+        ("token", {"text": "See"}),
+        ("token", {"text": " [fees](https://puchd.ac.in/fees)"}),
+    ]
+    view = AnswerStream(["know more about"])
+    assert shown(view, ["Visit https://puchd", ".ac.in now"]) == [
+        ("token", {"text": "Visit"}),
+        ("token", {"text": " https://puchd.ac.in now"}),
+    ]
+
+
+def test_cleaning_that_rewrites_sent_text_replaces_it():
+    view = AnswerStream(["know more about"], clean=lambda text: text.replace("**", "").strip())
+    assert shown(view, ["Fee *", "*CSE**"]) == [
+        ("token", {"text": "Fee *"}),
+        ("replace", {"text": "Fee CSE"}),
+    ]
+
+
+def test_stream_steps():
+    events = parse(stream_steps(answer(), lambda prompt: iter(["ok ", "done"]), AnswerStream(["know more about"])))
+    assert events == [("token", {"text": "ok"}), ("token", {"text": " done"}), ("done", {"reply": "OK DONE"})]
+
+    # a cache hit is a single "done" event
+    assert parse(stream_steps(answer("hit"), None, AnswerStream(["x"]))) == [("done", {"reply": "hit"})]
+
+
+def test_stream_errors_end_in_the_error_reply():
+    def broken(prompt):
+        yield "partial"
+        raise ConnectionError("stream cut")
+    events = parse(stream_steps(answer(), broken, AnswerStream(["know more about"])))
+    assert events[-1] == ("done", {"reply": "⚠️ stream cut"})
+
+
+def test_astream_steps():
+    async def astream(prompt):
+        for piece in ("a", "b"):
+            yield piece
+
+    async def collect():
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return [event async for event in astream_steps(answer(), astream, AnswerStream(["x"]), pool)]
+
+    assert parse(asyncio.run(collect())) == [("token", {"text": "a"}), ("token", {"text": "b"}),
+                                             ("done", {"reply": "AB"})]
@@ -0,0 +1,68 @@
+# test_numpy_store.py
+
+import numpy as np
+import pytest
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import FilterOperator, MetadataFilter, MetadataFilters, VectorStoreQuery
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
+
+import numpy_store
+from numpy_store import NumpyVectorStore, build_numpy_index
+
+
+def build(tmp_path, vectors, dtype="float32", revision=None):
+    ids = [f"n{i}" for i in range(len(vectors))]
+    metadatas = [node_to_metadata_dict(TextNode(id_=node_id, metadata={"row": i}), remove_text=True,
+                                       flat_metadata=False) for i, node_id in enumerate(ids)]
+    build_numpy_index(str(tmp_path), ids, vectors, [f"text {i}" for i in ids], metadatas, dtype, revision)
+    return NumpyVectorStore(str(tmp_path))
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_exact_top_k_across_blocks(tmp_path, monkeypatch, dtype):
+    monkeypatch.setattr(numpy_store, "BLOCK_ROWS", 7)
+    vectors = np.random.default_rng(0).normal(size=(50, 16)).astype(np.float32)
+    store = build(tmp_path, vectors, dtype)
+    queries = vectors[[3, 40]]
+
+    rows, scores = store.search_batch(queries, 5)
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normed @ normed[[3, 40]].T), axis=0)[:5].T
+    np.testing.assert_array_equal(rows, expected)
+    assert rows.shape == scores.shape == (2, 5)
+    assert np.all(np.diff(scores, axis=1) <= 0)
+
+
+def test_ties_break_by_row(tmp_path):
+    store = build(tmp_path, np.array([[1, 0], [0, 1], [1, 0], [1, 0]], dtype=np.float32))
+    rows, _ = store.search_batch([1, 0], 3)
+    assert rows[0].tolist() == [0, 2, 3]
+
+
+def test_query_and_empty_index(tmp_path):
+    store = build(tmp_path / "full", np.eye(4, dtype=np.float32))
+    result = store.query(VectorStoreQuery(query_embedding=[0, 0, 1, 0], similarity_top_k=1))
+    assert result.ids == ["n2"]
+    assert result.nodes[0].get_content() == "text n2"
+    assert result.nodes[0].metadata["row"] == 2
+    assert len(store) == 4
+
+    rows, scores = store.search_batch([1, 0, 0, 0], 0)
+    assert rows.shape == (1, 0)
+
+
+def test_filtered_query_across_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(numpy_store, "BLOCK_ROWS", 4)
+    vectors = np.random.default_rng(0).normal(size=(20, 8)).astype(np.float32)
+    store = build(tmp_path, vectors)
+    filters = MetadataFilters(filters=[MetadataFilter(key="row", value=15, operator=FilterOperator.GTE)])
+    result = store.query(VectorStoreQuery(query_embedding=vectors[2].tolist(), similarity_top_k=10, filters=filters))
+    assert sorted(result.ids) == ["n15", "n16", "n17", "n18", "n19"]
+    assert all(np.isfinite(result.similarities))
+
+
+def test_copy_of_an_older_revision_refuses_to_load(tmp_path):
+    build(tmp_path, np.eye(3, dtype=np.float32), revision="r1")
+    assert len(NumpyVectorStore(str(tmp_path), revision="r1")) == 3
+    with pytest.raises(ValueError):
+        NumpyVectorStore(str(tmp_path), revision="r2")
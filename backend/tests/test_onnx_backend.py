@@ -0,0 +1,84 @@
+# test_onnx_backend.py
+
+import json
+import os
+
+import numpy as np
+from tokenizers import Tokenizer
+from tokenizers.models import WordLevel
+from tokenizers.pre_tokenizers import Whitespace
+from tokenizers.processors import TemplateProcessing
+
+import onnx_backend
+from onnx_backend import BGE_QUERY_INSTRUCTION, OnnxEmbedding, OnnxModel, default_threads, model_dir
+
+
+class RecordingEncoder:
+    """ OnnxEncoder stand-in that records what it was asked to encode """
+
+    def __init__(self, path, quantized=True, threads=None):
+        self.texts = []
+
+    def encode(self, texts, batch_size=32):
+        self.texts.extend(texts)
+        return np.ones((len(texts), 2), dtype=np.float32)
+
+
+def test_model_dir_does_not_depend_on_cwd(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert os.path.isabs(model_dir("bge-small"))
+    assert os.path.dirname(onnx_backend.DEFAULT_ONNX_DIR) == os.path.dirname(os.path.abspath(onnx_backend.__file__))
+
+
+def test_default_threads_share_the_cores(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    monkeypatch.delenv("ONNX_THREADS", raising=False)
+    monkeypatch.setenv("INFERENCE_THREADS", "2")
+    assert default_threads() == 4
+    monkeypatch.setenv("INFERENCE_THREADS", "16")
+    assert default_threads() == 1
+    monkeypatch.setenv("ONNX_THREADS", "3")
+    assert default_threads() == 3
+
+
+def test_queries_get_the_model_instruction(monkeypatch):
+    monkeypatch.setattr(onnx_backend, "OnnxEncoder", RecordingEncoder)
+    bge = OnnxEmbedding(model_dir("bge-small"))
+    bge.get_query_embedding("fee for CSE")
+    bge.get_text_embedding("Fee structure")
+    assert bge._encoder.texts == [BGE_QUERY_INSTRUCTION + "fee for CSE", "Fee structure"]
+
+    minilm = OnnxEmbedding(model_dir("minilm"))
+    minilm.get_query_embedding("fee for CSE")
+    assert minilm._encoder.texts == ["fee for CSE"]
+
+    custom = OnnxEmbedding(model_dir("bge-small"), query_instruction="")
+    custom.get_query_embedding("fee")
+    assert custom._encoder.texts == ["fee"]
+
+
+def test_model_tokenizes_with_tokenizers_alone(tmp_path, monkeypatch):
+    vocab = {"[PAD]": 0, "[CLS]": 1, "[SEP]": 2, "fee": 3, "for": 4, "cse": 5, "hostel": 6}
+    tokenizer = Tokenizer(WordLevel(vocab, unk_token="[PAD]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    tokenizer.post_processor = TemplateProcessing(single="[CLS] $A [SEP]", pair="[CLS] $A [SEP] $B:1 [SEP]:1",
+                                                  special_tokens=[("[CLS]", 1), ("[SEP]", 2)])
+    tokenizer.save(str(tmp_path / "tokenizer.json"))
+    (tmp_path / "onnx_config.json").write_text(json.dumps(
+        {"inputs": ["input_ids", "attention_mask", "token_type_ids"], "output": "logits"}))
+
+    class Session:
+        def run(self, outputs, feeds):
+            self.feeds = feeds
+            return [np.zeros((len(feeds["input_ids"]), 1))]
+
+    monkeypatch.setattr(onnx_backend, "make_session", lambda path, threads: Session())
+    model = OnnxModel(str(tmp_path), max_length=5)
+    model.run(["fee for cse", "hostel"], ["hostel", "fee"])
+    feeds = model.session.feeds
+    # pairs are truncated longest-first to max_length, keeping their special tokens
+    np.testing.assert_array_equal(feeds["input_ids"], [[1, 3, 2, 6, 2], [1, 6, 2, 3, 2]])
+    np.testing.assert_array_equal(feeds["token_type_ids"], [[0, 0, 0, 1, 1], [0, 0, 0, 1, 1]])
+    # single texts are padded to the longest in the batch
+    _, mask = model.run(["fee for cse", "hostel"])
+    np.testing.assert_array_equal(mask, [[1, 1, 1, 1, 1], [1, 1, 1, 0, 0]])
@@ -0,0 +1,64 @@
+# test_rerank.py
+
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from rerank import RerankStage, query_key
+
+
+class LengthModel:
+    """ Cross-encoder stand-in: longer passages score higher """
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32):
+        self.calls.append(len(pairs))
+        return [len(passage) for _, passage in pairs]
+
+
+def hits(*texts):
+    return [NodeWithScore(node=TextNode(id_=f"n{i}", text=text), score=1.0 - i / 10) for i, text in enumerate(texts)]
+
+
+def ids(result):
+    return [hit.node.node_id for hit in result]
+
+
+def test_query_key_normalizes_case_and_spaces():
+    assert query_key("Fee  for CSE") == query_key("fee for cse ")
+
+
+def test_rerank_orders_by_cross_encoder_score():
+    stage = RerankStage(LengthModel(), top_n=2)
+    result = stage.rerank("q", hits("a", "ccc", "bb"))
+    assert ids(result) == ["n1", "n2"]
+    assert [hit.score for hit in result] == [3.0, 2.0]
+
+
+def test_scores_are_cached_per_query_and_node():
+    model = LengthModel()
+    stage = RerankStage(model, top_n=3)
+    stage.rerank("q", hits("a", "bb"))
+    stage.rerank("Q ", hits("a", "bb", "ccc"))
+    assert model.calls == [2, 1]
+    assert stage.stats == {"queries": 2, "scored": 3, "cached": 2, "dropped": 0}
+
+    stage.rerank("other", hits("a"))
+    assert model.calls == [2, 1, 1]
+
+
+def test_budget_drops_lowest_retrieved_first():
+    model = LengthModel()
+    stage = RerankStage(model, top_n=4, budget_ms=20)
+    stage.ms_per_pair = 10.0
+    result = stage.rerank("q", hits("a", "bb", "dddd", "ccc"))
+    assert model.calls == [2]
+    # unscored candidates keep retrieval order behind the scored ones
+    assert ids(result) == ["n1", "n0", "n2", "n3"]
+    assert stage.stats["dropped"] == 2
+
+
+def test_cache_is_bounded():
+    stage = RerankStage(LengthModel(), cache_size=2)
+    stage.rerank("q", hits("a", "bb", "ccc"))
+    assert len(stage._cache) == 2
@@ -0,0 +1,84 @@
+# test_retrieval.py
+
+import types
+
+from llama_index.core.schema import NodeWithScore, TextNode
+from llama_index.core.vector_stores.types import MetadataFilters
+
+from retrieval import LRU, Retrieval
+
+
+class CountingEmbedModel:
+    def __init__(self):
+        self.calls = []
+
+    def get_query_embedding(self, text):
+        self.calls.append(text)
+        return [float(len(text))]
+
+
+class FakeIndex:
+    """ as_retriever() stand-in recording what was built and what was asked """
+
+    def __init__(self, name):
+        self.name = name
+        self.queries = []
+
+    def as_retriever(self, similarity_top_k, filters=None):
+        def retrieve(bundle):
+            self.queries.append((bundle.query_str, bundle.embedding))
+            return [NodeWithScore(node=TextNode(id_=f"{self.name}-{i}", text=bundle.query_str), score=1.0 - i / 10)
+                    for i in range(similarity_top_k)]
+        return types.SimpleNamespace(retrieve=retrieve)
+
+
+def loaded(version):
+    return types.SimpleNamespace(version=version, index=FakeIndex(version))
+
+
+def test_lru():
+    lru = LRU(2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1
+    lru.put("c", 3)
+    assert lru.get("b") is None
+    lru.drop(lambda key: key != "c")
+    assert lru.report() == {"hits": 1, "misses": 1, "entries": 1, "hit_rate": 0.5}
+
+
+def test_results_and_embeddings_are_reused():
+    model = CountingEmbedModel()
+    retrieval = Retrieval(model)
+    v1 = loaded("v1")
+
+    first = retrieval.retrieve(v1, "Fee for CSE?", 2)
+    first[0].score = 99.0   # rerank overwrites scores in place
+    again = retrieval.retrieve(v1, "fee for cse", 2)
+    assert [h.node.node_id for h in again] == ["v1-0", "v1-1"]
+    assert again[0].score == 1.0
+    assert len(v1.index.queries) == 1
+
+    retrieval.retrieve(v1, "Fee  for CSE?", 3)
+    # new top_k: a fresh retrieval, but the whitespace-normalized query embedding is reused
+    assert model.calls == ["Fee for CSE?"]
+    assert retrieval.retrievers_built == 2
+
+
+def test_filters_get_their_own_entries():
+    retrieval = Retrieval(CountingEmbedModel())
+    v1 = loaded("v1")
+    filters = MetadataFilters.from_dicts([{"key": "source", "value": "fees.pdf"}])
+    retrieval.retrieve(v1, "fee", 1)
+    retrieval.retrieve(v1, "fee", 1, filters=filters)
+    retrieval.retrieve(v1, "fee", 1, filters=filters)
+    assert len(v1.index.queries) == 2
+
+
+def test_index_swap_drops_old_results_and_retrievers():
+    retrieval = Retrieval(CountingEmbedModel())
+    retrieval.retrieve(loaded("v1"), "fee", 1)
+    v2 = loaded("v2")
+    assert [h.node.node_id for h in retrieval.retrieve(v2, "fee", 1)] == ["v2-0"]
+    assert retrieval.report()["results"]["entries"] == 1
+    assert retrieval.report()["index_version"] == "v2"
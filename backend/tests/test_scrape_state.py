@@ -0,0 +1,38 @@
+# test_scrape_state.py
+
+import text_from_sites
+from html_extractor import BoilerplateFilter
+from scrape_state import ScrapeState, text_hash
+
+
+def test_text_hash_ignores_whitespace():
+    assert text_hash("Fee  is\n 1,20,000") == text_hash("Fee is 1,20,000")
+    assert text_hash("Fee is 1,20,000") != text_hash("Fee is 1,30,000")
+
+
+def test_conditional_headers(tmp_path):
+    state = ScrapeState(str(tmp_path / "state.db"))
+    assert state.conditional_headers("https://puchd.ac.in/a") == {}
+    state.update("https://puchd.ac.in/a", '"v1"', "Mon, 01 Jan 2024 00:00:00 GMT", "h1")
+    state.update("https://puchd.ac.in/b", None, None, "h2")
+    state.commit()
+    assert state.conditional_headers("https://puchd.ac.in/a") == {
+        "If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert state.conditional_headers("https://puchd.ac.in/b") == {}
+    state.delete("https://puchd.ac.in/b")
+    assert state.urls() == {"https://puchd.ac.in/a"}
+    state.close()
+
+
+def test_page_hash_does_not_follow_the_learning_filter(monkeypatch):
+    monkeypatch.setattr(text_from_sites, "boilerplate", BoilerplateFilter(min_pages=2, min_ratio=0.7))
+    fees = "<p>Notice ticker</p><p>Fee is 1,20,000</p>"
+
+    first_text, first_hash = text_from_sites.get_visible_text(fees, "https://puchd.ac.in/fees")
+    for other in ("Hostel rules", "Exam dates"):
+        text_from_sites.get_visible_text(f"<p>Notice ticker</p><p>{other}</p>", f"https://puchd.ac.in/{other}")
+    # the ticker is now learned as boilerplate: the stripped text changed, the page did not
+    second_text, second_hash = text_from_sites.get_visible_text(fees, "https://puchd.ac.in/fees")
+    assert first_text == "Notice ticker\nFee is 1,20,000"
+    assert second_text == "Fee is 1,20,000"
+    assert first_hash == second_hash
@@ -0,0 +1,39 @@
+# test_startup.py
+
+import threading
+
+from startup import Startup
+
+
+def test_loaders_run_in_parallel_and_wait_for_each_other():
+    release = threading.Event()
+
+    def model(startup):
+        release.wait(5)
+        return "model"
+
+    def index(startup):
+        return f"index({startup.get('model')})"
+
+    warmed = []
+    startup = Startup({"model": model, "index": index}, warmup=lambda s: warmed.append(s.get("index")))
+    startup.start()
+    assert startup.state == "loading"
+    assert not startup.wait(0.05)
+    release.set()
+
+    assert startup.wait(5)
+    assert warmed == ["index(model)"]
+    assert set(startup.status()["timings"]) == {"model", "index", "warmup", "total"}
+    # start() is idempotent
+    assert startup.start().get("index") == "index(model)"
+
+
+def test_failed_loader_is_reported():
+    def broken(startup):
+        raise RuntimeError("no GROQ_API_KEY")
+
+    startup = Startup({"llm": broken})
+    assert not startup.wait(5)
+    assert startup.status()["status"] == "failed"
+    assert startup.error == "RuntimeError: no GROQ_API_KEY"
@@ -0,0 +1,70 @@
+# test_table_store.py
+
+import pandas as pd
+import pytest
+
+from table_store import TableStore, course_keys, department_acronym, format_value, normalize_year, parse_table
+
+FEE_TABLE = [
+    ["Sr. No.", "Department", "Course", "Fee (Rs.)"],
+    ["1", "University Institute of Engineering & Technology", "B.E. Computer Science", "1,20,000"],
+    ["2", None, "B.E. Electronics", "1,10,000"],
+]
+PDF = "https://puchd.ac.in/fees.pdf"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TableStore(str(tmp_path / "tables.db"))
+    yield store
+    store.close()
+
+
+def test_normalization_helpers():
+    assert normalize_year("fee for 2nd Year") == "2nd"
+    assert normalize_year("second yr") == "2nd"
+    assert department_acronym("University Institute of Engineering & Technology") == "uiet"
+    assert course_keys("B.Sc. (Hons.) in Maths") == ("bschons", "bsc", ["hons", "maths"])
+    assert format_value("fee", "Fee (Rs.)", "1,20,000") == "₹120,000"
+    assert format_value("fee", "Fee (US$)", "5000") == "US$5,000"
+    assert format_value("seats", "Seats", "60") == "60"
+
+
+def test_parse_table_fills_merged_cells():
+    kind, records = parse_table(FEE_TABLE)
+    assert kind == "fee"
+    assert [r["course"] for r in records] == ["B.E. Computer Science", "B.E. Electronics"]
+    assert records[1]["department"] == records[0]["department"]
+    assert records[1]["values"] == [("Fee (Rs.)", "1,10,000")]
+    assert parse_table([["Name", "Phone"], ["Registrar", "x"]]) == (None, [])
+
+
+def test_answer_from_rows(store):
+    assert store.add_page(PDF, 3, [FEE_TABLE], source="fees.pdf") == 2
+    result = store.answer("fee for B.E. Computer Science at UIET")
+    assert "₹120,000" in result["reply"]
+    assert "110,000" not in result["reply"]
+    assert result["sources"] == [{"file": "fees.pdf", "url": PDF, "page": 3}]
+    assert result["pdf"] == PDF
+    assert store.answer("hostel rules at UIET") is None
+
+
+def test_pages_are_replaced_and_urls_deleted(store):
+    store.add_frame(pd.DataFrame([{"url": PDF, "pdf_file": "fees.pdf", "page_number": 3, "tables": [FEE_TABLE]}]))
+    store.add_page(PDF, 3, [FEE_TABLE[:2]])
+    assert len(store) == 1
+    assert store.delete_url(PDF) == 1
+    assert len(store) == 0
+    assert store.answer("fee for B.E. Computer Science at UIET") is None
+
+
+def test_frame_replaces_pages_that_lost_their_tables(store):
+    store.add_frame(pd.DataFrame([
+        {"url": PDF, "pdf_file": "fees.pdf", "page_number": 3, "tables": [FEE_TABLE]},
+        {"url": PDF, "pdf_file": "fees.pdf", "page_number": 4, "tables": [FEE_TABLE]},
+    ]))
+    assert len(store) == 4
+
+    # the updated PDF has page 3 without tables and no page 4 at all
+    assert store.add_frame(pd.DataFrame([{"url": PDF, "pdf_file": "fees.pdf", "page_number": 3, "tables": []}])) == 0
+    assert len(store) == 0
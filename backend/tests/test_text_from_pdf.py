@@ -0,0 +1,71 @@
+# test_text_from_pdf.py
+
+import json
+import os
+
+import pytest
+import requests
+
+pytest.importorskip("fitz")
+import http_client  # noqa: E402
+import text_from_pdf  # noqa: E402
+from corpus_store import CorpusStore  # noqa: E402
+from crawl_frontier import ThreadedHostLimiter  # noqa: E402
+
+URL = "https://puchd.ac.in/files/fees.pdf"
+
+
+def pdf_response(cache_control):
+    response = requests.models.Response()
+    response.status_code = 200
+    response.url = URL
+    response.headers = requests.structures.CaseInsensitiveDict(
+        {"Content-Type": "application/pdf", "Cache-Control": cache_control})
+    response._content = b"%PDF-1.4 fake"
+    return response
+
+
+@pytest.mark.parametrize("cache_control", ["max-age=600", "no-store"])
+def test_download_keeps_one_copy(tmp_path, monkeypatch, cache_control):
+    monkeypatch.setattr(http_client, "CACHE_DIR", str(tmp_path / "http_cache"))
+    monkeypatch.setattr(http_client, "get_session", lambda: pytest.fail("network used"))
+    response = pdf_response(cache_control)
+    if cache_control != "no-store":
+        http_client._store(URL, response, response.content)
+    monkeypatch.setattr(text_from_pdf, "fetch", lambda url, **kwargs: response)
+
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    path = text_from_pdf.download_pdf(URL, ThreadedHostLimiter(min_delay=0), str(pdf_dir))
+    assert [p.name for p in pdf_dir.iterdir()] == [os.path.basename(path)]
+    with open(path, "rb") as f:
+        assert f.read() == b"%PDF-1.4 fake"
+    cached = http_client.cached_body_path(URL)
+    # a cached PDF is hard-linked, not copied
+    assert (cached is not None and os.path.samefile(cached, path)) == (cache_control != "no-store")
+
+    # the HTTP cache replacing or pruning its body does not touch the file being extracted
+    http_client._store(URL, response, b"%PDF-1.4 newer")
+    http_client.prune_cache(max_bytes=0)
+    with open(path, "rb") as f:
+        assert f.read() == b"%PDF-1.4 fake"
+
+
+def test_write_outputs(tmp_path):
+    tables = [[["Fee", "Amount"], ["Tuition", "100"]]]
+    records = [
+        {"filename": "b.pdf", "url": "https://puchd.ac.in/b.pdf", "page_number": 1, "text": "B1", "tables": []},
+        {"filename": "a.pdf", "url": "https://puchd.ac.in/a.pdf", "page_number": 2, "text": "A2", "tables": tables},
+        {"filename": "a.pdf", "url": "https://puchd.ac.in/a.pdf", "page_number": 1, "text": "A1", "tables": []},
+    ]
+    json_file = tmp_path / "pdf_data.json"
+    text_from_pdf.write_outputs(records, str(tmp_path / "pdf_data.csv"), str(json_file), str(tmp_path / "corpus"))
+
+    grouped = json.loads(json_file.read_text())
+    assert [doc["url"] for doc in grouped] == ["https://puchd.ac.in/a.pdf", "https://puchd.ac.in/b.pdf"]
+    assert [page["text"] for page in grouped[0]["content"]] == ["A1", "A2"]
+
+    store = CorpusStore(str(tmp_path / "corpus"))
+    page = store.get("https://puchd.ac.in/a.pdf", page_number=2)[0]
+    assert json.loads(page["tables"]) == tables
+    store.close()
@@ -37,6 +37,7 @@ type Message = {
   quickTags?: string[];
   pdfUrl?: string;
   links?: LinkItem[];
+  streamId?: string;   // set while the reply is still streaming in
 };
 
 type ChatSession = {
@@ -414,38 +415,99 @@ const App = () => {
     setIsTyping(true);
     playSendSound();
 
+    const payload = JSON.stringify({
+      message: textToSend,
+      student_profile: {
+        full_name:  localStorage.getItem("user_name"),
+        department: localStorage.getItem("user_department"),
+        batch:      localStorage.getItem("user_batch"),
+        email:      localStorage.getItem("user_id"),
+      },
+    });
+    const botTime  = () => new Date().toLocaleTimeString([], { hour: "2-digit", minute: "2-digit" });
+    const streamId = `${Date.now()}-bot`;
+    let started = false;
+    const updateBot = (patch: Partial<Message>) =>
+      setMessages(prev => prev.map(m => (m.streamId === streamId ? { ...m, ...patch } : m)));
+    const showReply = (data: any) => {
+      const reply: Partial<Message> = {
+        text:      data.reply ?? "No response received.",
+        pdfUrl:    data.pdf,
+        quickTags: data.follow_ups ?? [],
+        links:     data.links      ?? [],
+      };
+      if (started) {
+        updateBot({ ...reply, streamId: undefined });
+      } else {
+        setMessages(prev => [...prev, { role: "bot", time: botTime(), ...reply } as Message]);
+      }
+    };
+
     try {
-      const res  = await fetch(BACKEND_URL, {
+      /* Streamed reply: "token" / "replace" events while the LLM writes, then
+         "done" with the same JSON as /api/chat (follow-ups, links, pdf). */
+      const res  = await fetch(`${BACKEND_URL}/stream`, {
         method:  "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({
-          message: textToSend,
-          student_profile: {
-            full_name:  localStorage.getItem("user_name"),
-            department: localStorage.getItem("user_department"),
-            batch:      localStorage.getItem("user_batch"),
-            email:      localStorage.getItem("user_id"),
-          },
-        }),
+        headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
+        body:    payload,
       });
-      const data = await res.json();
-      const botTime = new Date().toLocaleTimeString([], { hour: "2-digit", minute: "2-digit" });
-      setMessages(prev => [
-        ...prev,
-        {
-          role:      "bot",
-          text:      data.reply ?? "No response received.",
-          time:      botTime,
-          pdfUrl:    data.pdf,
-          quickTags: data.follow_ups ?? [],
-          links:     data.links      ?? [],
-        },
-      ]);
+
+      /* Older backend without the stream route → plain JSON */
+      if (!res.ok || !res.body || !(res.headers.get("content-type") ?? "").includes("text/event-stream")) {
+        const fallback = res.status === 404 || res.status === 405
+          ? await fetch(BACKEND_URL, {
+              method:  "POST",
+              headers: { "Content-Type": "application/json" },
+              body:    payload,
+            })
+          : res;
+        showReply(await fallback.json());
+        return;
+      }
+
+      const reader  = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let text   = "";
+      let done   = false;
+      while (!done) {
+        const chunk = await reader.read();
+        if (chunk.done) break;
+        buffer += decoder.decode(chunk.value, { stream: true });
+        let split: number;
+        while ((split = buffer.indexOf("\n\n")) !== -1) {
+          const raw = buffer.slice(0, split);
+          buffer = buffer.slice(split + 2);
+          const event = raw.match(/^event: (.*)$/m)?.[1];
+          const body  = raw.match(/^data: (.*)$/m)?.[1];
+          if (!event || body === undefined) continue;
+          const data = JSON.parse(body);
+          if (event === "done") {
+            showReply(data);
+            done = true;
+            break;
+          }
+          text = event === "token" ? text + data.text : data.text;
+          if (!started) {
+            /* first words → swap the typing dots for the growing reply */
+            started = true;
+            setIsTyping(false);
+            setMessages(prev => [...prev, { role: "bot", text, time: botTime(), streamId }]);
+          } else {
+            updateBot({ text });
+          }
+        }
+      }
+      if (!done) throw new Error("stream ended early");
     } catch {
-      setMessages(prev => [
-        ...prev,
-        { role: "bot", text: "⚠️ Server is not responding. Please check your connection.", time: nowTime },
-      ]);
+      if (started) {
+        updateBot({ streamId: undefined });
+      } else {
+        setMessages(prev => [
+          ...prev,
+          { role: "bot", text: "⚠️ Server is not responding. Please check your connection.", time: nowTime },
+        ]);
+      }
     } finally {
       setIsTyping(false);
     }